@@ -0,0 +1,68 @@
+"""Measure the time to load and scroll through entries in EntryFrame and VirtualEntryFrame, for growing entry counts.
+
+Entries are loaded both one at a time with add_message and all at once with add_messages.
+
+Run from the repository root, with a display:
+    python -m benchmarks.entry_frame [--counts N [N ...]] [--max-plain N]
+
+EntryFrame creates widgets for every entry, so it is only measured up to --max-plain entries.
+"""
+import argparse
+import time
+from tkinter import Tk
+
+from benchmarks.generator import generate_entries
+from diary.entry_frame import EntryFrame, VirtualEntryFrame
+
+
+def measure(frame_class, root: Tk, entries: list, batch=False, scroll_steps=50) -> tuple:
+    """Return the milliseconds taken to load 'entries' and show the last of them, and per scroll step afterwards."""
+    frame = frame_class(root, show_day=True)
+    frame.grid(row=0, column=0, sticky="NESW")
+    root.update()
+
+    start = time.perf_counter()
+    if batch:
+        frame.add_messages((text, timestamp) for text, _category, timestamp in entries)
+    else:
+        for text, _category, timestamp in entries:
+            frame.add_message(text, timestamp)
+        frame.scroll_to_end()
+    root.update()
+    loading = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for _ in range(scroll_steps):
+        frame.yview("scroll", -1, "pages")
+        root.update()
+    scrolling = (time.perf_counter() - start) * 1000 / scroll_steps
+
+    frame.destroy()
+    return loading, scrolling
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--max-plain", type=int, default=10000, help="Largest count measured with EntryFrame")
+    args = parser.parse_args()
+
+    root = Tk()
+    root.geometry("800x600")
+    root.grid_columnconfigure(0, weight=1)
+    root.grid_rowconfigure(0, weight=1)
+    for count in args.counts:
+        entries = list(generate_entries(count))
+        for frame_class in (EntryFrame, VirtualEntryFrame):
+            if frame_class is EntryFrame and count > args.max_plain:
+                continue
+            for batch in (False, True):
+                loading, scrolling = measure(frame_class, root, entries, batch)
+                method = "add_messages" if batch else "add_message"
+                print(f"{frame_class.__name__:<18} {method:<12} {count:>7} entries  load {loading:9.1f}ms  "
+                      f"scroll {scrolling:7.2f}ms/page")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare ISO text and integer epoch timestamps for range queries and preparing rows for display.
+
+Run from the repository root:
+    python -m benchmarks.epoch_timestamps [--entries N]
+"""
+import argparse
+import datetime
+import itertools
+import random
+import tempfile
+from pathlib import Path
+
+from benchmarks.storage_profiles import measure, summarise
+from diary.diary_handler import Diary, from_epoch_us, to_epoch_us
+
+
+def generate(entries: int):
+    """Yield {entries} (text, category, timestamp) tuples spread over roughly ten years, in chronological order."""
+    time = datetime.datetime(2015, 1, 1)
+    step = datetime.timedelta(days=3650) / entries
+    for i in range(entries):
+        time += step * random.uniform(0.5, 1.5)
+        yield f"Entry number {i}", f"category {i % 10}", time.isoformat()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=2000000, help="Number of entries to pre-populate")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        handler = Diary(Path(directory), storage_profile="fast")
+        handler.add_entries(generate(args.entries))
+        # The text index which range queries used before the integer column existed, for comparison
+        with handler.connections.write() as con:
+            con.execute("CREATE INDEX entries_timestamp ON entries (timestamp)")
+            con.commit()
+
+        # One month's entries at a random point in the diary
+        def month():
+            start = datetime.date(2015, 1, 1) + datetime.timedelta(days=random.randrange(3600))
+            return start, start + datetime.timedelta(days=31)
+
+        def text_range():
+            start, end = month()
+            with handler.connections.read() as con:
+                con.execute("SELECT rowid, timestamp, entry FROM entries WHERE timestamp >= ? AND timestamp < ?",
+                            (start.isoformat(), end.isoformat())).fetchall()
+
+        def integer_range():
+            start, end = month()
+            with handler.connections.read() as con:
+                con.execute("SELECT rowid, timestamp_us, entry FROM entries WHERE timestamp_us >= ? AND timestamp_us < ?",
+                            (to_epoch_us(start), to_epoch_us(end))).fetchall()
+
+        print(f"Range query, one month of {args.entries} entries")
+        print(f"  ISO text     {summarise(measure(text_range, 200))}")
+        print(f"  integer      {summarise(measure(integer_range, 200))}")
+
+        # Preparing a page of rows for display, which needs each entry's day
+        page = list(itertools.islice(handler.iter_entries(start_date=datetime.date(2020, 1, 1), since=True), 5000))
+        handler.close()
+
+    print(f"Render preparation, {len(page)} rows")
+    parsed = measure(lambda: [datetime.datetime.fromisoformat(entry.timestamp).date() for entry in page], 50)
+    converted = measure(lambda: [from_epoch_us(entry.timestamp_us).date() for entry in page], 50)
+    print(f"  fromisoformat {summarise(parsed)}")
+    print(f"  integer       {summarise(converted)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Generate realistic synthetic diaries for benchmarking.
+
+Categories and words follow Zipf-like distributions, so a few are very common and most are rare, and entry lengths
+are log-normal: mostly short notes with the occasional long passage. Entries are spread over the {years} up to now,
+in bursts, as people write several entries in a sitting.
+
+Run from the repository root to create a diary on disk:
+    python -m benchmarks.generator DIRECTORY [--entries N] [--seed S]
+"""
+import argparse
+import datetime
+import itertools
+import math
+import random
+from pathlib import Path
+
+from diary.diary_handler import Diary
+
+CATEGORIES = 50
+VOCABULARY = 5000
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "be", "da", "fe", "gi", "ho", "ju", "pa", "we"]
+
+
+def zipf_weights(count: int, exponent=1.1) -> list:
+    """Cumulative weights for choosing among {count} items, the n-th being chosen in proportion to 1 / n^exponent."""
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def generate_entries(count: int, seed=0, years=10, categories=CATEGORIES):
+    """Yield {count} (text, category, timestamp) tuples in chronological order, ending around now."""
+    rng = random.Random(seed)
+    words = ["".join(rng.choices(SYLLABLES, k=rng.randint(1, 4))) for _ in range(VOCABULARY)]
+    word_weights = zipf_weights(VOCABULARY)
+    category_names = [f"Category {i}" for i in range(categories)]
+    category_weights = zipf_weights(categories, exponent=1.5)
+
+    end = datetime.datetime.now()
+    time = end - datetime.timedelta(days=365 * years)
+    # Mean gap between sittings, so that the last entry lands around now; sittings hold 1-5 entries minutes apart
+    mean_gap = (end - time) / count * 3
+
+    for _ in range(count):
+        if rng.random() < 1 / 3:
+            time += mean_gap * rng.expovariate(1)
+        else:
+            time += datetime.timedelta(minutes=rng.uniform(0, 5))
+        length = max(1, min(2000, int(rng.lognormvariate(math.log(12), 1))))  # Words; median 12
+        text = " ".join(rng.choices(words, cum_weights=word_weights, k=length))
+        category = rng.choices(category_names, cum_weights=category_weights)[0]
+        yield text, category, time.isoformat(sep=" ")
+
+
+def build_diary(root: Path, count: int, seed=0, storage_profile="fast") -> Diary:
+    """Create a diary under 'root' filled with {count} generated entries, and return it open."""
+    handler = Diary(root, storage_profile=storage_profile)
+    entries = generate_entries(count, seed)
+    # Commit in batches, so the write-ahead log stays small however large the diary
+    while batch := list(itertools.islice(entries, 100000)):
+        handler.add_entries(batch)
+    return handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", type=Path, help="Diary root directory to create")
+    parser.add_argument("--entries", type=int, default=10000, help="Number of entries, e.g. 10000 to 10000000")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    build_diary(args.directory, args.entries, args.seed).close()
+
+
+if __name__ == "__main__":
+    main()
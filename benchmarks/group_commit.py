@@ -0,0 +1,41 @@
+"""Compare add_entry throughput with and without write-behind group commit.
+
+Run from the repository root:
+    python -m benchmarks.group_commit [--entries N] [--profile NAME]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from diary.diary_handler import Diary
+
+
+def entries_per_second(entries: int, profile: str, write_behind: bool) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        handler = Diary(Path(directory), storage_profile=profile, write_behind=write_behind)
+        start = time.perf_counter()
+        for i in range(entries):
+            handler.add_entry(f"Captured entry number {i}", "Diary")
+        # Time until the entries are durable, not just queued
+        handler.flush()
+        elapsed = time.perf_counter() - start
+        handler.close()
+    return entries / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=5000, help="Number of entries to add one at a time")
+    parser.add_argument("--profile", default="durable", choices=Diary.STORAGE_PROFILES,
+                        help="Storage profile; group commit matters most when every commit is synced")
+    args = parser.parse_args()
+
+    direct = entries_per_second(args.entries, args.profile, write_behind=False)
+    grouped = entries_per_second(args.entries, args.profile, write_behind=True)
+    print(f"Commit per entry: {direct:10.0f} entries/s")
+    print(f"Group commit:     {grouped:10.0f} entries/s ({grouped / direct:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Measure the GUI's CPU usage while idle, and the time to rewrap after a resize, with many entries on screen.
+
+Run from the repository root, with a display:
+    python -m benchmarks.gui_idle [--entries N] [--seconds S]
+
+Opens the main window and the previous entries window, loads every generated entry into the latter, lets the layout
+settle, then measures the process's CPU time over {seconds} of idling in the Tk main loop.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from tkinter import Tk
+
+from benchmarks.generator import build_diary
+from diary.diary_gui import DiaryProgram
+
+
+def run_for(root: Tk, seconds: float) -> None:
+    """Run the Tk main loop for {seconds}."""
+    root.after(int(seconds * 1000), root.quit)
+    root.mainloop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=5000, help="Entries loaded into the previous entries window")
+    parser.add_argument("--seconds", type=float, default=10, help="Length of the idle measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        build_diary(Path(directory), args.entries).close()
+
+        root = Tk()
+        program = DiaryProgram(root, Path(directory))
+        program.grid(sticky="NESW")
+        program.previous()
+        window = program.previous_window
+        window.entry_frame.clear()
+        start = time.perf_counter()
+        window.entry_frame.add_messages((entry.entry, entry.time) for entry in program.get_diary().iter_entries())
+        root.update()
+        print(f"Loaded {args.entries} entries in {time.perf_counter() - start:.2f}s")
+        run_for(root, 2)  # Let the layout settle
+
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        run_for(root, args.seconds)
+        cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+        print(f"Idle CPU       {cpu * 1000:.1f}ms over {wall:.1f}s ({cpu / wall:.1%})")
+
+        for width in (600, 900):
+            window.root.geometry(f"{width}x600")
+            start = time.perf_counter()
+            window.root.update_idletasks()
+            print(f"Resize to {width}px  {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        root.destroy()
+        program.get_diary().close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measure how long the diary package takes to import in each mode, and check console startup leaves out the GUI.
+
+Run from the repository root:
+    python -m benchmarks.import_time [--repeats N]
+
+Each mode is imported in a fresh interpreter under `python -X importtime`. The exit status is 1 if tkinter,
+tkcalendar, Babel or pytz are imported by any mode but the GUI.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from benchmarks.storage_profiles import summarise
+
+# Modules imported by each way of using the package
+MODES = {
+    "handler": "import diary.diary_handler",
+    "one-shot": "import diary.__main__, diary.diary_cli, diary.diary_console",
+    "console": "import diary.__main__, diary.diary_console",
+    "gui": "import diary.__main__, diary.diary_gui, diary.entry_frame, diary.scroll_frame, diary.date_selection_window",
+}
+GUI_MODES = {"gui"}
+GUI_PACKAGES = {"tkinter", "_tkinter", "tkcalendar", "babel", "pytz"}
+
+
+def import_times(statement: str) -> dict:
+    """Import in a fresh interpreter, returning the cumulative import time in microseconds of each module by name."""
+    # Bytecode must be cached, or every run measures compiling the package rather than importing it
+    environment = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], env=environment,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Top-level imports are indented by a single space, and their cumulative times add up to the total
+        times[name.rstrip()] = int(cumulative_us)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    leaks = {}
+    for mode, statement in MODES.items():
+        import_times(statement)  # Warm up the bytecode cache
+        totals = []
+        for _ in range(args.repeats):
+            times = import_times(statement)
+            totals.append(sum(time for name, time in times.items() if not name.startswith("  ")) / 1000)
+        modules = {name.strip() for name in times}
+        packages = {name.split(".")[0] for name in modules}
+        diary_modules = sorted(name for name in modules if name.startswith("diary."))
+        print(f"{mode:<9} {summarise(totals)}  {len(modules)} modules, {', '.join(diary_modules)}")
+        if mode not in GUI_MODES and packages & GUI_PACKAGES:
+            leaks[mode] = sorted(packages & GUI_PACKAGES)
+
+    for mode, packages in leaks.items():
+        print(f"{mode} imports the GUI stack: {', '.join(packages)}")
+    if leaks:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Measure how long the coming week's calendar takes to build, with many recurring and one-off calendar items.
+
+Run from the repository root:
+    python -m benchmarks.recurrence [--items N] [--repeats N]
+
+Compares the indexed coming-week query against a window starting a moment ago, which reads every item.
+"""
+import argparse
+import datetime
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.storage_profiles import summarise
+from diary.diary_handler import Diary
+
+FREQUENCIES = ["", "", "daily", "weekly", "fortnightly", "monthly", "quarterly", "yearly", "3 days", "every 2 months"]
+
+
+def add_items(handler: Diary, count: int, rng: random.Random) -> None:
+    """Add {count} calendar items, first due at times spread over the past five years and the coming one."""
+    now = datetime.datetime.now()
+    for i in range(count):
+        target = now + datetime.timedelta(days=rng.uniform(-5 * 365, 365))
+        handler.add_calendar_item(f"Item {i}", target, rng.choice(FREQUENCIES))
+
+
+def measure(function, repeats: int) -> list:
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=5000, help="Number of calendar items")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        handler = Diary(Path(directory))
+        add_items(handler, args.items, random.Random(args.seed))
+
+        def all_items():
+            start = datetime.datetime.now() - datetime.timedelta(seconds=1)
+            return handler.get_calendar(start, start + datetime.timedelta(days=Diary.CALENDAR_WINDOW_DAYS))
+
+        occurrences = len(handler.get_calendar_this_week())
+        print(f"{args.items} items, {occurrences} occurrences in the coming week")
+        print(f"coming week    {summarise(measure(handler.get_calendar_this_week, args.repeats))}")
+        print(f"full scan      {summarise(measure(all_items, args.repeats))}")
+        handler.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Measure how long it takes to open and close a Diary, with a log directory full of earlier sessions' logs.
+
+Run from the repository root:
+    python -m benchmarks.startup [--entries N] [--old-logs N] [--repeats N]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.generator import build_diary
+from benchmarks.storage_profiles import summarise
+from diary.diary_handler import Diary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=10000, help="Size of the synthetic diary")
+    parser.add_argument("--old-logs", type=int, default=200, help="Log files left by earlier sessions")
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        root = Path(directory)
+        build_diary(root, args.entries).close()
+
+        opening = []
+        first_query = []
+        for _ in range(args.repeats):
+            # Recreate the logs a long-lived installation accumulates
+            for i in range(args.old_logs):
+                Path(root, "logs", f"20200101_{i:06}.log").write_text("[2020/01/01 00:00:00.000] INFO:Old session\n")
+
+            start = time.perf_counter()
+            handler = Diary(root)
+            opened = time.perf_counter()
+            handler.get_entries(days_ago=0)
+            first_query.append((time.perf_counter() - opened) * 1000)
+            opening.append((opened - start) * 1000)
+            handler.close()
+
+    print(f"Diary()        {summarise(opening)}")
+    print(f"first query    {summarise(first_query)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Compare write and read latency of each Diary storage profile.
+
+Run from the repository root:
+    python -m benchmarks.storage_profiles [--entries N]
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from diary.diary_handler import Diary
+
+
+def measure(function, repeats: int) -> list:
+    """Call 'function' {repeats} times, returning each call's duration in milliseconds."""
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def summarise(durations: list) -> str:
+    durations = sorted(durations)
+    p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))]
+    return f"p50 {statistics.median(durations):7.3f}ms  p99 {p99:7.3f}ms"
+
+
+def benchmark_profile(profile: str, entries: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        handler = Diary(Path(directory), storage_profile=profile)
+        # Background data, so reads have something to search through
+        handler.add_entries((f"Background entry number {i}", f"category {i % 10}") for i in range(entries))
+
+        # One commit per entry, as in interactive use
+        write = measure(lambda: handler.add_entry("A single new entry", "category 1"), 200)
+        read = measure(lambda: list(handler.get_entries(count=200)), 200)
+        read_category = measure(lambda: list(handler.get_entries(categoryid=3, count=200)), 200)
+        handler.close()
+
+    print(f"{profile:>9} | add_entry     {summarise(write)}")
+    print(f"{'':>9} | get_entries   {summarise(read)}")
+    print(f"{'':>9} | by category   {summarise(read_category)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000, help="Number of entries to pre-populate")
+    args = parser.parse_args()
+    for profile in Diary.STORAGE_PROFILES:
+        benchmark_profile(profile, args.entries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Measure latency and throughput of each Diary operation on a synthetic diary, and compare against a baseline.
+
+Run from the repository root:
+    python -m benchmarks.suite [--entries N] [--repeats N] [--output FILE] [--baseline FILE] [--tolerance FRACTION]
+
+Results are written as JSON. Pass a previous run's output as --baseline to list operations whose median latency
+has grown by more than the tolerance; the exit status is then 1 if any have.
+"""
+import argparse
+import datetime
+import json
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.generator import build_diary
+from diary.diary_handler import Diary
+
+
+def percentile(durations: list, fraction: float) -> float:
+    durations = sorted(durations)
+    return durations[min(len(durations) - 1, int(len(durations) * fraction))]
+
+
+def run_operation(function, repeats: int) -> dict:
+    """Call 'function' {repeats} times, returning its p50 and p99 latency in milliseconds and calls per second."""
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return {
+        "p50_ms": percentile(durations, 0.5) * 1000,
+        "p99_ms": percentile(durations, 0.99) * 1000,
+        "ops_per_second": len(durations) / sum(durations),
+    }
+
+
+def operations(handler: Diary, rng: random.Random) -> dict:
+    """Return the operations to measure on 'handler', by name. Each is called with no arguments."""
+    category_sizes = sorted(handler.get_stats(group_by=("category",)), key=lambda row: row[1])
+    common_category = category_sizes[-1][0]
+    rare_category = category_sizes[0][0]
+    today = datetime.date.today()
+    # Search terms, drawn from recent entries so that they follow the generated word frequencies
+    words = [word for entry in handler.get_entries(count=200) for word in entry.entry.split()]
+    last_rowid = handler.get_entries(count=1)[0].rowid
+
+    def random_month():
+        start = today - datetime.timedelta(days=rng.randrange(30, 3000))
+        return dict(start_date=start, end_date=start + datetime.timedelta(days=30))
+
+    def random_word():
+        return rng.choice(words)
+
+    todo_ids = []
+
+    def todo_get():
+        todo_ids[:] = [rowid for rowid, timestamp, description in handler.todo_list_get()]
+
+    def todo_remove():
+        handler.todo_list_remove(todo_ids.pop())
+
+    def delete_entry():
+        # Repeats occasionally pick an entry which is already gone, which costs about the same
+        handler.delete_entries([rng.randrange(1, last_rowid)])
+
+    return {
+        "add_entry": lambda: handler.add_entry("A new entry written during the benchmark", "Benchmark"),
+        "add_entries x1000": lambda: handler.add_entries(
+            ("A bulk entry written during the benchmark", "Benchmark") for _ in range(1000)),
+        "get_entries latest": lambda: handler.get_entries(count=200),
+        "get_entries today": lambda: handler.get_entries(days_ago=0),
+        "get_entries since week": lambda: handler.get_entries(days_ago=7, since=True),
+        "get_entries common category": lambda: handler.get_entries(categoryid=common_category),
+        "get_entries rare category": lambda: handler.get_entries(categoryid=rare_category),
+        "get_entries month": lambda: handler.get_entries(**random_month()),
+        "get_entries month category": lambda: handler.get_entries(categoryid=common_category, **random_month()),
+        "get_entries text": lambda: handler.get_entries(text=random_word()[:3]),
+        "get_entries word": lambda: handler.get_entries(word=random_word()),
+        "get_entries word month": lambda: handler.get_entries(word=random_word(), **random_month()),
+        "text_search": lambda: handler.text_search(text=random_word(), count=50),
+        "iter_entries month": lambda: sum(1 for _ in handler.iter_entries(**random_month())),
+        "entry_search time": lambda: handler.entry_search(**{
+            key: date.isoformat() for key, date in zip(("start_time", "end_time"), random_month().values())}),
+        "entry_search category": lambda: handler.entry_search(category=handler.get_category_name(rare_category)),
+        "entry_search text": lambda: handler.entry_search(text=random_word()),
+        "get_categories": lambda: handler.get_categories(),
+        "get_categories contains": lambda: handler.get_categories(contains="y 1"),
+        "get_stats month": lambda: handler.get_stats(today - datetime.timedelta(days=365), today, ("month",)),
+        "delete_entries": delete_entry,
+        "todo_list_add": lambda: handler.todo_list_add("Something to do"),
+        "todo_list_get": todo_get,
+        "todo_list_remove": todo_remove,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Print each operation's change in median latency from the baseline, returning the names of regressions."""
+    regressions = []
+    for name, result in results["operations"].items():
+        if name not in baseline["operations"]:
+            continue
+        before = baseline["operations"][name]["p50_ms"]
+        ratio = result["p50_ms"] / before if before else 1
+        regressed = ratio > 1 + tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<30} {before:9.3f}ms -> {result['p50_ms']:9.3f}ms  {ratio:5.2f}x{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=10000, help="Size of the synthetic diary, e.g. 10000 to 10000000")
+    parser.add_argument("--repeats", type=int, default=100, help="Calls of each operation")
+    parser.add_argument("--profile", default=Diary.DEFAULT_STORAGE_PROFILE, choices=Diary.STORAGE_PROFILES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=Path("benchmark-results.json"))
+    parser.add_argument("--baseline", type=Path, help="Results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Fractional growth in median latency reported as a regression")
+    args = parser.parse_args()
+
+    results = {
+        "entries": args.entries,
+        "repeats": args.repeats,
+        "profile": args.profile,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "operations": {},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        build_diary(Path(directory), args.entries, args.seed).close()
+        print(f"Generated {args.entries} entries in {time.perf_counter() - start:.1f}s")
+
+        handler = Diary(Path(directory), storage_profile=args.profile)
+        rng = random.Random(args.seed)
+        for name, function in operations(handler, rng).items():
+            result = run_operation(function, args.repeats)
+            results["operations"][name] = result
+            print(f"{name:<30} p50 {result['p50_ms']:9.3f}ms  p99 {result['p99_ms']:9.3f}ms  "
+                  f"{result['ops_per_second']:10.1f} ops/s")
+        handler.close()
+
+    args.output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline["entries"] != args.entries:
+            print(f"Warning: the baseline was measured on {baseline['entries']} entries")
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
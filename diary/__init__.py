@@ -5,6 +5,11 @@ SCROLLBAR_WIDTH = 30  # Width of scrollbar in pixels, plus a little extra space.
 TIMESTAMP_WIDTH = 40
 BACKGROUND = "#f0f0f0"
 DELETE_BUTTON_WIDTH = 20  # Width in pixels of the to-do list 'delete' button
+# File formats of diary_import and diary_export, kept here so the command line parser can offer them without
+# importing either module
+IMPORT_FORMATS = ("jsonl", "csv", "text")
+IMPORT_BATCH_SIZE = 1000  # Records parsed per worker task, and entries committed per transaction
+EXPORT_FORMATS = ("jsonl", "csv", "columnar")
 WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
 
@@ -14,7 +19,12 @@ def iso_to_weekday(iso_timestamp: str, relative=True) -> str:
     If relative is True, it may instead return either 'Today' or 'Yesterday' if appropriate.
     """
 
-    target_date = datetime.datetime.fromisoformat(iso_timestamp).date()
+    return date_to_weekday(datetime.datetime.fromisoformat(iso_timestamp).date(), relative)
+
+
+def date_to_weekday(target_date: datetime.date, relative=True) -> str:
+    """Give the weekday of a given date, or 'Today' or 'Yesterday' if relative is True and appropriate.
+    """
 
     if relative:
         today = datetime.datetime.now().date()
@@ -26,11 +36,18 @@ def iso_to_weekday(iso_timestamp: str, relative=True) -> str:
     return WEEKDAYS[target_date.weekday()]
 
 
-import diary.scroll_frame as scroll_frame
-import diary.entry_frame as entry_frame
-import diary.date_selection_window as date_selection_window
-import diary.diary_handler as diary_handler
-import diary.diary_console as diary_console
-import diary.diary_gui as diary_gui
-__all__ = ["scroll_frame", "entry_frame", "date_selection_window", "diary_handler", "diary_console", "diary_gui"]
+# Submodules are imported on first access, e.g. diary.diary_gui, so that the console and scripts which only need
+# diary_handler never load tkinter, tkcalendar or Babel.
+__all__ = ["scroll_frame", "entry_frame", "date_selection_window", "diary_handler", "diary_async", "diary_import", "diary_export", "diary_console", "diary_cli", "diary_gui"]
+
+
+def __getattr__(name: str):
+    if name in __all__:
+        # __import__ rather than importlib.import_module, so that -X importtime still reports the submodule
+        __import__(f"{__name__}.{name}")
+        return globals()[name]
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
 
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,8 +1,17 @@
+import argparse
+import datetime
 from pathlib import Path
+import sys
 
 import diary
 
-def main():
+
+def read_config() -> tuple:
+    """Read the user's preferences from ~/.diary/config.cfg, creating it interactively if missing.
+
+    Returns (storage location, GUI or Console mode preference, storage profile, write-behind mode).
+    """
+
     # Check for config files in home directory
     config_directory = Path.home() / '.diary'
     config_directory.mkdir(exist_ok=True)
@@ -19,22 +28,141 @@ def main():
             if gui_preference:
                 print("Please try again, only the values 'GUI' or 'Console' are accepted.")
             gui_preference = input("Preference (GUI or Console)")
+        storage_profile = diary.diary_handler.Diary.DEFAULT_STORAGE_PROFILE
+        write_behind = False
         with open(config_file, mode='w') as f:
             f.write(f"Storage={storage_location}\n")
-            f.write(f"Mode={gui_preference}")
+            f.write(f"Mode={gui_preference}\n")
+            f.write(f"Profile={storage_profile}\n")
+            f.write(f"WriteBehind={write_behind}")
     else:
         # Grab preferences from config file
+        config = {}
         with open(config_file, mode='r') as f:
-            storage_line = f.readline()
-            storage_location = Path(storage_line.split('=')[1].strip())
-            gui_line = f.readline()
-            gui_preference = gui_line.split('=')[1].strip()
+            for line in f:
+                if '=' in line:
+                    key, value = line.split('=', 1)
+                    config[key.strip()] = value.strip()
+        storage_location = Path(config['Storage'])
+        gui_preference = config['Mode']
+        # Storage profile, one of 'durable', 'balanced' or 'fast'. Added later, so may be missing
+        storage_profile = config.get('Profile', diary.diary_handler.Diary.DEFAULT_STORAGE_PROFILE)
+        # Whether to commit new entries in batches from a background thread
+        write_behind = config.get('WriteBehind', 'False').upper() in ['TRUE', 'YES', '1']
+
+    return storage_location.expanduser(), gui_preference, storage_profile, write_behind
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m diary",
+                                     description="Start the Diary in the mode set in ~/.diary/config.cfg, "
+                                                 "or run one of the commands below.")
+    commands = parser.add_subparsers(dest="command")
+
+    import_parser = commands.add_parser("import", help="Import entries from JSONL, CSV or plain-text journal files")
+    import_parser.add_argument("file", type=Path)
+    import_parser.add_argument("--format", choices=diary.IMPORT_FORMATS,
+                               help="File format. Guessed from the file extension if omitted")
+    import_parser.add_argument("--category", default=diary.DEFAULT_CATEGORY,
+                               help="Category for entries which do not specify one")
+    import_parser.add_argument("--workers", type=int, help="Number of parsing processes. Defaults to the CPU count")
+    import_parser.add_argument("--batch-size", type=int, default=diary.IMPORT_BATCH_SIZE,
+                               help="Number of entries committed per transaction")
+
+    export_parser = commands.add_parser("export", help="Export entries to JSONL, CSV or columnar files")
+    export_parser.add_argument("file", type=Path)
+    export_parser.add_argument("--format", choices=diary.EXPORT_FORMATS, default="jsonl")
+    export_parser.add_argument("--no-compress", action="store_true", help="Write uncompressed rather than gzip output")
+    export_parser.add_argument("--incremental", metavar="NAME",
+                               help="Only export entries added since the last export with this name")
+    export_parser.add_argument("--start-date", type=datetime.date.fromisoformat, help="YYYY-MM-DD")
+    export_parser.add_argument("--end-date", type=datetime.date.fromisoformat, help="YYYY-MM-DD, inclusive")
+    export_parser.add_argument("--since", action="store_true",
+                               help="With only --start-date, export everything from that date onwards")
+    export_parser.add_argument("--category", help="Only export entries of this category")
+    export_parser.add_argument("--text", help="Only export entries containing words starting with this text")
+    export_parser.add_argument("--word", help="Only export entries containing this whole word")
+
+    archive_parser = commands.add_parser("archive", help="Move old entries into per-year archive databases")
+    archive_parser.add_argument("--older-than", type=int, default=diary.diary_handler.Diary.ARCHIVE_AGE_DAYS,
+                                metavar="DAYS", help="Archive entries older than this many days")
+
+    add_parser = commands.add_parser("add", help="Add an entry, or one entry per line of stdin, and print the count")
+    add_parser.add_argument("words", nargs="*", help="Text of the entry. Read from stdin if omitted")
+    add_parser.add_argument("--category", default=diary.DEFAULT_CATEGORY)
+    add_parser.add_argument("--time", type=datetime.datetime.fromisoformat,
+                            help="YYYY-MM-DD HH:MM:SS. Defaults to the current time")
+    add_parser.add_argument("--jsonl", action="store_true",
+                            help="Read stdin as JSON objects with an 'entry' and optional 'category' and 'timestamp'")
+
+    search_parser = commands.add_parser("search", help="Print entries matching a search query as JSON lines")
+    search_parser.add_argument("query", nargs="*",
+                               help="Query as for the console's search command, e.g. '<5 7- :work'. "
+                                    "If omitted, one query is read per line of stdin")
+
+    todo_parser = commands.add_parser("todo", help="List, add or complete to-do items")
+    todo_parser.add_argument("action", nargs="?", choices=("list", "add", "done"), default="list")
+    todo_parser.add_argument("items", nargs="*", help="Description to add, or rowids completed. "
+                                                      "Read one per line from stdin if omitted")
+
+    args = parser.parse_args()
+    storage_location, gui_preference, storage_profile, write_behind = read_config()
+
+    if args.command == "import":
+        handler = diary.diary_handler.Diary(storage_location, storage_profile=storage_profile)
+        try:
+            diary.diary_import.import_file(handler, args.file, args.format, args.category,
+                                           args.workers, args.batch_size)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            handler.close()
+        return
+
+    if args.command == "export":
+        handler = diary.diary_handler.Diary(storage_location, storage_profile=storage_profile)
+        try:
+            filters = dict(start_date=args.start_date, end_date=args.end_date, since=args.since,
+                           text=args.text, word=args.word)
+            if args.category is not None:
+                filters["categoryid"] = handler.get_category_id(args.category)
+                if not filters["categoryid"]:
+                    parser.error(f"Category '{args.category}' does not exist")
+            diary.diary_export.export_file(handler, args.file, args.format, not args.no_compress,
+                                           args.incremental, **filters)
+        finally:
+            handler.close()
+        return
+
+    if args.command == "archive":
+        handler = diary.diary_handler.Diary(storage_location, storage_profile=storage_profile)
+        try:
+            print(f"Archived {handler.archive_entries(args.older_than)} entries")
+        finally:
+            handler.close()
+        return
+
+    if args.command in ("add", "search", "todo"):
+        # One-shot commands start quickly: tidying the log directory is left to interactive sessions
+        handler = diary.diary_handler.Diary(storage_location, storage_profile=storage_profile, clean_logs=False)
+        try:
+            if args.command == "add":
+                timestamp = args.time.isoformat(sep=" ") if args.time else ""
+                diary.diary_cli.add(handler, args.words, args.category, timestamp, args.jsonl)
+            elif args.command == "search":
+                queries = [" ".join(args.query)] if args.query else diary.diary_cli.read_lines(sys.stdin)
+                if diary.diary_cli.search(handler, queries):
+                    sys.exit(1)
+            else:
+                diary.diary_cli.todo(handler, args.action, args.items)
+        finally:
+            handler.close()
+        return
 
-    storage_location = storage_location.expanduser()
     if gui_preference == 'GUI':
-        diary.diary_gui.run(storage_location)
+        diary.diary_gui.run(storage_location, storage_profile, write_behind)
     else:
-        diary.diary_console.run(storage_location)
+        diary.diary_console.run(storage_location, storage_profile, write_behind)
 
         
 if __name__ == "__main__":
@@ -0,0 +1,195 @@
+import asyncio
+import datetime
+from itertools import islice
+import queue
+import threading
+from typing import AsyncIterator, Callable, Iterable
+
+import diary
+
+
+class AsyncDiary:
+    """asyncio front-end to the Diary database management class.
+
+    A dedicated thread owns the underlying Diary and runs every call, so the event loop never waits on SQLite I/O.
+    At most {max_pending} calls may be queued at once; further callers wait asynchronously for a free slot.
+    Methods which return rows in Diary return async iterators here, which fetch {chunk_size} rows at a time.
+
+    Use as an async context manager, or await start() before and close() after use:
+        async with AsyncDiary(root) as async_diary:
+            await async_diary.add_entry("text", "category")
+            async for entry in async_diary.iter_entries(days_ago=0):
+                ...
+    """
+
+    def __init__(self, root, max_pending=64, chunk_size=100, **diary_options):
+        self.root = root
+        self.max_pending = max_pending
+        self.chunk_size = chunk_size
+        self.diary_options = diary_options  # Passed on to Diary
+
+        self.__requests = queue.Queue(maxsize=max_pending)
+        self.__slots = None  # Semaphore bounding the number of queued calls, created on the event loop in start()
+        self.__thread = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self) -> None:
+        """Start the database thread and open the Diary on it.
+        """
+
+        self.__slots = asyncio.Semaphore(self.max_pending)
+        loop = asyncio.get_running_loop()
+        opened = loop.create_future()
+        self.__thread = threading.Thread(target=self.__serve, args=(loop, opened), name="diary-database", daemon=True)
+        self.__thread.start()
+        await opened
+
+    async def close(self) -> None:
+        """Finish all queued calls, then close the Diary and stop the database thread.
+        """
+
+        await self.__call(diary.diary_handler.Diary.close)
+        self.__requests.put(None)
+        await asyncio.get_running_loop().run_in_executor(None, self.__thread.join)
+
+    def __serve(self, loop: asyncio.AbstractEventLoop, opened: asyncio.Future) -> None:
+        """Database thread body: open the Diary, then run queued calls in order until told to stop.
+        """
+
+        try:
+            handler = diary.diary_handler.Diary(self.root, **self.diary_options)
+        except Exception as e:
+            loop.call_soon_threadsafe(self.__resolve, opened, None, e)
+            return
+        loop.call_soon_threadsafe(self.__resolve, opened, None, None)
+
+        while (request := self.__requests.get()) is not None:
+            # The request has left the queue, so its slot can go to the next caller
+            loop.call_soon_threadsafe(self.__slots.release)
+            future, function, args, kwargs = request
+            try:
+                result, error = function(handler, *args, **kwargs), None
+            except Exception as e:
+                result, error = None, e
+            loop.call_soon_threadsafe(self.__resolve, future, result, error)
+
+    @staticmethod
+    def __resolve(future: asyncio.Future, result, error) -> None:
+        if future.cancelled():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    async def __call(self, function: Callable, *args, **kwargs):
+        """Run function(diary, *args, **kwargs) on the database thread and return its result.
+        """
+
+        # The slot is released by the database thread once it takes the request off the queue, not when the caller
+        # stops waiting, as a cancelled caller's request stays queued
+        await self.__slots.acquire()
+        future = asyncio.get_running_loop().create_future()
+        # Cannot block: holding a slot guarantees there is room in the queue
+        self.__requests.put_nowait((future, function, args, kwargs))
+        return await future
+
+    async def __stream(self, function: Callable, *args, **kwargs) -> AsyncIterator[tuple]:
+        """Yield the rows returned by function(diary, *args, **kwargs), fetching them in chunks on the database thread.
+        """
+
+        rows = await self.__call(lambda handler: iter(function(handler, *args, **kwargs)))
+        while True:
+            chunk = await self.__call(lambda _handler: list(islice(rows, self.chunk_size)))
+            for row in chunk:
+                yield row
+            if len(chunk) < self.chunk_size:
+                return
+
+    async def add_entry(self, text: str, category: str, timestamp="") -> None:
+        await self.__call(diary.diary_handler.Diary.add_entry, text, category, timestamp)
+
+    async def add_entries(self, entries: Iterable) -> int:
+        """Add many entries in one transaction. 'entries' is consumed on the database thread.
+        """
+
+        return await self.__call(diary.diary_handler.Diary.add_entries, entries)
+
+    async def delete_entries(self, ids: list) -> None:
+        await self.__call(diary.diary_handler.Diary.delete_entries, ids)
+
+    async def archive_entries(self, older_than_days=diary.diary_handler.Diary.ARCHIVE_AGE_DAYS) -> int:
+        return await self.__call(diary.diary_handler.Diary.archive_entries, older_than_days)
+
+    def get_entries(self, **filters) -> AsyncIterator[tuple]:
+        return self.__stream(diary.diary_handler.Diary.get_entries, **filters)
+
+    def iter_entries(self, **filters) -> AsyncIterator[tuple]:
+        return self.__stream(diary.diary_handler.Diary.iter_entries, **filters)
+
+    def text_search(self, **filters) -> AsyncIterator[tuple]:
+        return self.__stream(diary.diary_handler.Diary.text_search, **filters)
+
+    def entry_search(self, start_time="", end_time="", category="", text="") -> AsyncIterator[tuple]:
+        return self.__stream(diary.diary_handler.Diary.entry_search, start_time, end_time, category, text)
+
+    async def get_categories(self, contains="", prefix="") -> list:
+        return await self.__call(diary.diary_handler.Diary.get_categories, contains, prefix)
+
+    async def get_category_id(self, category: str) -> int:
+        return await self.__call(diary.diary_handler.Diary.get_category_id, category)
+
+    async def get_category_name(self, categoryid: int):
+        return await self.__call(diary.diary_handler.Diary.get_category_name, categoryid)
+
+    async def refresh_categories(self) -> None:
+        await self.__call(diary.diary_handler.Diary.refresh_categories)
+
+    def todo_list_get(self) -> AsyncIterator[tuple]:
+        return self.__stream(diary.diary_handler.Diary.todo_list_get)
+
+    async def todo_list_add(self, text: str) -> int:
+        return await self.__call(diary.diary_handler.Diary.todo_list_add, text)
+
+    async def todo_list_remove(self, rowid: int) -> None:
+        await self.__call(diary.diary_handler.Diary.todo_list_remove, rowid)
+
+    async def add_calendar_item(self, description: str, target: datetime.datetime, frequency="") -> int:
+        return await self.__call(diary.diary_handler.Diary.add_calendar_item, description, target, frequency)
+
+    async def remove_calendar_item(self, rowid: int) -> None:
+        await self.__call(diary.diary_handler.Diary.remove_calendar_item, rowid)
+
+    def get_calendar(self, start=None, end=None) -> AsyncIterator[tuple]:
+        return self.__stream(diary.diary_handler.Diary.get_calendar, start, end)
+
+    def get_calendar_this_week(self) -> AsyncIterator[tuple]:
+        return self.__stream(diary.diary_handler.Diary.get_calendar_this_week)
+
+    async def rebuild_text_index(self) -> None:
+        await self.__call(diary.diary_handler.Diary.rebuild_text_index)
+
+    async def rebuild_stats(self) -> None:
+        await self.__call(diary.diary_handler.Diary.rebuild_stats)
+
+    def get_stats(self, start_date=None, end_date=None, group_by=("day",)) -> AsyncIterator[tuple]:
+        return self.__stream(diary.diary_handler.Diary.get_stats, start_date, end_date, group_by)
+
+    async def flush(self) -> None:
+        """Wait until every entry queued in write-behind mode has been committed.
+        """
+
+        await self.__call(diary.diary_handler.Diary.flush)
+
+    async def get_schema_version(self) -> int:
+        return await self.__call(diary.diary_handler.Diary.get_schema_version)
+
+    @staticmethod
+    def get_timestamp() -> str:
+        return diary.diary_handler.Diary.get_timestamp()
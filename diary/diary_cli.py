@@ -0,0 +1,99 @@
+"""Non-interactive commands for scripts, cron jobs and editor integrations.
+
+Each command makes its changes or queries through a Diary and writes JSON Lines to stdout, one object per line.
+Where a command takes text and none is given on the command line, it reads one item per line from stdin instead,
+so that many entries can be added in a single transaction.
+"""
+import json
+import sys
+from typing import Iterable, Iterator
+
+import diary
+
+
+def write_record(record: dict) -> None:
+    sys.stdout.write(json.dumps(record, ensure_ascii=False))
+    sys.stdout.write("\n")
+
+
+def read_lines(lines: Iterable) -> Iterator[str]:
+    """Yield each non-blank line of 'lines', without its line ending."""
+
+    for line in lines:
+        if line := line.rstrip("\r\n"):
+            yield line
+
+
+def entry_record(handler, entry) -> dict:
+    """Convert an entry to a dictionary with the same keys as diary_export's records."""
+
+    return {"rowid": entry.rowid, "timestamp": entry.timestamp, "category": handler.get_category_name(entry.categoryid),
+            "entry": entry.entry}
+
+
+def add(handler, words: list, category: str, timestamp="", jsonl=False, lines: Iterable = sys.stdin) -> int:
+    """Add 'words', joined by spaces, as a single entry, or each line of 'lines' if there are no words.
+
+    With 'jsonl', each line is instead an object with an "entry" and optionally a "category" and "timestamp",
+    such as the records written by `python -m diary export`. Returns the number of entries added.
+    """
+
+    if words:
+        entries = [(" ".join(words), category, timestamp)]
+    elif jsonl:
+        entries = ((record["entry"], record.get("category") or category, record.get("timestamp") or timestamp)
+                   for record in map(json.loads, read_lines(lines)))
+    else:
+        entries = ((line, category, timestamp) for line in read_lines(lines))
+
+    count = handler.add_entries(entries)
+    write_record({"added": count})
+    return count
+
+
+def search(handler, queries: Iterable) -> int:
+    """Run each search query, given in the console's search syntax, returning the number of invalid queries.
+
+    Writes an object per query holding the query and either its matching "entries" or an "error".
+    Entries always hold their full text, latest first, even for text searches, which the console shows as snippets.
+    """
+
+    failures = 0
+    for query in queries:
+        try:
+            filters = diary.diary_console.parse_search(query)
+        except ValueError as error:
+            entries, message = None, str(error)
+        else:
+            entries = diary.diary_console.find_entries(handler, snippets=False, **filters)
+            message = f"Category '{filters['category']}' does not exist"
+
+        if entries is None:
+            failures += 1
+            write_record({"query": query, "error": message})
+        else:
+            write_record({"query": query, "entries": [entry_record(handler, entry) for entry in entries]})
+    return failures
+
+
+def todo(handler, action: str, items: list, lines: Iterable = sys.stdin) -> None:
+    """List, add or remove ('done') to-do items.
+
+    Added items are 'items' joined by spaces, or each line of 'lines' if there are none.
+    Removed items are given by rowid, on the command line or one per line.
+    """
+
+    if action == "list":
+        for rowid, timestamp, description in handler.todo_list_get():
+            write_record({"rowid": rowid, "timestamp": timestamp, "description": description})
+    elif action == "add":
+        descriptions = [" ".join(items)] if items else read_lines(lines)
+        rowids = [handler.todo_list_add(description) for description in descriptions]
+        write_record({"added": len(rowids), "rowids": rowids})
+    elif action == "done":
+        rowids = [int(rowid) for rowid in (items or read_lines(lines))]
+        for rowid in rowids:
+            handler.todo_list_remove(rowid)
+        write_record({"removed": len(rowids)})
+    else:
+        raise ValueError(f"Unknown to-do action '{action}'")
@@ -20,6 +20,8 @@ That is to say,
  - If a specific date is required, specify as follows: 't' for today, 'y' for yesterday, '4' for 4 days ago.
  - If a second date is given, the query will return all entries on the date range inclusive.
  - Searches may be restricted to a category. The default 'no category' category is accessed through searching for '{CATEGORY_PREFIX}'
+ - Searches may be restricted to entries containing a word starting with "text", or containing the whole word `text`.
+   Text searches list the most relevant entries first.
 
 EXAMPLES:
     "t" Returns all entries from today with any category.
@@ -30,6 +32,21 @@ EXAMPLES:
     ":" Returns all entries with no category.
     ":work" Returns all entries with category 'work'.
     "10 5-1" Returns at most 10 recent entries from yesterday (1 day ago) to 5 days ago.
+    "\"meet\"" Returns entries containing words such as 'meet', 'meeting' or 'meets'.
+    "`meet`" Returns entries containing the word 'meet' only.
+"""
+
+STATS_HELP_TEXT = f"""Summarise the number of entries, words and characters written over time.
+    (period)? (categories)? (date)?(-date)?
+That is to say,
+ - Totals are given per 'day', 'week', 'month' (the default) or 'year'
+ - If 'categories' is given, totals are further broken down by category
+ - Dates are given as for searches. By default, the past year is summarised.
+
+EXAMPLES:
+    "" Returns monthly totals for the past year.
+    "week 28-" Returns weekly totals for the past 28 days.
+    "year categories epoch-" Returns yearly totals per category since the first entry.
 """
 
 class Command:
@@ -47,6 +64,8 @@ COMMANDS = {
         "CATEGORY_SET": Command('c', QUERY_SET_HELP_TEXT),
         "SEARCH": Command('s', SEARCH_HELP_TEXT),
         "DELETE": Command('d', 'Delete entries. You will always be prompted for confirmation'),
+        "STATS": Command('stats', STATS_HELP_TEXT),
+        "PERF": Command('perf', 'Print timings of database calls made this session'),
 }
 
 def relative_day(target: datetime.date) -> str:
@@ -87,69 +106,183 @@ def relative_timestamp(target: datetime.datetime, leniency=3) -> str:
     else:
         return f"{relative_day_name(days_difference)} {target.strftime('%H:%M')}"
 
-class ConsoleDiary:
-    def __init__(self, root):
-        self.__diary = diary.diary_handler.Diary(root)
-        self.running = True
-        self.category = ''
 
-    def perform_search(self, start_date, end_date, count=0, category=None, text=None, show_id=False):
-
-        # Start by obtaining categoryid
-        categories = {categoryid: category for categoryid, category in list(self.__diary.get_categories())}
-        if category:
-            def find_value(target_dict: dict, target_value):
-                for key, value in target_dict.items():
-                    if value == target_value:
-                        return key
-                return None
-            categoryid = find_value(categories, category)
-            if categoryid is None:
-                # Distinguish null category from valid falsy category `""`
-                print("Invalid category!")
-                return
-        else:
-            categoryid = None
+def interpret_date(timestamp: str) -> datetime.date:
+    """Convert the user-given timestamp or date indicator to a proper datetime object.
+
+    Raises a ValueError if the timestamp does not match accepted values.
+    """
 
-        # Get a full list of entries matching our filters
-        entries = self.__diary.get_entries(start_date=start_date, end_date=end_date, count=count, categoryid=categoryid, text=text)
+    timestamp_pattern = r'''
+        ((\d{4})\W)?       # Optionally allow 4 numbers indicating year
+        (\d{2})\W(\d{2})   # Require a further two numbers indicating month and day
+    '''
+    timestamp_pattern_compiled = re.compile(timestamp_pattern, re.VERBOSE)
+    today = datetime.date.today()
+    if match_timestamp := timestamp_pattern_compiled.match(timestamp):
+        (year, month, day) = (int(match_timestamp.group(x)) for x in range(1, 4))
+        if not year:
+            if month <= today.month and day <= today.day:
+                year = today.year
+            else:
+                year = today.year - 1
+        return datetime.date.fromisocalendar(year, month, day)
+    if timestamp in ['t', 'today', 'now']:
+        return datetime.date.today()
+    elif timestamp in ['y', 'yesterday']:
+        return datetime.date.today() - datetime.timedelta(days=1)
+    elif timestamp == 'epoch':
+        return datetime.date.min
+    else:
+        days = int(timestamp)  # May raise a ValueError
+        return datetime.date.today() - datetime.timedelta(days=days)
 
-        for rowid, timestamp, entry, categoryid in entries:
-            time_display = relative_timestamp_from_timestamp(timestamp)
-            category_display = f"[{categories[categoryid]}]" if (
-                categories[categoryid] and categories[categoryid] != diary.DEFAULT_CATEGORY) else ''
-            id_display = f"[#{rowid}]" if show_id else ""
-            print(f"{id_display}[{time_display}]{category_display} {entry}")
 
-    def interpret_date(self, timestamp: str) -> datetime.date:
-        """Convert the user-given timestamp or date indicator to a proper datetime object.
+def parse_date_range(text: str) -> tuple:
+    """Convert a date, or a date range 'start-end', into (start_date, end_date), inclusive.
 
-        Raises a ValueError if the timestamp does not match accepted values.
-        """
+    Dates are in any format accepted by interpret_date. A single date starts and ends on the same day; either side
+    of a range may be left out, giving None for an open start or end. Raises a ValueError if a date is not understood.
+    """
 
-        timestamp_pattern = r'''
-            ((\d{4})\W)?       # Optionally allow 4 numbers indicating year
-            (\d{2})\W(\d{2})   # Require a further two numbers indicating month and day
-        '''
-        timestamp_pattern_compiled = re.compile(timestamp_pattern, re.VERBOSE)
-        today = datetime.date.today()
-        if match_timestamp := timestamp_pattern_compiled.match(timestamp):
-            (year, month, day) = (int(match_timestamp.group(x)) for x in range(1, 4))
-            if not year:
-                if month <= today.month and day <= today.day:
-                    year = today.year
-                else:
-                    year = today.year - 1
-            return datetime.date.fromisocalendar(year, month, day)
-        if timestamp in ['t', 'today', 'now']:
-            return datetime.date.today()
-        elif timestamp in ['y', 'yesterday']:
-            return datetime.date.today() - datetime.timedelta(days=1)
-        elif timestamp == 'epoch':
-            return datetime.date.min
+    match = re.match(r"^(\w*)(-?)(\w*)$", text)
+    if not match:
+        raise ValueError(f"'{text}' is not a date or date range")
+    start_date = interpret_date(match.group(1)) if match.group(1) else None
+    if not match.group(2):
+        return start_date, start_date
+    end_date = interpret_date(match.group(3)) if match.group(3) else None
+    return start_date, end_date
+
+
+def parse_search(query_filters: str) -> dict:
+    """Convert a search query, as described in SEARCH_HELP_TEXT, into keyword arguments for find_entries.
+
+    The returned dictionary also holds 'show_id'. Raises a ValueError if a component of the query is not understood.
+    """
+
+    query_components = re.split(r'\s+', query_filters.strip())
+
+    component_patterns = (
+            # Most specific
+            (r"^(#)$", "show_id"),
+            (r"^:(\w+)$", "category"),
+            (r"^\"(\w+)\"$", "text"),
+            (r"^\`(\w+)\`$", "word"),
+            (r"^<(\d+)$", "count"),
+            (r"^([\w-]+)$", "timestamp"),
+            # Least specific
+    )
+
+    filters = {}
+    for component in filter(None, query_components):
+        for pattern, key in component_patterns:
+            if match := re.match(pattern, component):
+                filters[key] = match.group(1)
+                break
         else:
-            days = int(timestamp)  # May raise a ValueError
-            return datetime.date.today() - datetime.timedelta(days=days)
+            # NOTE: 'else' of 'for' triggers when 'for' does not break
+            raise ValueError(f"Search query component {component} does not match any search filter rules, please consult the help")
+
+    filters = defaultdict(lambda: None, filters)
+
+    start_date = None
+    end_date = None
+
+    if filters['timestamp']:
+        try:
+            start_date, end_date = parse_date_range(filters['timestamp'])
+        except ValueError:
+            pass  # Dates not understood are not filtered on
+
+    return dict(start_date=start_date, end_date=end_date, count=int(filters['count'] or 0),
+                category=filters['category'], text=filters['text'], word=filters['word'],
+                show_id=bool(filters['show_id']))
+
+
+def describe_search(start_date=None, end_date=None, count=0, category=None, text=None, word=None, **_other) -> str:
+    """Summarise the search described by parse_search's keyword arguments in a sentence."""
+
+    if start_date and end_date and start_date != end_date:
+        # Start and end from different dates
+        time_description = f" between {relative_day(start_date)} and {relative_day(end_date)}"
+    elif start_date and end_date:
+        # Start and end on the same date
+        time_description = f" from {relative_day(start_date)}"
+    elif start_date and not end_date:
+        # Starts from a set date, never ends - goes up to today
+        time_description = f" since {relative_day(start_date)}"
+    elif end_date and not start_date:
+        # Ends with no start - goes from the first entry up to given time
+        time_description = f" from before {relative_day(end_date)}"
+    else:
+        time_description = ""
+
+    if category == "":
+        category_description = f" of the default category"
+    elif category:
+        category_description = f" of category {category}"
+    else:
+        category_description = ""
+    return (f"Showing {f'up to {count} of the most recent ' if count else ''}entries{time_description}{category_description}"
+            f"{f' containing search string `{text}`' if text else ''}"
+            f"{f' containing the word `{word}`' if word else ''}").strip()
+
+
+def find_entries(handler, start_date=None, end_date=None, count=0, category=None, text=None, word=None, snippets=True,
+                 **_other):
+    """Return the entries matching parse_search's keyword arguments, or None if the category does not exist.
+
+    Text searches are ranked by relevance, and each entry is cut down to a snippet around the words it matched.
+    Other searches, and text searches without 'snippets', return whole entries, latest first.
+    """
+
+    # Start by obtaining categoryid
+    if category:
+        categoryid = handler.get_category_id(category)
+        if not categoryid:
+            return None
+    else:
+        categoryid = None
+
+    # Text searches show the matching part of each entry highlighted
+    # Without a count, stream every matching entry rather than stopping at get_entries' limit
+    # A single date is given as an equal start and end, so a start alone is a range up to today
+    filters = dict(start_date=start_date, end_date=end_date, since=True, categoryid=categoryid, text=text, word=word)
+    if (text or word) and snippets:
+        return handler.text_search(count=count, **filters)
+    elif count:
+        return handler.get_entries(count=count, **filters)
+    else:
+        return handler.iter_entries(descending=True, **filters)
+
+
+def format_entry(handler, entry, show_id=False) -> str:
+    """Format an entry as a line of console output."""
+
+    time_display = relative_timestamp(entry.time)
+    category_name = handler.get_category_name(entry.categoryid)
+    category_display = f"[{category_name}]" if (
+        category_name and category_name != diary.DEFAULT_CATEGORY) else ''
+    id_display = f"[#{entry.rowid}]" if show_id else ""
+    return f"{id_display}[{time_display}]{category_display} {entry.entry}"
+
+
+class ConsoleDiary:
+    def __init__(self, root, storage_profile=diary.diary_handler.Diary.DEFAULT_STORAGE_PROFILE, write_behind=False):
+        self.__diary = diary.diary_handler.Diary(root, storage_profile=storage_profile, write_behind=write_behind)
+        self.running = True
+        self.category = ''
+
+    def perform_search(self, start_date, end_date, count=0, category=None, text=None, show_id=False, word=None):
+        entries = find_entries(self.__diary, start_date, end_date, count, category, text, word)
+        if entries is None:
+            # Distinguish null category from valid falsy category `""`
+            print("Invalid category!")
+            return
+
+        for entry in entries:
+            print(format_entry(self.__diary, entry, show_id))
 
     def interpret_search(self, input_message):
         """Interpret the user-passed { input_message } and display results from the resulting search query.
@@ -160,81 +293,71 @@ class ConsoleDiary:
         "I want all entries from between 14 and 7 days ago of category 'help'": 14-7 :help
         """
 
-        query_filters = input_message[len(COMMANDS["SEARCH"].invokation):].strip()
-        query_components = re.split(r'\s+', query_filters)
- 
-        def combine_dict(a, b):
-            return {**a, **b}
-        
-        component_patterns = (
-                # Most specific
-                (r"^(#)$", "show_id"),
-                (r"^:(\w+)$", "category"),
-                (r"^\"(\w+)\"$", "text"),
-                (r"^\`(\w+)\`$", "word"),
-                (r"^<(\d+)$", "count"),
-                (r"^([\w-]+)$", "timestamp"),
-                # Least specific
-        )
-
-        filters = {}
-        for component in query_components:
-            for pattern, key in component_patterns:
-                if match := re.match(pattern, component):
-                    filters[key] = match.group(1)
-                    break
-            else:
-                # NOTE: 'else' of 'for' triggers when 'for' does not break
-                raise ValueError(f"Search query component {component} does not match any search filter rules, please consult the help")
+        filters = parse_search(input_message[len(COMMANDS["SEARCH"].invokation):])
+        # Give the user a summary of their query
+        print(describe_search(**filters))
+        self.perform_search(**filters)
 
-        filters = defaultdict(lambda: None, filters)
-        count = filters['count'] or 0
+    def interpret_stats(self, argument_string: str):
+        """Interpret arguments for a stats command and print the resulting summary.
+        """
 
-        start_date = None
+        period = "month"
+        by_category = False
+        start_date = datetime.date.today() - datetime.timedelta(days=365)
         end_date = None
-
-        if filters['timestamp']:
-            if match := re.match(r"^(\w*)(-?)(\w*)$", filters['timestamp']):
-                try:
-                    end_date = self.interpret_date(match.group(1))
-                except ValueError:
-                    pass  # end_date remains 'None'
+        for component in argument_string.split():
+            if component in ["day", "week", "month", "year"]:
+                period = component
+            elif component in ["categories", "category", CATEGORY_PREFIX]:
+                by_category = True
+            elif re.match(r"^(\w*)(-?)(\w*)$", component):
+                # Same date range syntax as searches: (start)-(end), where a missing end means today
                 try:
-                    start_date = self.interpret_date(match.group(3))
+                    start_date, end_date = parse_date_range(component)
                 except ValueError:
-                    pass  # start_date remains 'None'
+                    print(f"Could not interpret date range '{component}', please consult the help")
+                    return
+            else:
+                print(f"Stats argument '{component}' not recognised, please consult the help")
+                return
 
-                if end_date and not start_date and not match.group(2):
-                    # Special case for a single given date - set start and end equal.
-                    start_date = end_date
-            
-        # Give the user a summary of their query
-        if start_date and end_date and start_date != end_date:
-            # Start and end from different dates
-            time_description = f" between {relative_day(start_date)} and {relative_day(end_date)}"
-        elif start_date and end_date:
-            # Start and end on the same date
-            time_description = f" from {relative_day(start_date)}"
-        elif start_date and not end_date:
-            # Starts from a set date, never ends - goes up to today
-            time_description = f" since {relative_day(start_date)}"
-        elif end_date and not start_date:
-            # Ends with no start - goes from the first entry up to given time
-            time_description = f" from before {relative_day(end_date)}"
-        else:
-            time_description = ""
-
-        category = filters['category'] 
-        text = filters['text']
-        if category == "":
-            category_description = f" of the default category"
-        elif category:
-            category_description = f" of category {category}"
-        else:
-            category_description = ""
-        print(f"Showing {f'up to {count} of the most recent ' if count else ''}entries{time_description}{category_description}"
-              f"{f' containing search string `{text}`' if text else ''}".strip())
-        self.perform_search(start_date, end_date, count, category, text, show_id=bool(filters['show_id']))
+        group_by = (period, "category") if by_category else (period,)
+        rows = self.__diary.get_stats(start_date, end_date, group_by)
+        if not rows:
+            print("No entries in this period.")
+            return
+
+        print(f"{period.capitalize():<12}{'Category':<20}{'Entries':>10}{'Words':>10}{'Characters':>12}"
+              if by_category else f"{period.capitalize():<12}{'Entries':>10}{'Words':>10}{'Characters':>12}")
+        for row in rows:
+            if by_category:
+                key, categoryid, entries, characters, words = row
+                category = self.__diary.get_category_name(categoryid) or ""
+                print(f"{key:<12}{category[:19]:<20}{entries:>10}{words:>10}{characters:>12}")
+            else:
+                key, entries, characters, words = row
+                print(f"{key:<12}{entries:>10}{words:>10}{characters:>12}")
+        entries, characters, words = self.__diary.get_stats(start_date, end_date, group_by=())[0]
+        print(f"{'Total':<12}{'':<20}{entries:>10}{words:>10}{characters:>12}"
+              if by_category else f"{'Total':<12}{entries:>10}{words:>10}{characters:>12}")
+
+    def interpret_perf(self):
+        """Print the latency histogram of each database call made this session.
+        """
+
+        rows = self.__diary.query_stats.summary()
+        if not rows:
+            print("No database calls yet.")
+            return
+
+        bounds = self.__diary.query_stats.BUCKETS_MS
+        bucket_names = [f"<{bound}ms" for bound in bounds] + [f">={bounds[-1]}ms"]
+        print(f"{'Method':<24}{'Calls':>7}{'p50 ms':>9}{'p99 ms':>9}{'Max ms':>9}"
+              + "".join(f"{name:>9}" for name in bucket_names))
+        for method, calls, p50, p99, maximum, buckets in rows:
+            print(f"{method[:23]:<24}{calls:>7}{p50:>9.2f}{p99:>9.2f}{maximum:>9.2f}"
+                  + "".join(f"{count:>9}" for count in buckets))
 
     def confirm_delete(self, ids: list):
         """Given a list of IDs, ask for confirmation that the messages should be deleted.
@@ -249,7 +372,7 @@ class ConsoleDiary:
 
         def summarise_entry(entry):
             # [rowid] - Prints the first few characters of each messa 
-            print(f"[#{entry[0]}] - {entry[2][:40] + '...' if len(entry[2]) > 40 else entry[2]}")
+            print(f"[#{entry.rowid}] - {entry.entry[:40] + '...' if len(entry.entry) > 40 else entry.entry}")
 
         if not argument_string or argument_string == "d":
             # Try to delete previous message 
@@ -263,7 +386,7 @@ class ConsoleDiary:
                 print("Proposal to delete most recent message:")
                 summarise_entry(entry)
                 # 3) Pass to the confirm_delete function for confirmation
-                self.confirm_delete([entry[0]])
+                self.confirm_delete([entry.rowid])
 
 
     def interpret_input(self, input_message):
@@ -276,6 +399,11 @@ class ConsoleDiary:
             input_message = input_message[len(COMMAND_PREFIX):]  # Remove the command prefix
             if input_message == COMMANDS["QUIT"].invokation:
                 self.running = False
+            elif input_message.startswith(COMMANDS["STATS"].invokation):
+                # Checked before SEARCH, which shares its first letter
+                self.interpret_stats(input_message[len(COMMANDS["STATS"].invokation):])
+            elif input_message == COMMANDS["PERF"].invokation:
+                self.interpret_perf()
             elif input_message.startswith(COMMANDS["SEARCH"].invokation):
                 self.interpret_search(input_message)
             elif input_message.startswith(COMMANDS["TODAY"].invokation):
@@ -316,8 +444,11 @@ class ConsoleDiary:
         except (KeyboardInterrupt, EOFError):
             self.running = False
             print("")  # Print newline (end='\n')
+        finally:
+            # Commits any entries still queued in write-behind mode
+            self.__diary.close()
     
 
-def run(storage_location):
-    ConsoleDiary(storage_location).run()
+def run(storage_location, storage_profile=diary.diary_handler.Diary.DEFAULT_STORAGE_PROFILE, write_behind=False):
+    ConsoleDiary(storage_location, storage_profile, write_behind).run()
 
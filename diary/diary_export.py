@@ -0,0 +1,129 @@
+import csv
+import gzip
+from itertools import islice
+import json
+import logging
+from pathlib import Path
+import time
+from typing import Iterator
+
+import diary
+
+FORMATS = diary.EXPORT_FORMATS
+COLUMNS = ("rowid", "timestamp", "category", "entry")
+ROW_GROUP_SIZE = 10000  # Rows per row group in the columnar format
+
+COLUMNAR_FORMAT_NAME = "diary-columnar"
+COLUMNAR_FORMAT_VERSION = 1
+
+
+def export_records(handler, **filters) -> Iterator[dict]:
+    """Yield each entry matching get_entries-style filters as a dictionary of COLUMNS, in chronological order.
+    """
+
+    for entry in handler.iter_entries(**filters):
+        yield {"rowid": entry.rowid, "timestamp": entry.timestamp, "category": handler.get_category_name(entry.categoryid),
+               "entry": entry.entry}
+
+
+def write_jsonl(records: Iterator[dict], f) -> None:
+    for record in records:
+        f.write(json.dumps(record, ensure_ascii=False))
+        f.write("\n")
+
+
+def write_csv(records: Iterator[dict], f) -> None:
+    writer = csv.DictWriter(f, fieldnames=COLUMNS)
+    writer.writeheader()
+    writer.writerows(records)
+
+
+def write_columnar(records: Iterator[dict], f) -> None:
+    """Write records in the Diary columnar format.
+
+    The first line is a JSON header naming the format, version and columns. Each further line is a JSON row group
+    of up to ROW_GROUP_SIZE rows, holding one array per column: rowids are delta-encoded, and categories are
+    dictionary-encoded as indices into the row group's 'category_dictionary'.
+    """
+
+    header = {"format": COLUMNAR_FORMAT_NAME, "version": COLUMNAR_FORMAT_VERSION, "columns": COLUMNS}
+    f.write(json.dumps(header) + "\n")
+    while group := list(islice(records, ROW_GROUP_SIZE)):
+        category_dictionary = {}
+        previous_rowid = 0
+        rowid_deltas = []
+        for record in group:
+            rowid_deltas.append(record["rowid"] - previous_rowid)
+            previous_rowid = record["rowid"]
+        row_group = {
+            "rows": len(group),
+            "rowid": rowid_deltas,
+            "timestamp": [record["timestamp"] for record in group],
+            "category": [category_dictionary.setdefault(record["category"], len(category_dictionary))
+                         for record in group],
+            "entry": [record["entry"] for record in group],
+        }
+        row_group["category_dictionary"] = list(category_dictionary)
+        f.write(json.dumps(row_group, ensure_ascii=False, separators=(',', ':')) + "\n")
+
+
+def read_columnar(f) -> Iterator[dict]:
+    """Yield the records of a file written by write_columnar, as dictionaries of COLUMNS.
+    """
+
+    header = json.loads(f.readline())
+    if header.get("format") != COLUMNAR_FORMAT_NAME or header.get("version") != COLUMNAR_FORMAT_VERSION:
+        raise ValueError("Not a Diary columnar file, or written by an incompatible version")
+    for line in f:
+        row_group = json.loads(line)
+        rowid = 0
+        for delta, timestamp, category, entry in zip(row_group["rowid"], row_group["timestamp"],
+                                                     row_group["category"], row_group["entry"]):
+            rowid += delta
+            yield {"rowid": rowid, "timestamp": timestamp,
+                   "category": row_group["category_dictionary"][category], "entry": entry}
+
+
+WRITERS = {
+    "jsonl": write_jsonl,
+    "csv": write_csv,
+    "columnar": write_columnar,
+}
+
+
+def export_file(handler, path: Path, file_format="jsonl", compress=True, incremental=None, **filters) -> int:
+    """Stream the entries matching get_entries-style filters into a file, returning the number of entries written.
+
+    Output is gzip-compressed unless compress is False. If 'incremental' names an export, only entries added since
+    the last successful export of that name are written, and the position is advanced once the file is complete.
+    Memory use is constant, whatever the number of entries.
+    """
+
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format '{file_format}', expected one of {', '.join(FORMATS)}")
+
+    if incremental:
+        filters["after_rowid"] = handler.get_export_position(incremental)
+
+    count = 0
+    last_rowid = filters.get("after_rowid") or 0
+    start_time = time.perf_counter()
+
+    def counted(records):
+        nonlocal count, last_rowid
+        for record in records:
+            count += 1
+            last_rowid = max(last_rowid, record["rowid"])
+            yield record
+
+    opener = gzip.open if compress else open
+    with opener(path, mode='wt', encoding='utf-8', newline='') as f:
+        WRITERS[file_format](counted(export_records(handler, **filters)), f)
+
+    if incremental:
+        handler.set_export_position(incremental, last_rowid)
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Exported {count} entries to {path} in {elapsed:.1f}s, {count / max(elapsed, 1e-9):.0f} entries/s")
+    logging.info("Exported %d entries to %s", count, path)
+    return count
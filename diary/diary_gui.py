@@ -1,9 +1,12 @@
+from itertools import islice
+import logging
 from pathlib import Path
+import queue
+import threading
 from tkinter import *
 from tkinter import ttk
 from tkinter.scrolledtext import ScrolledText
 from tkinter import messagebox
-import time
 
 import diary
 
@@ -15,21 +18,112 @@ class GenericWindow:
         self.root.grid_rowconfigure(0, weight=1)
         self.root.grid_columnconfigure(1, weight=1)
 
-        self.update_list = []
-
     def __bool__(self):
         return bool(self.root.winfo_exists()) if self.root else False
 
-    def update(self):
-        for item in self.update_list:
-            if item:
-                item.update()
-
     def focus(self):
         if self.root:
             self.root.focus()
 
 
+class RunningSearch:
+    """State shared between the Tk thread and the worker thread of one BackgroundSearcher search."""
+
+    def __init__(self):
+        self.results = queue.Queue()  # Lists of rows, then the error the search failed with, or None once finished
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()  # Guards 'con', which is only set while the worker's queries may be running
+        self.con = None
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+        with self.lock:
+            if self.con is not None:
+                self.con.interrupt()
+
+
+class BackgroundSearcher:
+    """Runs one diary query at a time on a worker thread, passing its results back to the Tk thread as they arrive.
+
+    Each search reads through its own connection, so starting another search cancels the one still running by
+    interrupting that connection. Tk may only be used from its own thread, so it polls for results with after().
+    """
+
+    POLL_MS = 20  # Interval between checks for new results
+    CHUNK_SIZE = 200  # Rows passed back at once
+
+    def __init__(self, widget, __diary):
+        self.widget = widget
+        self.__diary = __diary
+        self.__search = None  # The running search
+        self.__poll_id = None
+
+    def __bool__(self):
+        return self.__search is not None
+
+    def start(self, query, on_rows, on_done) -> None:
+        """Run query(diary), which returns an iterable of rows, in the background, cancelling any running search.
+
+        On the Tk thread, on_rows is called with each list of rows, then on_done with the error the search raised,
+        or None. Neither is called after the search is cancelled.
+        """
+
+        self.cancel()
+        search = self.__search = RunningSearch()
+        threading.Thread(target=self.__work, args=(search, query), name="diary-search", daemon=True).start()
+        self.__poll_id = self.widget.after(self.POLL_MS, self.__poll, search, on_rows, on_done)
+
+    def cancel(self) -> None:
+        """Stop the running search, if any, discarding its results.
+        """
+
+        if self.__search is not None:
+            self.__search.cancel()
+            self.__search = None
+        if self.__poll_id is not None:
+            self.widget.after_cancel(self.__poll_id)
+            self.__poll_id = None
+
+    def __work(self, search: RunningSearch, query) -> None:
+        """Worker thread body: run the query, and queue its rows in chunks until done or cancelled."""
+        error = None
+        try:
+            with self.__diary.connections.dedicated() as con:
+                with search.lock:
+                    search.con = con
+                try:
+                    rows = iter(query(self.__diary))
+                    while not search.cancelled.is_set():
+                        chunk = list(islice(rows, self.CHUNK_SIZE))
+                        if chunk:
+                            search.results.put(chunk)
+                        if len(chunk) < self.CHUNK_SIZE:
+                            break
+                finally:
+                    with search.lock:
+                        search.con = None
+        except Exception as e:
+            if not search.cancelled.is_set():
+                logging.exception("Background search failed")
+                error = e
+        search.results.put(error)
+
+    def __poll(self, search: RunningSearch, on_rows, on_done) -> None:
+        self.__poll_id = None
+        if search is not self.__search:
+            return
+        try:
+            while isinstance(item := search.results.get_nowait(), list):
+                on_rows(item)
+                if search is not self.__search:
+                    return  # Cancelled by on_rows
+        except queue.Empty:
+            self.__poll_id = self.widget.after(self.POLL_MS, self.__poll, search, on_rows, on_done)
+            return
+        self.__search = None
+        on_done(item)
+
+
 class TodayWindow(GenericWindow):
     """Opens a window for entering today's entries.
 
@@ -44,7 +138,6 @@ class TodayWindow(GenericWindow):
         self.entry_frame = diary.entry_frame.EntryFrame(self.root, background=background)
         self.entry_frame.grid(row=0, column=0, columnspan=4, sticky="NESW")
         self.entry_frame.grid_columnconfigure(0, weight=1)
-        self.update_list.append(self.entry_frame)
 
         # Add a text entry box
         self.entry_field = ScrolledText(self.root, height=5, wrap=WORD)
@@ -60,10 +153,8 @@ class TodayWindow(GenericWindow):
         self.category_combobox.grid(row=2, column=1, sticky="NESW")
 
         # Populate entry frame with entries
-        if entries := self.__diary.get_entries(days_ago=0, since=False):
-            for rowid, timestamp, entry_text, categoryid in entries:
-                self.entry_frame.add_message(entry_text, timestamp)
-        self.entry_frame.scroll_to_end()
+        self.entry_frame.add_messages((entry.entry, entry.time)
+                                      for entry in self.__diary.iter_entries(days_ago=0, since=False))
 
         # Refresh to fill in the category combobox
         self.refresh()
@@ -100,11 +191,11 @@ class TodayWindow(GenericWindow):
 
 
 class EntrySearchWindow(GenericWindow):
-    def __init__(self, master, __diary, entry_frame):
+    def __init__(self, master, __diary, show_search):
         super().__init__(master)
         self.root.title("Search Previous Entries")
         self.__diary = __diary
-        self.entry_frame = entry_frame
+        self.show_search = show_search  # PreviousWindow.search, which displays the results
 
         # Add a box to filter by time
         time_label = ttk.Label(self.root, text="Filter by time:")
@@ -163,9 +254,7 @@ class EntrySearchWindow(GenericWindow):
         text_filter_entry.grid(row=4, column=1, sticky="NESW")
 
         def search(*args):
-            if self.run():
-                self.root.destroy()
-            else:
+            if not self.run():
                 self.focus()
 
         # Add buttons
@@ -193,15 +282,26 @@ class EntrySearchWindow(GenericWindow):
         elif not (start_time or end_time or category or text_filter):
             messagebox.showerror("Filter Required", "Please filter on at least one field.")
         else:
-            entries = list(self.__diary.entry_search(start_time, end_time, category, text_filter))
-            if entries:
-                self.entry_frame.clear()
-                for rowid, timestamp, entry in entries:
-                    self.entry_frame.add_message(entry, timestamp)
-                self.entry_frame.scroll_to_end()
-                return True
-            else:
-                messagebox.showinfo("Search failed", "No results found")
+            try:
+                for timestamp in (start_time, end_time):
+                    if timestamp:
+                        diary.diary_handler.to_epoch_us(timestamp)
+            except ValueError:
+                messagebox.showerror("Invalid Time", "Start and end times must be dates or ISO timestamps.")
+                return False
+
+            def done(count, error):
+                # Close once there are results to look at; otherwise leave the filters open to be changed
+                if not self or error is not None:
+                    return
+                if count:
+                    self.root.destroy()
+                else:
+                    messagebox.showinfo("Search failed", "No results found")
+                    self.focus()
+
+            self.show_search(lambda handler: handler.entry_search(start_time, end_time, category, text_filter), done)
+            return True
         return False
 
 
@@ -218,16 +318,17 @@ class PreviousWindow(GenericWindow):
         self.sidebar = Frame(self.root)
         self.sidebar.grid(row=0, column=0, sticky="NW")
 
-        self.entry_frame = diary.entry_frame.EntryFrame(self.root, show_day=True, day_relative=True)
+        # Searches may return any number of entries, so only those in view are given widgets
+        self.entry_frame = diary.entry_frame.VirtualEntryFrame(self.root, show_day=True, day_relative=True)
         self.entry_frame.grid(row=0, column=1, sticky="NESW")
-        self.update_list.append(self.entry_frame)
+
+        # Searches run in the background, so the window stays responsive and a new search can replace a slow one
+        self.searcher = BackgroundSearcher(self.root, self.__diary)
+        self.root.bind("<Destroy>", lambda event: self.searcher.cancel() if event.widget is self.root else None)
 
         def entries_from_previous_day(days_ago, since=False):
             def f(*args):
-                self.entry_frame.clear()
-                for rowid, timestamp, entry, categoryid in self.__diary.get_entries(days_ago=days_ago, since=since):
-                    self.entry_frame.add_message(entry, timestamp)
-                self.entry_frame.scroll_to_end()
+                self.search(lambda handler: handler.iter_entries(days_ago=days_ago, since=since))
             return f
 
         self.sidebar_today = ttk.Button(self.sidebar,
@@ -251,69 +352,141 @@ class PreviousWindow(GenericWindow):
             if self.entry_search_window:
                 self.entry_search_window.focus()
             else:
-                self.entry_search_window = EntrySearchWindow(self.root, self.__diary, self.entry_frame)
+                self.entry_search_window = EntrySearchWindow(self.root, self.__diary, self.search)
 
         self.sidebar_search = ttk.Button(self.sidebar, text="Search", command=entry_search)
         self.sidebar_search.grid(row=3, column=0)
 
+        self.status_var = StringVar()
+        self.status_label = ttk.Label(self.sidebar, textvariable=self.status_var)
+        self.status_label.grid(row=4, column=0)
+
         # Load up previous 7 days by default
         entries_from_previous_day(7, since=True)()
 
+    def search(self, query, on_done=None) -> None:
+        """Show the entries returned by query(diary) as they are found, replacing those shown and any running search.
+
+        If given, on_done(count, error) is called once the search finishes, unless it is replaced first.
+        """
+
+        self.entry_frame.clear()
+        self.status_var.set("Searching...")
+        count = 0
+
+        def show(entries):
+            nonlocal count
+            count += len(entries)
+            self.entry_frame.add_messages((entry.entry, entry.time) for entry in entries)
+            self.status_var.set(f"Searching... {count} found")
+
+        def done(error):
+            if error is None:
+                self.status_var.set(f"{count} found")
+            else:
+                self.status_var.set("Search failed")
+                messagebox.showerror("Search failed", str(error))
+            if on_done:
+                on_done(count, error)
+
+        self.searcher.start(query, show, done)
+
 
 class TodoManager:
+    """The to-do list shown in the main window.
+
+    Keeps the widgets of each item in 'rows', keyed by rowid, so that adding or removing an item only adds or removes
+    its own row.
+    """
+
     def __init__(self, master, __diary, image):
         self.master = master
         self.__diary = __diary
-        self.root = None
-        self.todo_list_labels = []
+        self.rows = {}  # (button, label) of each item, by rowid, in order of addition
+        self.__next_row = 0  # Grid row for the next item. Rows of removed items are left empty, and take no space
         self.image = image
+        self.wrap_width = 20  # Current wraplength of the item labels
+        self.__rewrap_pending = False
 
-        self.refresh()
-
-    def __bool__(self):
-        return bool(self.root.winfo_exists()) if self.root else False
-
-    def refresh(self):
-        if self.root:
-            self.root.destroy()
         todo_list_frame = Frame(self.master, background=diary.BACKGROUND)
         self.root = todo_list_frame
 
         todo_list_frame.grid(row=0, column=1, sticky="NESW")
         todo_list_frame.columnconfigure(1, weight=1)
         todo_list_frame.rowconfigure(1, weight=1)
+        todo_list_frame.bind("<Configure>", self.__on_configure)
 
         # Add a label to the top
         todo_list_header = Label(todo_list_frame, text="To-Do List")
         todo_list_header.grid(row=0, sticky="NEW")
-        # Grab the current to-do list
-        todo_list_items = list(self.__diary.todo_list_get())
-        if todo_list_items:
-            todo_list_item_frame = diary.scroll_frame.ScrollableFrame(todo_list_frame, background=diary.BACKGROUND)
-            todo_list_item_frame.grid(row=1, columnspan=2, sticky="NESW")
-
-            self.todo_list_labels = []
-
-            for row, (rowid, timestamp, text) in enumerate(todo_list_items):
-                ttk.Button(todo_list_item_frame.view, image=self.image,
-                           command=self.remove_todo_list_item_builder(rowid)) \
-                    .grid(row=row, column=0, sticky="NESW")
-                label = ttk.Label(todo_list_item_frame.view, text=text, wraplength=20)
-                label.grid(row=row, column=1, sticky="NESW")
-                self.todo_list_labels.append(label)
-                todo_list_item_frame.rowconfigure(row, weight=1)
-        else:
-            Label(todo_list_frame, text="List is empty!").grid(row=1)
+
+        # Items, or a placeholder while there are none; only one of the two is shown at a time
+        self.item_frame = diary.scroll_frame.ScrollableFrame(todo_list_frame, background=diary.BACKGROUND)
+        self.item_frame.grid(row=1, columnspan=2, sticky="NESW")
+        self.empty_label = Label(todo_list_frame, text="List is empty!")
+        self.empty_label.grid(row=1)
 
         # Add buttons to the bottom of the to-do list
         todo_list_button_add = Button(todo_list_frame, text="Add new item", command=self.add_todo_list_item)
         todo_list_button_add.grid(row=2, sticky="EWS")
 
-    def update(self):
-        if self.todo_list_labels:
-            bbox = self.root.bbox(self.todo_list_labels[0])
-            width = max(bbox[2] - diary.SCROLLBAR_WIDTH - diary.DELETE_BUTTON_WIDTH, 0)
-            for label in self.todo_list_labels:
+        self.refresh()
+
+    def __bool__(self):
+        return bool(self.root.winfo_exists()) if self.root else False
+
+    def refresh(self):
+        """Bring the list up to date with the database, adding, removing or relabelling only the rows which differ.
+        """
+
+        items = {rowid: text for rowid, _timestamp, text in self.__diary.todo_list_get()}
+        for rowid in [rowid for rowid in self.rows if rowid not in items]:
+            self.remove_row(rowid)
+        for rowid, text in items.items():
+            if rowid not in self.rows:
+                self.add_row(rowid, text)
+            elif self.rows[rowid][1].cget("text") != text:
+                self.rows[rowid][1].configure(text=text)
+        self.__show_placeholder()
+
+    def add_row(self, rowid: int, text: str):
+        button = ttk.Button(self.item_frame.view, image=self.image, command=self.remove_todo_list_item_builder(rowid))
+        button.grid(row=self.__next_row, column=0, sticky="NESW")
+        label = ttk.Label(self.item_frame.view, text=text, wraplength=self.wrap_width)
+        label.grid(row=self.__next_row, column=1, sticky="NESW")
+        self.rows[rowid] = (button, label)
+        self.__next_row += 1
+        self.__show_placeholder()
+
+    def remove_row(self, rowid: int):
+        for widget in self.rows.pop(rowid):
+            widget.destroy()
+        self.__show_placeholder()
+
+    def __show_placeholder(self):
+        if self.rows:
+            self.empty_label.grid_remove()
+            self.item_frame.grid()
+        else:
+            self.item_frame.grid_remove()
+            self.empty_label.grid()
+
+    def __on_configure(self, event):
+        if not self.__rewrap_pending:
+            self.__rewrap_pending = True
+            self.root.after_idle(self.rewrap)
+
+    def rewrap(self):
+        """Wrap item labels to the width of the to-do list, if it has changed.
+        """
+
+        self.__rewrap_pending = False
+        if not self.root.winfo_exists():
+            return
+        width = max(self.root.winfo_width() - diary.SCROLLBAR_WIDTH - diary.DELETE_BUTTON_WIDTH, 0)
+        if width != self.wrap_width:
+            self.wrap_width = width
+            for _button, label in self.rows.values():
                 label.configure(wraplength=width)
 
     def add_todo_list_item(self):
@@ -325,9 +498,9 @@ class TodoManager:
         def add(*args):
             text = entry_field.get("1.0", "end-1c").strip()
             if len(text) > 0:
-                self.__diary.todo_list_add(text)
+                rowid = self.__diary.todo_list_add(text)
                 entry.destroy()
-                self.refresh()
+                self.add_row(rowid, text)
 
         def cancel(*args):
             entry.destroy()
@@ -344,7 +517,7 @@ class TodoManager:
     def remove_todo_list_item_builder(self, rowid):
         def f(*args):
             self.__diary.todo_list_remove(rowid)
-            self.refresh()
+            self.remove_row(rowid)
         return f
 
 
@@ -352,7 +525,8 @@ class DiaryProgram(Frame):
     """Master class for the program's GUI.
     """
 
-    def __init__(self, master, root_directory=None):
+    def __init__(self, master, root_directory=None, storage_profile=diary.diary_handler.Diary.DEFAULT_STORAGE_PROFILE,
+                 write_behind=False):
         super().__init__(master)
 
         self.red_cross = PhotoImage(file='./red_cross.png')
@@ -360,7 +534,8 @@ class DiaryProgram(Frame):
         # Instantiate the Diary
         if not root_directory:
             root_directory = Path().absolute()
-        self.__diary = diary.diary_handler.Diary(root_directory)
+        self.__diary = diary.diary_handler.Diary(root_directory, storage_profile=storage_profile,
+                                                 write_behind=write_behind)
 
         # Create a small sidebar containing a column of buttons
         sidebar = Frame(self)
@@ -389,26 +564,20 @@ class DiaryProgram(Frame):
         calendar_frame = Frame(self)
         calendar_frame.grid(column=2)
 
-        calendar_frame_header = Label(calendar_frame)
+        calendar_frame_header = Label(calendar_frame, text="Coming week")
         calendar_frame_header.grid(row=0)
 
         row_counter = 1
         calendar_items = self.__diary.get_calendar_this_week()
         if calendar_items:
-            for calendar_item in calendar_items:
-                # TODO
-                pass
+            for due, description, _rowid in calendar_items:
+                weekday = diary.date_to_weekday(due.date())
+                Label(calendar_frame, text=f"{weekday} {due.strftime('%H:%M')} {description}").grid(
+                    row=row_counter, sticky="W")
+                row_counter += 1
         else:
             Label(calendar_frame, text="No upcoming appointments").grid(row=row_counter)
 
-    def update(self, *args):
-        if self.todo_list:
-            self.todo_list.update()
-        if self.today_window:
-            self.today_window.update()
-        if self.previous_window:
-            self.previous_window.update()
-
     def today(self):
         """Open up a dialog box for interacting with today's entry.
         """
@@ -438,20 +607,16 @@ class DiaryProgram(Frame):
         pass
 
 
-def run(storage_location):
+def run(storage_location, storage_profile=diary.diary_handler.Diary.DEFAULT_STORAGE_PROFILE, write_behind=False):
     root = Tk()
 
     root_directory = storage_location
-    program = DiaryProgram(root, root_directory)
+    program = DiaryProgram(root, root_directory, storage_profile, write_behind)
     program.grid(sticky="NESW")
     root.grid_columnconfigure(0, weight=1)
     root.grid_rowconfigure(0, weight=1)
     try:
-        while True:
-            time.sleep(0.017)
-            root.update_idletasks()
-            root.update()
-            program.update()
-    except TclError as e:
-        # Expected normal close of the program
-        pass
+        root.mainloop()
+    finally:
+        # Commits any entries still queued in write-behind mode
+        program.get_diary().close()
@@ -1,26 +1,608 @@
-from collections import defaultdict
+import atexit
+import bisect
+import calendar
+from collections import defaultdict, deque, namedtuple
+from contextlib import contextmanager
 import datetime
+import functools
+import heapq
+import inspect
 import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+import queue
+import re
 import sqlite3
+import threading
+import time
+from typing import Callable, Iterable, Iterator
+
+
+LOG_FORMATTER = logging.Formatter('[%(asctime)s.%(msecs)03d] %(levelname)s:%(message)s', datefmt='%Y/%m/%d %H:%M:%S')
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler which leaves formatting of messages to the listener thread.
+
+    Safe as long as log calls only pass arguments which are not modified afterwards, as is the case in Diary.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def start_log_listener(handler: logging.Handler) -> tuple:
+    """Pass log records to 'handler' on a background thread, so file I/O stays off the thread that logs them.
+
+    Returns (queue handler for loggers to use, listener). The listener is stopped, writing out any queued records,
+    when the program exits; stop it sooner with stop_log_listener.
+    """
+
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return DeferredQueueHandler(records), listener
+
+
+def stop_log_listener(listener: QueueListener) -> None:
+    atexit.unregister(listener.stop)
+    listener.stop()
+
+
+EPOCH = datetime.datetime(1970, 1, 1)
+ONE_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def to_epoch_us(value) -> int:
+    """Convert a datetime, date or ISO timestamp string into integer microseconds since the epoch.
+
+    Timestamps are wall-clock times without a time zone, so they are counted from a naive epoch.
+    Times with a UTC offset are first converted to local time.
+    """
+
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    elif not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    if value.tzinfo:
+        value = value.astimezone().replace(tzinfo=None)
+    return (value - EPOCH) // ONE_MICROSECOND
+
+
+def from_epoch_us(timestamp_us: int) -> datetime.datetime:
+    """Convert integer microseconds since the epoch back into a naive datetime.
+    """
+
+    return EPOCH + datetime.timedelta(microseconds=timestamp_us)
+
+
+# Calendar item frequencies. Besides these names, custom intervals are written as e.g. "3 days" or "every 2 months"
+NAMED_FREQUENCIES = {
+    "daily": (1, "day"),
+    "weekly": (1, "week"),
+    "fortnightly": (2, "week"),
+    "monthly": (1, "month"),
+    "quarterly": (3, "month"),
+    "yearly": (1, "year"),
+    "annually": (1, "year"),
+}
+FREQUENCY_PATTERN = re.compile(r"^(?:every\s+)?(\d+)\s*(day|week|month|year)s?$")
+
+
+class Frequency(namedtuple("Frequency", ["count", "unit"])):
+    """Interval between occurrences of a calendar item: 'count' days or months, by 'unit'.
+
+    Weeks are stored as 7 days and years as 12 months.
+    """
+
+    __slots__ = ()
+
+
+def parse_frequency(frequency: str):
+    """Parse a calendar item's frequency, returning a Frequency, or None for items which do not recur.
+
+    Raises a ValueError if the frequency is not understood.
+    """
+
+    if not frequency or not frequency.strip():
+        return None
+    text = frequency.strip().lower()
+    if text in NAMED_FREQUENCIES:
+        count, unit = NAMED_FREQUENCIES[text]
+    elif match := FREQUENCY_PATTERN.match(text):
+        count, unit = int(match.group(1)), match.group(2)
+    else:
+        raise ValueError(f"Unknown frequency '{frequency}', expected one of {', '.join(NAMED_FREQUENCIES)} "
+                         f"or an interval such as '3 days'")
+    if count < 1:
+        raise ValueError(f"Frequency '{frequency}' must be at least 1 {unit}")
+    if unit == "week":
+        return Frequency(count * 7, "day")
+    if unit == "year":
+        return Frequency(count * 12, "month")
+    return Frequency(count, unit)
+
+
+def add_months(value: datetime.datetime, months: int) -> datetime.datetime:
+    """Move 'value' by 'months' calendar months, clamping the day to the end of shorter months.
+    """
+
+    year, month = divmod(value.year * 12 + value.month - 1 + months, 12)
+    return value.replace(year=year, month=month + 1, day=min(value.day, calendar.monthrange(year, month + 1)[1]))
+
+
+def nth_occurrence(target: datetime.datetime, frequency: Frequency, n: int) -> datetime.datetime:
+    if frequency.unit == "day":
+        return target + datetime.timedelta(days=frequency.count * n)
+    return add_months(target, frequency.count * n)
+
+
+def occurrences(target: datetime.datetime, frequency, start: datetime.datetime,
+                end: datetime.datetime) -> Iterator[datetime.datetime]:
+    """Yield each occurrence in [start, end) of a calendar item first due at 'target', repeating at 'frequency'.
+
+    Occurrences are counted from 'target' rather than from each other, so an item due on the 31st falls on the 30th
+    of 30-day months but returns to the 31st afterwards.
+    """
+
+    if frequency is None:
+        if start <= target < end:
+            yield target
+        return
+
+    # Skip straight to the first occurrence at or after 'start', however long ago 'target' was
+    if frequency.unit == "day":
+        step = datetime.timedelta(days=frequency.count)
+        occurrence = target + step * max(0, -((target - start) // step))
+        while occurrence < end:
+            yield occurrence
+            occurrence += step
+        return
+
+    n = 0
+    if start > target:
+        n = ((start.year - target.year) * 12 + start.month - target.month) // frequency.count
+        while nth_occurrence(target, frequency, n) < start:
+            n += 1
+    while (occurrence := nth_occurrence(target, frequency, n)) < end:
+        yield occurrence
+        n += 1
+
+
+def next_occurrence(target: datetime.datetime, frequency, after: datetime.datetime):
+    """Return the first occurrence at or after 'after' of a calendar item, or None if there is none.
+    """
+
+    return next(occurrences(target, frequency, after, datetime.datetime.max), None)
+
+
+# A calendar item's next_us once it will not occur again, so it is never inside a window
+NEVER_US = 2 ** 63 - 1
+
+
+def next_occurrence_us(target: datetime.datetime, frequency, after: datetime.datetime) -> int:
+    """Return next_occurrence as microseconds since the epoch, or NEVER_US if there is none.
+    """
+
+    next_time = next_occurrence(target, frequency, after)
+    return to_epoch_us(next_time) if next_time else NEVER_US
+
+
+class Entry(namedtuple("Entry", ["rowid", "timestamp", "entry", "categoryid", "timestamp_us"])):
+    """A row of the entries table, as returned by Diary queries.
+
+    'timestamp_us' is the integer used for ordering and range filters; 'time' gives the timestamp as a datetime.
+    """
+
+    __slots__ = ()
+    COLUMNS = "entries.rowid, timestamp, entry, categoryid, timestamp_us"  # Selects an Entry
+
+    @property
+    def time(self) -> datetime.datetime:
+        # The C fromisoformat is faster than datetime arithmetic on timestamp_us (see benchmarks.epoch_timestamps)
+        return datetime.datetime.fromisoformat(self.timestamp)
+
+
+class CategoryCache:
+    """In-memory map between category rowids and names.
+
+    Diary records every category it inserts, so lookups rarely need the database. Other processes sharing the database
+    may add categories too, so a miss is not proof that a category does not exist; see Diary.get_category_id.
+    """
+
+    def __init__(self):
+        self.__names = {}  # categoryid -> category
+        self.__ids = {}  # category -> categoryid
+
+    def load(self, rows: Iterable) -> None:
+        """Replace the contents of the map with the given (categoryid, category) rows.
+        """
+
+        self.__names = {}
+        self.__ids = {}
+        for categoryid, category in rows:
+            self.add(categoryid, category)
+
+    def add(self, categoryid: int, category: str) -> None:
+        self.__names[categoryid] = category
+        self.__ids[category] = categoryid
+
+    def get_id(self, category: str) -> int:
+        """Return the rowid of category 'category', or 0 if it does not exist.
+        """
+
+        return self.__ids.get(category, 0)
+
+    def get_name(self, categoryid: int):
+        return self.__names.get(categoryid)
+
+    def search(self, contains="", prefix="") -> list:
+        """Return (categoryid, category) tuples, in rowid order, of categories containing 'contains' and
+        starting with 'prefix'. Matching is case-insensitive.
+        """
+
+        contains = contains.casefold()
+        prefix = prefix.casefold()
+        return [(categoryid, category) for categoryid, category in sorted(self.__names.items())
+                if contains in category.casefold() and category.casefold().startswith(prefix)]
+
+
+class ConnectionManager:
+    """Hands out database connections to callers on any thread.
+
+    All writes go through a single writer connection, which one caller at a time may hold.
+    Reads use a pool of up to {pool_size} read-only connections, opened as needed. In WAL mode these can read
+    concurrently with each other and with the writer. When every reader is checked out, callers wait for one to be returned.
+    A thread may instead read through a connection of its own, which other threads can interrupt; see dedicated().
+    """
+
+    def __init__(self, connect: Callable[..., sqlite3.Connection], pool_size: int):
+        self.__connect = connect
+        self.__pool_size = pool_size
+
+        self.writer = connect()
+        self.__write_lock = threading.RLock()
+
+        self.__readers = queue.LifoQueue()  # Most recently used first, as it is the most likely to have a warm cache
+        self.__reader_count = 0
+        self.__pool_lock = threading.Lock()
+        self.__local = threading.local()  # Holds the calling thread's dedicated reader, if it has one
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """Hold the writer connection for the duration of the 'with' block.
+        """
+
+        with self.__write_lock:
+            yield self.writer
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        """Check out a read-only connection for the duration of the 'with' block.
+        """
+
+        dedicated = getattr(self.__local, "reader", None)
+        if dedicated is not None:
+            try:
+                yield dedicated
+            finally:
+                if dedicated.in_transaction:
+                    dedicated.rollback()
+            return
+
+        con = None
+        try:
+            con = self.__readers.get_nowait()
+        except queue.Empty:
+            with self.__pool_lock:
+                if self.__reader_count < self.__pool_size:
+                    self.__reader_count += 1
+                    con = self.__connect(read_only=True)
+            if con is None:
+                con = self.__readers.get()
+        try:
+            yield con
+        finally:
+            if con.in_transaction:
+                con.rollback()
+            self.__readers.put(con)
+
+    @contextmanager
+    def dedicated(self) -> Iterator[sqlite3.Connection]:
+        """Open a read-only connection for the 'with' block, through which every read() on the calling thread is served.
+
+        The connection is used by nothing else, so another thread may call its interrupt() method to cancel whatever
+        the block is querying, without disturbing any other reader. It is closed at the end of the block.
+        """
+
+        con = self.__connect(read_only=True)
+        self.__local.reader = con
+        try:
+            yield con
+        finally:
+            self.__local.reader = None
+            con.close()
+
+    def close(self) -> None:
+        """Close the writer and every pooled reader. Connections still checked out are not closed.
+        """
+
+        with self.__write_lock:
+            self.writer.close()
+        while True:
+            try:
+                self.__readers.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class QueryCall:
+    """Measurements of one call of a Diary method: its duration, rows returned, SQL run and SQLite work done.
+    """
+
+    MAX_STATEMENTS = 20  # Statements kept per call; bulk inserts run one per row
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self.rows = None
+        self.statements = []
+        self.progress_steps = 0
+        self.started = None
+
+
+class QueryStats:
+    """Rolling latency histograms of Diary methods, and a log of the slow calls among them.
+
+    Every connection reports each statement it runs through an SQLite trace callback, and its progress through a
+    progress handler, to the method call active on the same thread. Only the last {window} durations of each method
+    are kept. Calls taking at least {slow_threshold_ms} milliseconds are written to {slow_log_file}.
+    """
+
+    BUCKETS_MS = (1, 4, 16, 64, 256, 1024)  # Upper bounds of histogram buckets; a last bucket holds anything slower
+    PROGRESS_INTERVAL = 10000  # SQLite virtual machine instructions between progress callbacks
+
+    # Literals in traced statements, replaced by placeholders so logs show templates rather than entry contents
+    LITERALS = re.compile(r"'(?:[^']|'')*'|\bX'[0-9A-Fa-f]*'|(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+
+    def __init__(self, slow_log_file: Path, slow_threshold_ms: float, window=1000):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.__durations = defaultdict(lambda: deque(maxlen=window))
+        self.__calls = defaultdict(int)
+        self.__lock = threading.Lock()
+        self.__local = threading.local()
+
+        # A private logger, so slow queries stay out of the main log; the file is only created once one is logged
+        file_handler = logging.FileHandler(slow_log_file, delay=True, encoding="utf-8")
+        file_handler.setFormatter(LOG_FORMATTER)
+        queue_handler, self.__slow_log_listener = start_log_listener(file_handler)
+        self.__slow_log = logging.Logger("diary.slow_queries")
+        self.__slow_log.addHandler(queue_handler)
+
+    def instrument(self, con: sqlite3.Connection) -> None:
+        """Report the statements run on connection 'con'.
+        """
+
+        con.set_trace_callback(self.__trace)
+        con.set_progress_handler(self.__progress, self.PROGRESS_INTERVAL)
+
+    def __active_call(self):
+        calls = getattr(self.__local, "calls", None)
+        return calls[-1] if calls else None
+
+    def __trace(self, statement: str) -> None:
+        call = self.__active_call()
+        if call is not None and len(call.statements) < QueryCall.MAX_STATEMENTS:
+            call.statements.append(statement)
+
+    def __progress(self) -> int:
+        call = self.__active_call()
+        if call is not None:
+            call.progress_steps += 1
+        return 0  # Any other value would abort the statement
+
+    @contextmanager
+    def bulk(self, con: sqlite3.Connection, statement: str) -> Iterator[None]:
+        """Record 'statement' once for the active call, rather than tracing each of its executions on 'con'.
+
+        For executemany, where tracing every row would cost a quarter of the insert time.
+        """
+
+        self.__trace(statement)
+        con.set_trace_callback(None)
+        try:
+            yield
+        finally:
+            con.set_trace_callback(self.__trace)
+
+    def resume(self, call: QueryCall) -> None:
+        """Attribute statements run on this thread to 'call', and time it, until pause is called.
+        """
+
+        if not hasattr(self.__local, "calls"):
+            self.__local.calls = []
+        self.__local.calls.append(call)
+        call.started = time.perf_counter()
+
+    def pause(self, call: QueryCall) -> None:
+        call.elapsed += time.perf_counter() - call.started
+        self.__local.calls.remove(call)
+
+    def record(self, method: str, call: QueryCall) -> None:
+        """Add a finished call of 'method' to its histogram, and log it if it was slow.
+        """
+
+        elapsed_ms = call.elapsed * 1000
+        with self.__lock:
+            self.__durations[method].append(elapsed_ms)
+            self.__calls[method] += 1
+        if elapsed_ms >= self.slow_threshold_ms:
+            templates = list(dict.fromkeys(" ".join(self.LITERALS.sub("?", statement).split())
+                                           for statement in call.statements))
+            self.__slow_log.warning("%s took %.1fms, %s rows, ~%d VM instructions: %s",
+                                    method, elapsed_ms, "?" if call.rows is None else call.rows,
+                                    call.progress_steps * self.PROGRESS_INTERVAL, " | ".join(templates))
+
+    @contextmanager
+    def measure(self, method: str) -> Iterator[QueryCall]:
+        """Time the 'with' block as one call of 'method', which may set the yielded call's 'rows'.
+        """
+
+        call = QueryCall()
+        self.resume(call)
+        try:
+            yield call
+        finally:
+            self.pause(call)
+            self.record(method, call)
+
+    def summary(self) -> list:
+        """Return (method, calls, p50 ms, p99 ms, max ms, bucket counts) for each method called, by name.
+
+        Percentiles and buckets cover the rolling window of recent calls; 'calls' counts all of them.
+        """
+
+        with self.__lock:
+            windows = {method: sorted(durations) for method, durations in self.__durations.items()}
+            calls = dict(self.__calls)
+        rows = []
+        for method, durations in sorted(windows.items()):
+            buckets = [0] * (len(self.BUCKETS_MS) + 1)
+            for duration in durations:
+                buckets[bisect.bisect_left(self.BUCKETS_MS, duration)] += 1
+            p50 = durations[len(durations) // 2]
+            p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))]
+            rows.append((method, calls[method], p50, p99, durations[-1], buckets))
+        return rows
+
+    def close(self) -> None:
+        stop_log_listener(self.__slow_log_listener)
+        for handler in self.__slow_log_listener.handlers:
+            handler.close()
+
+
+def timed(method: Callable) -> Callable:
+    """Decorate a Diary method to record each call in the Diary's query_stats.
+
+    Generator methods are timed only while running, not while the caller handles the rows they yield.
+    """
+
+    name = method.__name__
+
+    def rows(result):
+        if isinstance(result, list):
+            return len(result)
+        if isinstance(result, int) and not isinstance(result, bool):
+            return result  # The number of entries added, moved, etc.
+        return None
+
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def generator_wrapper(self, *args, **kwargs):
+            call = QueryCall()
+            call.rows = 0
+            generator = method(self, *args, **kwargs)
+            try:
+                while True:
+                    self.query_stats.resume(call)
+                    try:
+                        row = next(generator)
+                    except StopIteration:
+                        return
+                    finally:
+                        self.query_stats.pause(call)
+                    call.rows += 1
+                    yield row
+            finally:
+                generator.close()
+                self.query_stats.record(name, call)
+        return generator_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.query_stats.measure(name) as call:
+            result = method(self, *args, **kwargs)
+            call.rows = rows(result)
+        return result
+    return wrapper
 
 
 class Diary:
     """Diary database management class.
 
     This utility class provides an abstraction of all Diary-related data on disk, primarily the SQL database.
+    Its methods may be called from any thread: writes are serialised through a single writer connection,
+    while reads are served concurrently from a pool of read-only connections.
     """
 
     # CONFIG_FILE_NAME = "config.cfg"  # TODO add settings. Don't need any yet
     DATABASE_FILE_NAME = "diary.db"  # Name of the main database file containing data
     LOG_EXTENSION = "log"  # Extension of produced log files
+    LOG_FILE_NAME = "diary"
+    LOG_MAX_BYTES = 1024 * 1024  # Size at which the log file is rotated
+    LOG_BACKUPS = 5  # Number of rotated log files kept
     ENCODING = 'utf-8'
     LIMIT_SEARCH_ROWS = 1000
+    ITERATION_PAGE_SIZE = 500  # Rows fetched per query by iter_entries
+
+    # SQLite settings applied to each connection, by storage profile name.
+    # Every profile uses write-ahead logging; they trade durability on power loss for write speed,
+    # and memory for read speed.
+    STORAGE_PROFILES = {
+        # Every commit is synced to disk before returning
+        "durable": {
+            "journal_mode": "WAL",
+            "synchronous": "FULL",
+            "mmap_size": 0,
+            "cache_size": -2000,  # Negative sizes are in KiB
+            "temp_store": "DEFAULT",
+        },
+        # Commits survive a crash of the program, but the last few may be lost on power failure
+        "balanced": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 64 * 1024 * 1024,
+            "cache_size": -16000,
+            "temp_store": "MEMORY",
+        },
+        # Never waits for the disk. A power failure may lose recent commits, but does not corrupt the database
+        "fast": {
+            "journal_mode": "WAL",
+            "synchronous": "OFF",
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -64000,
+            "temp_store": "MEMORY",
+        },
+    }
+    DEFAULT_STORAGE_PROFILE = "balanced"
+
+    # Entry ids continue from the highest ever given, so the ids of deleted or archived entries are never reused
+    INSERT_ENTRY_SQL = """INSERT INTO entries (entryid, timestamp, timestamp_us, entry, categoryid)
+                          VALUES (MAX(IFNULL((SELECT MAX(entryid) FROM entries), 0),
+                                      (SELECT last_entryid FROM entry_sequence)) + 1, ?, ?, ?, ?)"""
+
+    # Write-behind mode commits queued entries once this many are waiting, or this many seconds after the first
+    WRITE_BEHIND_BATCH_SIZE = 256
+    WRITE_BEHIND_INTERVAL = 0.05
+    READER_POOL_SIZE = 4  # Maximum number of read-only connections open at once
+    SLOW_QUERY_MS = 100  # Default threshold for the slow query log
+    SLOW_QUERY_LOG_FILE_NAME = "slow_queries"
+
+    # Archive mode moves old entries into one database file per year, under this directory of 'root'
+    ARCHIVE_DIRECTORY_NAME = "archive"
+    ARCHIVE_AGE_DAYS = 365  # Default age, in days, beyond which archive_entries moves entries
+
+    CALENDAR_WINDOW_DAYS = 7  # Default length of the window returned by get_calendar
 
     def __init__(self,
                  root: Path,
                  logging_level=logging.INFO,
-                 keep_logs=False,  # Whether to delete 'old' log files in the current log directory
+                 *,  # Keyword-only, so a positional keep_logs from earlier versions is rejected rather than misread
+                 log_backups=LOG_BACKUPS,  # Number of rotated log files to keep
+                 storage_profile=DEFAULT_STORAGE_PROFILE,  # Key of STORAGE_PROFILES
+                 write_behind=False,  # Whether to queue new entries and commit them in batches from a writer thread
+                 slow_query_ms=SLOW_QUERY_MS,  # Calls taking at least this many milliseconds go to the slow query log
+                 clean_logs=True,  # Whether to delete log files left by earlier versions. Off for one-shot commands
                  ):
         """Initialise structures in preparation of creating or opening a diary database under 'root'.
 
@@ -30,24 +612,19 @@ class Diary:
         """
         self.root = root
         self.logging_level = logging_level
-        self.keep_logs = keep_logs
+
+        if storage_profile not in self.STORAGE_PROFILES:
+            raise ValueError(f"Unknown storage profile '{storage_profile}', "
+                             f"expected one of {', '.join(self.STORAGE_PROFILES)}")
+        self.storage_profile = storage_profile
 
         self.database_file = Path(self.root, self.DATABASE_FILE_NAME)
+        self.archive_directory = Path(self.root, self.ARCHIVE_DIRECTORY_NAME)
         self.new_database = not self.database_file.is_file()
 
         # Prepare log file directory and path
         self.log_directory = Path(self.root, "logs")
-
-        if not keep_logs:
-            for old_log_file in self.log_directory.rglob(f"*.{self.LOG_EXTENSION}"):
-                old_log_file.unlink()
-
-        def log_filename():
-            time_now = datetime.datetime.now()
-            formatted_time_now = time_now.isoformat(sep='_', timespec='seconds')
-            filename_now = formatted_time_now.replace('-', '').replace(':', '')
-            return filename_now
-        self.log_file = Path(self.log_directory, log_filename()+"."+self.LOG_EXTENSION)
+        self.log_file = Path(self.log_directory, f"{self.LOG_FILE_NAME}.{self.LOG_EXTENSION}")
 
         # Create the root directory
         if not self.root.is_dir():
@@ -57,21 +634,32 @@ class Diary:
         if not self.log_directory.is_dir():
             # Create regardless of settings
             self.log_directory.mkdir()
+        elif clean_logs and not self.log_file.exists():
+            # Earlier versions started a new log file, named after the time, every session
+            for old_log_file in self.log_directory.glob(f"????????_??????.{self.LOG_EXTENSION}"):
+                old_log_file.unlink()
 
-        # Set up the logger
-        # Following comment suppresses erroneous problem reported due to incomplete logging.basicConfig spec
-        # noinspection PyArgumentList
-        logging.basicConfig(
-            filename=str(self.log_file),
-            format='[%(asctime)s.%(msecs)03d] %(levelname)s:%(message)s',
-            datefmt='%Y/%m/%d %H:%M:%S',
-            level=self.logging_level
-        )
+        # Set up the logger, unless the program already has. Records are written to a rotating file by a background
+        # thread, so logging never waits for the disk
+        root_logger = logging.getLogger()
+        if not root_logger.handlers:
+            file_handler = RotatingFileHandler(self.log_file, maxBytes=self.LOG_MAX_BYTES, backupCount=log_backups,
+                                               encoding=self.ENCODING, delay=True)
+            file_handler.setFormatter(LOG_FORMATTER)
+            queue_handler, _listener = start_log_listener(file_handler)
+            root_logger.addHandler(queue_handler)
+            root_logger.setLevel(self.logging_level)
         logging.info("Logging initialised")
 
+        # Time every database call; slow ones are logged separately
+        self.query_stats = QueryStats(Path(self.log_directory, f"{self.SLOW_QUERY_LOG_FILE_NAME}.{self.LOG_EXTENSION}"),
+                                      slow_query_ms)
+
         # Connect to the database file
-        self.con = sqlite3.connect(self.database_file)
-        self.con.execute('PRAGMA foreign_keys = on')
+        pragmas = self.STORAGE_PROFILES[self.storage_profile]
+        logging.info("Using storage profile '%s': %s", self.storage_profile, pragmas)
+        self.connections = ConnectionManager(self.connect, self.READER_POOL_SIZE)
+        self.con = self.connections.writer
         self.cur = self.con.cursor()
 
         if self.new_database:
@@ -79,6 +667,114 @@ class Diary:
             logging.info("Creating new database")
             self.populate_new_database()
 
+        # Bring new and existing databases up to the current schema
+        self.migrate()
+
+        # The category table is small and rarely changes, so all lookups are served from memory
+        self.categories = CategoryCache()
+        self.refresh_categories()
+
+        # Start the background writer for write-behind mode
+        self.write_behind = write_behind
+        self.__write_error = None
+        if self.write_behind:
+            # Only rows count against the queue's capacity, so flush markers are never held up behind busy writers
+            self.__pending = queue.Queue()
+            self.__capacity = threading.BoundedSemaphore(4 * self.WRITE_BEHIND_BATCH_SIZE)
+            self.__writer = threading.Thread(target=self.__write_pending, name="diary-writer", daemon=True)
+            self.__writer.start()
+
+    def connect(self, read_only=False) -> sqlite3.Connection:
+        """Open a new connection to the database file, configured according to the active storage profile.
+
+        The connection may be used from any thread, but only by one thread at a time.
+        """
+
+        if read_only:
+            con = sqlite3.connect(f"{self.database_file.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            con = sqlite3.connect(self.database_file, check_same_thread=False)
+        self.query_stats.instrument(con)
+        con.execute('PRAGMA foreign_keys = on')
+        for pragma, value in self.STORAGE_PROFILES[self.storage_profile].items():
+            if read_only and pragma == "journal_mode":
+                continue  # Set by the writer, and persistent
+            # PRAGMA does not accept bound parameters; names and values come from STORAGE_PROFILES only
+            con.execute(f"PRAGMA {pragma} = {value}")
+        return con
+
+    def close(self) -> None:
+        """Commit any queued entries, then close the connection to the database. The Diary cannot be used afterwards.
+        """
+
+        if self.write_behind:
+            self.flush()
+            self.__pending.put(None)
+            self.__writer.join()
+            self.write_behind = False
+        self.connections.close()
+        self.query_stats.close()
+
+    def flush(self) -> None:
+        """Block until every entry queued in write-behind mode has been committed.
+
+        Called before every read, so callers always see their own writes. Does nothing outside write-behind mode.
+        Entries queued by other threads after the call are not waited for, so readers are not held up by busy writers.
+        Raises the error from any failed background commit since the last flush; those entries are lost.
+        """
+
+        if self.write_behind and self.__pending.unfinished_tasks:
+            # The writer commits everything queued ahead of the marker, then sets it
+            committed = threading.Event()
+            self.__pending.put(committed)
+            committed.wait()
+        if self.__write_error is not None:
+            error, self.__write_error = self.__write_error, None
+            raise error
+
+    def __write_pending(self) -> None:
+        """Writer thread body for write-behind mode.
+
+        Commits queued (timestamp, timestamp_us, entry, categoryid) rows in batches of up to WRITE_BEHIND_BATCH_SIZE,
+        waiting at most WRITE_BEHIND_INTERVAL seconds for a batch to fill, until a None is received.
+        A threading.Event in the queue, put there by flush, ends the batch early, and is set once the batch is committed.
+        """
+
+        statement = self.INSERT_ENTRY_SQL
+        running = True
+        while running:
+            batch = [self.__pending.get()]
+            deadline = time.monotonic() + self.WRITE_BEHIND_INTERVAL
+            while batch[-1] is not None and not isinstance(batch[-1], threading.Event) \
+                    and len(batch) < self.WRITE_BEHIND_BATCH_SIZE:
+                try:
+                    batch.append(self.__pending.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+
+            running = batch[-1] is not None
+            rows = [row for row in batch if isinstance(row, tuple)]
+            for _row in rows:
+                self.__capacity.release()
+            try:
+                if rows:
+                    with self.connections.write() as con, self.query_stats.measure("write-behind commit") as call:
+                        try:
+                            with self.query_stats.bulk(con, statement):
+                                call.rows = con.executemany(statement, rows).rowcount
+                            con.commit()
+                        except Exception:
+                            con.rollback()
+                            raise
+            except Exception as e:
+                logging.exception("Write-behind commit of %d entries failed", len(rows))
+                self.__write_error = e
+            finally:
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        item.set()
+                    self.__pending.task_done()
+
     def populate_new_database(self) -> None:
         """Populate a fresh database with all required tables.
         """
@@ -116,23 +812,355 @@ class Diary:
 
         self.con.commit()
 
-    def todo_list_get(self) -> sqlite3.Cursor:
-        """Obtain all to-do items.
+    def get_schema_version(self) -> int:
+        """Return the schema version of the database, as recorded in SQLite's user_version pragma.
+
+        Databases created before schema versioning was introduced report version 0.
+        """
+
+        with self.connections.write() as con:
+            return int(list(con.execute("PRAGMA user_version"))[0][0])
+
+    def migrate(self) -> None:
+        """Upgrade the database in place to the latest schema version.
+
+        Each migration in MIGRATIONS runs in its own transaction, together with the user_version bump,
+        so an interrupted upgrade never leaves the database at a half-applied version.
         """
 
-        statement = "SELECT rowid, timestamp, description FROM todo"
-        return self.cur.execute(statement)
+        version = self.get_schema_version()
+        for target_version, migration in enumerate(self.MIGRATIONS[version:], start=version + 1):
+            logging.info("Migrating database to schema version %d", target_version)
+            self.cur.execute("BEGIN")
+            try:
+                migration(self)
+                # PRAGMA does not accept bound parameters, but target_version is always an int
+                self.cur.execute(f"PRAGMA user_version = {int(target_version)}")
+                self.con.commit()
+            except Exception:
+                self.con.rollback()
+                raise
+
+    def _migration_indexes(self) -> None:
+        """Schema version 1: index the columns used by entry filters and category lookups.
+        """
 
-    def todo_list_add(self, text: str) -> None:
-        """Add a to-do list item consisting of the given text.
+        # Category names must be unique for the index to be created.
+        # add_entry never creates duplicates, but merge any that slipped in into the oldest copy.
+        duplicates = list(self.cur.execute("SELECT category FROM categories GROUP BY category HAVING COUNT(*) > 1"))
+        if duplicates:
+            logging.warning("Merging %d duplicated categories", len(duplicates))
+            self.cur.execute('''UPDATE entries SET categoryid = (
+                                    SELECT MIN(duplicate.categoryid) FROM categories AS duplicate
+                                    WHERE duplicate.category = (
+                                        SELECT category FROM categories WHERE categoryid = entries.categoryid))
+                                WHERE categoryid IN (SELECT categoryid FROM categories)''')
+            self.cur.execute('''DELETE FROM categories WHERE categoryid NOT IN (
+                                    SELECT MIN(categoryid) FROM categories GROUP BY category)''')
+
+        self.cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS categories_category ON categories (category)")
+        self.cur.execute("CREATE INDEX IF NOT EXISTS entries_timestamp ON entries (timestamp)")
+        # Also serves lookups on categoryid alone, as it is the leftmost column
+        self.cur.execute("CREATE INDEX IF NOT EXISTS entries_categoryid_timestamp ON entries (categoryid, timestamp)")
+
+    def _migration_full_text_index(self) -> None:
+        """Schema version 2: add an FTS5 index over entry text, kept in sync with 'entries' by triggers.
+        """
+
+        self.cur.execute('''CREATE VIRTUAL TABLE entries_fts USING fts5(
+                            entry,
+                            content='entries',
+                            content_rowid='entryid',
+                            prefix='2 3'
+                            );''')
+        self.cur.execute('''CREATE TRIGGER entries_fts_insert AFTER INSERT ON entries BEGIN
+                                INSERT INTO entries_fts (rowid, entry) VALUES (new.entryid, new.entry);
+                            END;''')
+        self.cur.execute('''CREATE TRIGGER entries_fts_delete AFTER DELETE ON entries BEGIN
+                                INSERT INTO entries_fts (entries_fts, rowid, entry) VALUES ('delete', old.entryid, old.entry);
+                            END;''')
+        self.cur.execute('''CREATE TRIGGER entries_fts_update AFTER UPDATE OF entry ON entries BEGIN
+                                INSERT INTO entries_fts (entries_fts, rowid, entry) VALUES ('delete', old.entryid, old.entry);
+                                INSERT INTO entries_fts (rowid, entry) VALUES (new.entryid, new.entry);
+                            END;''')
+
+        # Backfill the index from entries written before it existed
+        self.cur.execute("INSERT INTO entries_fts (entries_fts) VALUES ('rebuild')")
+
+    def _migration_imports(self) -> None:
+        """Schema version 3: track bulk imports, so they can resume after an interruption and skip duplicates.
+        """
+
+        # Number of records processed so far from each import source
+        self.cur.execute('''CREATE TABLE imports (
+                            source TEXT PRIMARY KEY,
+                            position INTEGER
+                            );''')
+        # Content hashes of every imported entry
+        self.cur.execute('''CREATE TABLE imported_hashes (
+                            hash TEXT PRIMARY KEY
+                            ) WITHOUT ROWID;''')
+
+    def _migration_exports(self) -> None:
+        """Schema version 4: track incremental exports, so each run picks up after the last entry exported.
+        """
+
+        self.cur.execute('''CREATE TABLE exports (
+                            name TEXT PRIMARY KEY,
+                            last_rowid INTEGER
+                            );''')
+
+    # SQL expression counting the words of {text}, taken to be runs of characters separated by single spaces or newlines
+    WORD_COUNT_SQL = """CASE WHEN trim({text}) = '' THEN 0 ELSE
+                            length(trim(replace({text}, char(10), ' '))) -
+                            length(replace(trim(replace({text}, char(10), ' ')), ' ', '')) + 1 END"""
+
+    # SQL expression converting the ISO timestamp {timestamp} into microseconds since the epoch, as to_epoch_us does
+    EPOCH_US_SQL = """CAST(strftime('%s', {timestamp}) AS INTEGER) * 1000000 +
+                      CASE WHEN substr({timestamp}, 20, 1) = '.'
+                          THEN CAST(substr(substr({timestamp}, 21) || '000000', 1, 6) AS INTEGER)
+                          ELSE 0 END"""
+
+    def _migration_daily_stats(self) -> None:
+        """Schema version 5: maintain per-day, per-category entry, character and word totals with triggers.
+        """
+
+        # Entries without a category are counted under categoryid 0
+        self.cur.execute('''CREATE TABLE daily_stats (
+                            date TEXT,
+                            categoryid INTEGER,
+                            entries INTEGER,
+                            characters INTEGER,
+                            words INTEGER,
+                            PRIMARY KEY (date, categoryid)
+                            ) WITHOUT ROWID;''')
+
+        add_new = f'''INSERT INTO daily_stats (date, categoryid, entries, characters, words)
+                       VALUES (substr(new.timestamp, 1, 10), coalesce(new.categoryid, 0), 1,
+                               length(new.entry), {self.WORD_COUNT_SQL.format(text="new.entry")})
+                       ON CONFLICT (date, categoryid) DO UPDATE SET
+                           entries = entries + 1,
+                           characters = characters + excluded.characters,
+                           words = words + excluded.words;'''
+        remove_old = f'''UPDATE daily_stats SET
+                              entries = entries - 1,
+                              characters = characters - length(old.entry),
+                              words = words - ({self.WORD_COUNT_SQL.format(text="old.entry")})
+                          WHERE date = substr(old.timestamp, 1, 10) AND categoryid = coalesce(old.categoryid, 0);
+                          DELETE FROM daily_stats
+                          WHERE date = substr(old.timestamp, 1, 10) AND categoryid = coalesce(old.categoryid, 0)
+                              AND entries <= 0;'''
+        self.cur.execute(f"CREATE TRIGGER daily_stats_insert AFTER INSERT ON entries BEGIN {add_new} END;")
+        self.cur.execute(f"CREATE TRIGGER daily_stats_delete AFTER DELETE ON entries BEGIN {remove_old} END;")
+        self.cur.execute(f'''CREATE TRIGGER daily_stats_update AFTER UPDATE OF timestamp, entry, categoryid ON entries
+                            BEGIN {remove_old} {add_new} END;''')
+
+        # Backfill totals for entries written before the table existed
+        self.cur.execute(self.DAILY_STATS_BACKFILL_SQL)
+
+    DAILY_STATS_BACKFILL_SQL = f"""INSERT INTO daily_stats (date, categoryid, entries, characters, words)
+                                   SELECT substr(timestamp, 1, 10), coalesce(categoryid, 0), COUNT(*),
+                                          SUM(length(entry)), SUM({WORD_COUNT_SQL.format(text="entry")})
+                                   FROM entries GROUP BY 1, 2"""
+
+    def _migration_epoch_timestamps(self) -> None:
+        """Schema version 6: add an indexed integer copy of each entry's timestamp, for fast range queries.
+        """
+
+        self.cur.execute("ALTER TABLE entries ADD COLUMN timestamp_us INTEGER")
+        self.cur.execute(f"UPDATE entries SET timestamp_us = {self.EPOCH_US_SQL.format(timestamp='timestamp')}")
+
+        # Diary computes timestamp_us itself, but keep it correct for other programs writing to the database
+        self.cur.execute(f'''CREATE TRIGGER entries_timestamp_us_insert AFTER INSERT ON entries
+                            WHEN new.timestamp_us IS NULL BEGIN
+                                UPDATE entries SET timestamp_us = {self.EPOCH_US_SQL.format(timestamp='new.timestamp')}
+                                WHERE entryid = new.entryid;
+                            END;''')
+        self.cur.execute(f'''CREATE TRIGGER entries_timestamp_us_update AFTER UPDATE OF timestamp ON entries BEGIN
+                                UPDATE entries SET timestamp_us = {self.EPOCH_US_SQL.format(timestamp='new.timestamp')}
+                                WHERE entryid = new.entryid;
+                            END;''')
+
+        # Range filters and ordering now use the integer column, so the text indexes only cost writes
+        self.cur.execute("DROP INDEX IF EXISTS entries_timestamp")
+        self.cur.execute("DROP INDEX IF EXISTS entries_categoryid_timestamp")
+        self.cur.execute("CREATE INDEX entries_timestamp_us ON entries (timestamp_us)")
+        self.cur.execute("CREATE INDEX entries_categoryid_timestamp_us ON entries (categoryid, timestamp_us)")
+
+    def _migration_archives(self) -> None:
+        """Schema version 7: record the per-year archive databases that entries have been moved into.
+        """
+
+        # Each archive holds entries with timestamp_us in [start_us, end_us), none with an entryid above max_entryid
+        self.cur.execute('''CREATE TABLE archives (
+                            year INTEGER PRIMARY KEY,
+                            start_us INTEGER,
+                            end_us INTEGER,
+                            max_entryid INTEGER
+                            );''')
+
+    def _migration_calendar_next_occurrence(self) -> None:
+        """Schema version 8: record and index each calendar item's next occurrence, so upcoming items are found quickly.
+        """
+
+        # First occurrence at or after the time it was last computed, or NULL once an item will not occur again
+        self.cur.execute("ALTER TABLE calendar ADD COLUMN next_us INTEGER")
+        now = datetime.datetime.now()
+        next_times = []
+        for rowid, target, frequency in self.cur.execute("SELECT rowid, target, frequency FROM calendar").fetchall():
+            try:
+                next_time = next_occurrence(datetime.datetime.fromisoformat(target), parse_frequency(frequency), now)
+            except (TypeError, ValueError):
+                logging.warning("Calendar item %d has an invalid target '%s' or frequency '%s'", rowid, target, frequency)
+                continue
+            next_times.append((to_epoch_us(next_time) if next_time else None, rowid))
+        self.cur.executemany("UPDATE calendar SET next_us = ? WHERE rowid = ?", next_times)
+        self.cur.execute("CREATE INDEX calendar_next_us ON calendar (next_us)")
+
+    def _migration_entry_sequence(self) -> None:
+        """Schema version 9: record the highest id of any deleted or archived entry, so that it is never given again.
+        """
+
+        # SQLite would otherwise give a new entry the id after the highest still in 'entries'
+        self.cur.execute("CREATE TABLE entry_sequence (last_entryid INTEGER NOT NULL)")
+        self.cur.execute('''INSERT INTO entry_sequence (last_entryid)
+                            SELECT IFNULL((SELECT MAX(max_entryid) FROM archives), 0)''')
+        # Archiving deletes entries too. Only needs to run on deletion, as inserts never go below MAX(entryid)
+        self.cur.execute('''CREATE TRIGGER entries_sequence_delete AFTER DELETE ON entries
+                            WHEN old.entryid > (SELECT last_entryid FROM entry_sequence) BEGIN
+                                UPDATE entry_sequence SET last_entryid = old.entryid;
+                            END;''')
+
+    def _migration_calendar_finished_items(self) -> None:
+        """Schema version 10: give calendar items which will not occur again a next_us of NEVER_US.
+
+        NULL then only marks items whose next occurrence has not been computed, such as those added by older versions.
+        """
+
+        now = datetime.datetime.now()
+        next_times = []
+        for rowid, target, frequency in self.cur.execute(
+                "SELECT rowid, target, frequency FROM calendar WHERE next_us IS NULL").fetchall():
+            try:
+                next_times.append((next_occurrence_us(datetime.datetime.fromisoformat(target),
+                                                      parse_frequency(frequency), now), rowid))
+            except (TypeError, ValueError):
+                logging.warning("Calendar item %d has an invalid target '%s' or frequency '%s'", rowid, target, frequency)
+        self.cur.executemany("UPDATE calendar SET next_us = ? WHERE rowid = ?", next_times)
+
+    # Schema migrations, in order. The database's user_version is the number of migrations applied to it.
+    MIGRATIONS = (
+        _migration_indexes,
+        _migration_full_text_index,
+        _migration_imports,
+        _migration_exports,
+        _migration_daily_stats,
+        _migration_epoch_timestamps,
+        _migration_archives,
+        _migration_calendar_next_occurrence,
+        _migration_entry_sequence,
+        _migration_calendar_finished_items,
+    )
+
+    @timed
+    def rebuild_text_index(self) -> None:
+        """Rebuild the full-text index from the contents of 'entries'.
+
+        Run automatically when the index is first created; only needed again if entries were edited
+        by a program that bypassed the synchronisation triggers.
+        """
+
+        with self.connections.write() as con:
+            con.execute("INSERT INTO entries_fts (entries_fts) VALUES ('rebuild')")
+            con.commit()
+
+    @timed
+    def rebuild_stats(self) -> None:
+        """Recompute the daily_stats table from the contents of 'entries'.
+
+        Only needed if entries were edited by a program that bypassed the maintenance triggers.
+        """
+
+        with self.connections.write() as con:
+            try:
+                con.execute("DELETE FROM daily_stats")
+                con.execute(self.DAILY_STATS_BACKFILL_SQL)
+                con.commit()
+            except Exception:
+                con.rollback()
+                raise
+
+    # SQL expression grouping daily_stats rows, by get_stats 'group_by' key
+    STATS_GROUPINGS = {
+        "day": "date",
+        "week": "strftime('%Y-W%W', date)",
+        "month": "substr(date, 1, 7)",
+        "year": "substr(date, 1, 4)",
+        "category": "categoryid",
+    }
+
+    @timed
+    def get_stats(self, start_date=None, end_date=None, group_by=("day",)) -> list:
+        """Return entry, character and word totals for entries between start_date and end_date inclusive.
+
+        'group_by' is a sequence of keys from STATS_GROUPINGS, e.g. ("month", "category"); an empty sequence
+        gives grand totals. Returns a list of tuples holding one value per grouping key,
+        then the number of entries, characters and words, in order of the grouping keys.
+        Served from the trigger-maintained daily_stats table, so the cost depends on the number of days, not entries.
+        """
+
+        self.flush()
+
+        if isinstance(group_by, str):
+            group_by = (group_by,)
+        for key in group_by:
+            if key not in self.STATS_GROUPINGS:
+                raise ValueError(f"Cannot group statistics by '{key}', expected one of {', '.join(self.STATS_GROUPINGS)}")
+        groupings = [self.STATS_GROUPINGS[key] for key in group_by]
+
+        conditions = []
+        values = []
+        if start_date:
+            conditions.append("date >= ?")
+            values.append(start_date.isoformat())
+        if end_date:
+            conditions.append("date <= ?")
+            values.append(end_date.isoformat())
+
+        statement = f"""SELECT {"".join(grouping + ", " for grouping in groupings)}
+                               SUM(entries), SUM(characters), SUM(words)
+                        FROM daily_stats
+                        {("WHERE " + " AND ".join(conditions)) if conditions else ""}"""
+        if groupings:
+            statement += f" GROUP BY {', '.join(groupings)} ORDER BY {', '.join(groupings)}"
+        with self.connections.read() as con:
+            rows = con.execute(statement, values).fetchall()
+        # Grand totals over no rows come back as a single row of NULLs
+        return [row for row in rows if row[-3] is not None]
+
+    @timed
+    def todo_list_get(self) -> list:
+        """Obtain all to-do items as (rowid, timestamp, description), oldest first.
+        """
+
+        statement = "SELECT rowid, timestamp, description FROM todo ORDER BY rowid"
+        with self.connections.read() as con:
+            return con.execute(statement).fetchall()
+
+    @timed
+    def todo_list_add(self, text: str) -> int:
+        """Add a to-do list item consisting of the given text, returning its rowid.
         """
 
         statement = "INSERT INTO todo VALUES (?, ?)"
         values = (self.get_timestamp(), text)
 
-        self.cur.execute(statement, values)
-        self.con.commit()
+        with self.connections.write() as con:
+            rowid = con.execute(statement, values).lastrowid
+            con.commit()
+        return rowid
 
+    @timed
     def todo_list_remove(self, rowid: int) -> None:
         """Remove the to-do list item at rowid 'rowid'.
         """
@@ -140,15 +1168,228 @@ class Diary:
         statement = "DELETE FROM todo WHERE rowid = ?"
         values = (rowid, )
 
-        self.cur.execute(statement, values)
-        self.con.commit()
+        with self.connections.write() as con:
+            con.execute(statement, values)
+            con.commit()
+
+    @timed
+    def add_calendar_item(self, description: str, target: datetime.datetime, frequency="") -> int:
+        """Add a reminder or appointment due at 'target', returning its rowid.
+
+        'frequency' is empty for a one-off item, or one of NAMED_FREQUENCIES or an interval such as "3 days" for
+        items which recur. Raises a ValueError if the frequency is not understood.
+        """
+
+        next_us = next_occurrence_us(target, parse_frequency(frequency), datetime.datetime.now())
+        statement = "INSERT INTO calendar (timestamp, description, target, frequency, next_us) VALUES (?, ?, ?, ?, ?)"
+        values = (self.get_timestamp(), description, target.isoformat(sep=' '), frequency, next_us)
+
+        with self.connections.write() as con:
+            rowid = con.execute(statement, values).lastrowid
+            con.commit()
+        return rowid
 
-    def get_calendar_this_week(self) -> sqlite3.Cursor:
-        """Returns a list of tuples corresponding to (time, content) of calendar items.
+    @timed
+    def remove_calendar_item(self, rowid: int) -> None:
+        """Remove the calendar item at rowid 'rowid'.
         """
 
-        return self.cur.execute('''SELECT * from calendar''')
+        with self.connections.write() as con:
+            con.execute("DELETE FROM calendar WHERE rowid = ?", (rowid, ))
+            con.commit()
+
+    @timed
+    def get_calendar(self, start=None, end=None) -> list:
+        """Return (time, description, rowid) for each occurrence of a calendar item in [start, end), in time order.
+
+        'start' defaults to now, and 'end' to CALENDAR_WINDOW_DAYS after 'start'. Windows starting from now onwards
+        only read the items whose next occurrence is before 'end', through an index; earlier windows read every item.
+        Items without a next occurrence, as added by other programs, are always read, and given one.
+        """
+
+        now = datetime.datetime.now()
+        start = start or now
+        end = end or start + datetime.timedelta(days=self.CALENDAR_WINDOW_DAYS)
+
+        with self.connections.read() as con:
+            if start >= now:
+                # Each next_us was computed at or before now, so it is no later than any occurrence in the window
+                rows = con.execute('''SELECT rowid, description, target, frequency, next_us FROM calendar
+                                      WHERE next_us < ? OR next_us IS NULL''', (to_epoch_us(end), )).fetchall()
+            else:
+                rows = con.execute("SELECT rowid, description, target, frequency, next_us FROM calendar").fetchall()
+
+        items = []
+        passed = []
+        now_us = to_epoch_us(now)
+        for rowid, description, target, frequency, next_us in rows:
+            try:
+                target_time = datetime.datetime.fromisoformat(target)
+                recurrence = parse_frequency(frequency)
+            except (TypeError, ValueError):
+                logging.warning("Skipping calendar item %d with invalid target '%s' or frequency '%s'",
+                                rowid, target, frequency)
+                continue
+            items.extend((occurrence, description, rowid)
+                         for occurrence in occurrences(target_time, recurrence, start, end))
+            if next_us is None or next_us < now_us:
+                passed.append((next_occurrence_us(target_time, recurrence, now), rowid))
+
+        if passed:
+            # Move items whose next occurrence has gone by, or was never computed, to their following one,
+            # so the index keeps skipping them
+            with self.connections.write() as con:
+                con.executemany("UPDATE calendar SET next_us = ? WHERE rowid = ?", passed)
+                con.commit()
+
+        items.sort()
+        return items
+
+    def get_calendar_this_week(self) -> list:
+        """Return (time, description, rowid) for each occurrence of a calendar item over the coming week, in time order.
+        """
+
+        return self.get_calendar()
+
+    def get_archive_file(self, year: int) -> Path:
+        """Return the path of the archive database holding entries from 'year'.
+        """
+
+        return Path(self.archive_directory, f"{int(year)}.db")
+
+    def get_archive_years(self, start_us=None, end_us=None, above_rowid=None) -> list:
+        """Return the years of archives overlapping the time range [start_us, end_us), newest first.
+
+        If 'above_rowid' is given, only archives holding an entry with a higher rowid are returned.
+        """
+
+        statement = '''SELECT year FROM archives WHERE end_us > ? AND start_us < ? AND max_entryid > ?
+                       ORDER BY year DESC'''
+        values = (start_us if start_us is not None else -2 ** 63,
+                  end_us if end_us is not None else 2 ** 63 - 1,
+                  above_rowid if above_rowid is not None else -1)
+        with self.connections.read() as con:
+            return [year for year, in con.execute(statement, values)]
+
+    @contextmanager
+    def __attach_archive(self, con: sqlite3.Connection, year: int, read_only=True) -> Iterator[str]:
+        """Attach the archive database for 'year' to 'con' for the duration of the 'with' block, yielding its schema name.
+        """
+
+        schema = f"archive_{int(year)}"
+        archive_file = self.get_archive_file(year)
+        if read_only:
+            # Read connections are opened as URIs, so ATTACH accepts URIs on them too
+            con.execute(f"ATTACH DATABASE ? AS {schema}", (f"{archive_file.resolve().as_uri()}?mode=ro",))
+        else:
+            con.execute(f"ATTACH DATABASE ? AS {schema}", (str(archive_file),))
+        try:
+            yield schema
+        finally:
+            if con.in_transaction:
+                con.rollback()
+            con.execute(f"DETACH DATABASE {schema}")
+
+    @contextmanager
+    def __read_partition(self, year=None) -> Iterator[tuple]:
+        """Check out a read connection for the 'with' block, yielding (connection, schema name) to query entries from.
+
+        Without a 'year' the schema is the main database; otherwise that year's archive is attached for the block only.
+        """
+
+        with self.connections.read() as con:
+            if year is None:
+                yield con, "main"
+            else:
+                with self.__attach_archive(con, year) as schema:
+                    yield con, schema
+
+    @staticmethod
+    def __populate_archive(con: sqlite3.Connection, schema: str) -> None:
+        """Create the tables of the archive database attached as 'schema', if they do not exist yet.
+
+        Archives hold entries as the main database does, with their own indexes and full-text index.
+        """
+
+        con.execute(f'''CREATE TABLE IF NOT EXISTS {schema}.entries (
+                        entryid INTEGER PRIMARY KEY,
+                        timestamp TEXT,
+                        entry TEXT,
+                        categoryid INTEGER,
+                        timestamp_us INTEGER
+                        );''')
+        con.execute(f"CREATE INDEX IF NOT EXISTS {schema}.entries_timestamp_us ON entries (timestamp_us)")
+        con.execute(f'''CREATE INDEX IF NOT EXISTS {schema}.entries_categoryid_timestamp_us
+                        ON entries (categoryid, timestamp_us)''')
+        con.execute(f'''CREATE VIRTUAL TABLE IF NOT EXISTS {schema}.entries_fts USING fts5(
+                        entry,
+                        content='entries',
+                        content_rowid='entryid',
+                        prefix='2 3'
+                        );''')
+        con.execute(f'''CREATE TRIGGER IF NOT EXISTS {schema}.entries_fts_insert AFTER INSERT ON entries BEGIN
+                            INSERT INTO entries_fts (rowid, entry) VALUES (new.entryid, new.entry);
+                        END;''')
+        con.execute(f'''CREATE TRIGGER IF NOT EXISTS {schema}.entries_fts_delete AFTER DELETE ON entries BEGIN
+                            INSERT INTO entries_fts (entries_fts, rowid, entry) VALUES ('delete', old.entryid, old.entry);
+                        END;''')
+
+    @timed
+    def archive_entries(self, older_than_days=ARCHIVE_AGE_DAYS) -> int:
+        """Move entries older than 'older_than_days' days out of the main database into per-year archive databases.
+
+        Archived entries keep their rowids and remain visible to every query method, but each archive is only opened
+        by queries whose date range overlaps its year. New entries are never given the rowid of an archived one,
+        as entry_sequence records the highest id moved. Statistics still count archived entries. Returns the number of entries moved.
+        """
 
+        self.flush()
+        cutoff = datetime.date.today() - datetime.timedelta(days=older_than_days)
+        cutoff_us = to_epoch_us(cutoff)
+
+        with self.connections.read() as con:
+            years = [int(year) for year, in con.execute(
+                "SELECT DISTINCT substr(timestamp, 1, 4) FROM entries WHERE timestamp_us < ?", (cutoff_us,))]
+
+        moved = 0
+        for year in years:
+            year_start = datetime.date(year, 1, 1)
+            year_end = datetime.date(year + 1, 1, 1)
+            values = (to_epoch_us(year_start), min(to_epoch_us(year_end), cutoff_us))
+            selection = "FROM main.entries WHERE timestamp_us >= ? AND timestamp_us < ?"
+
+            self.archive_directory.mkdir(exist_ok=True)
+            with self.connections.write() as con, self.__attach_archive(con, year, read_only=False) as schema:
+                # The main database uses write-ahead logging, so a transaction spanning both files is not atomic.
+                # Copy first and delete second: an interruption in between leaves entries in both places,
+                # which the next run resolves, rather than losing them.
+                con.execute("BEGIN")
+                self.__populate_archive(con, schema)
+                con.execute(f'''INSERT OR IGNORE INTO {schema}.entries (entryid, timestamp, timestamp_us, entry, categoryid)
+                                SELECT entryid, timestamp, timestamp_us, entry, categoryid {selection}''', values)
+                con.commit()
+
+                # The delete triggers take the entries out of the full-text index and statistics.
+                # Statistics cover the whole diary, so put back the totals of the days affected.
+                con.execute("BEGIN")
+                con.execute("CREATE TEMP TABLE IF NOT EXISTS archived_stats AS SELECT * FROM daily_stats WHERE 0")
+                con.execute("DELETE FROM temp.archived_stats")
+                con.execute("INSERT INTO temp.archived_stats SELECT * FROM daily_stats WHERE date >= ? AND date < ?",
+                            (year_start.isoformat(), min(year_end, cutoff).isoformat()))
+                count = con.execute(f"DELETE {selection}", values).rowcount
+                con.execute("INSERT OR REPLACE INTO daily_stats SELECT * FROM temp.archived_stats")
+                # Only the part of the year before the cutoff is archived, so recent queries never open the archive
+                con.execute(f'''INSERT INTO archives (year, start_us, end_us, max_entryid)
+                                SELECT ?, ?, ?, MAX(entryid) FROM {schema}.entries WHERE true
+                                ON CONFLICT (year) DO UPDATE SET end_us = MAX(end_us, excluded.end_us),
+                                                                 max_entryid = MAX(max_entryid, excluded.max_entryid)''',
+                            (year, *values))
+                con.commit()
+            logging.info("Archived %d entries from %d", count, year)
+            moved += count
+        return moved
+
+    @timed
     def delete_entries(self, ids: list) -> None:
         """Delete entries with rowids corresponding to {ids}.
 
@@ -156,189 +1397,486 @@ class Diary:
         External modules calling this should always confirm that the deletion is intended.
         """
 
-        id_strings = [str(id) for id in ids]
-        self.cur.execute(f"DELETE FROM entries WHERE rowid IN ( {','.join(id_strings)} )")
-        self.con.commit()
+        self.flush()
+        ids = [int(id) for id in ids]
+        placeholders = ','.join('?' * len(ids))
+        with self.connections.write() as con:
+            deleted = con.execute(f"DELETE FROM entries WHERE rowid IN ( {placeholders} )", ids).rowcount
+            con.commit()
+
+        # Look for the rest in the archives
+        if ids and deleted < len(ids):
+            for year in self.get_archive_years(above_rowid=min(ids) - 1):
+                with self.connections.write() as con, self.__attach_archive(con, year, read_only=False) as schema:
+                    # Archives have no statistics triggers, so take their entries off the main totals here
+                    con.execute("BEGIN")
+                    con.execute(f'''INSERT INTO daily_stats (date, categoryid, entries, characters, words)
+                                    SELECT substr(timestamp, 1, 10), coalesce(categoryid, 0), -COUNT(*),
+                                           -SUM(length(entry)), -SUM({self.WORD_COUNT_SQL.format(text="entry")})
+                                    FROM {schema}.entries WHERE entryid IN ( {placeholders} ) GROUP BY 1, 2
+                                    ON CONFLICT (date, categoryid) DO UPDATE SET
+                                        entries = entries + excluded.entries,
+                                        characters = characters + excluded.characters,
+                                        words = words + excluded.words''', ids)
+                    con.execute("DELETE FROM daily_stats WHERE entries <= 0")
+                    con.execute(f"DELETE FROM {schema}.entries WHERE entryid IN ( {placeholders} )", ids)
+                    con.commit()
 
 
-    def get_entries(self, **filters) -> sqlite3.Cursor:
-        """Return Diary entries according to filters specified in arguments.
+    @staticmethod
+    def text_match_query(text: str, whole_word=False) -> str:
+        """Convert free search text into an FTS5 MATCH expression.
 
-        If days_ago is given, the entries returned will be from the day {days_ago} days ago.
-        e.g. if days_ago == 0, today's entries will be returned. if 1, yesterday's will be returned.
+        Every word of 'text' must appear in a matching entry. Words are matched as prefixes unless whole_word is True.
+        """
 
-        If 'since' is also True when days_ago is specified, all entries AFTER this date will be returned.
+        terms = ['"' + term.replace('"', '""') + '"' + ("" if whole_word else "*") for term in text.split()]
+        return " AND ".join(terms)
 
-        If 'print_count' or 'count' is given, only the latest {print_count} relevant entries will be returned, still in chronological order.
-        """
+    @staticmethod
+    def entry_time_range(filters: dict) -> tuple:
+        """Convert the date filters of get_entries-style filters into a half-open range of microseconds since the epoch.
 
-        MAXIMUM_ENTRIES_RETURNED = 1000
-        DEFAULT_ENTRIES_RETURNED = 200
+        Returns (start_us, end_us), either of which is None if unbounded.
+        """
 
         filters = defaultdict(lambda: None, filters)
 
         days_ago = filters["days_ago"]
         since = filters["since"]
-        count =  filters["print_count"] or filters["count"] or DEFAULT_ENTRIES_RETURNED
-        try:
-            count = min(MAXIMUM_ENTRIES_RETURNED, int(count))
-        except ValueError:
-            count = DEFAULT_ENTRIES_RETURNED
-
-        categoryid = filters["categoryid"]
         start_date = filters["start_date"]
         end_date = filters["end_date"]
-        text = filters["text"]
 
-        # Restrict timestamps
-        start_date_iso = ""
-        end_date_iso = ""
-        end_filter_syntax = " timestamp < ?"
+        start_us = None
+        end_us = None
         if days_ago is not None:
             # days_ago can be 0, which is falsy
-            start_date_iso = (datetime.datetime.now.date() - datetime.timedelta(days=days_ago)).isoformat()
+            start = datetime.date.today() - datetime.timedelta(days=days_ago)
+            start_us = to_epoch_us(start)
             if since:
-                end_date_iso = (datetime.datetime.now.date() + datetime.timedelta(days=1)).isoformat()
+                end_us = to_epoch_us(datetime.date.today() + datetime.timedelta(days=1))
             else:
-                end_date_iso = start_date_iso
+                end_us = to_epoch_us(start + datetime.timedelta(days=1))
         else:
             if start_date:
-                start_date_iso = start_date.isoformat()
+                start_us = to_epoch_us(start_date)
             if end_date:
-                end_date_iso = (end_date + datetime.timedelta(days=1)).isoformat()
+                end_us = to_epoch_us(end_date + datetime.timedelta(days=1))
             elif start_date and not since:
-                end_filter_syntax = " timestamp LIKE ?"
-                end_date_iso = start_date_iso + "%"
+                end_us = to_epoch_us(start_date + datetime.timedelta(days=1))
+        return start_us, end_us
+
+    def build_entry_filters(self, filters: dict, schema="main") -> tuple:
+        """Convert get_entries-style filters into a list of SQL conditions on 'entries' and their bound values.
 
+        Text filters are resolved against the full-text index of 'schema' rather than scanning entry text.
+        """
+
+        start_us, end_us = self.entry_time_range(filters)
+        filters = defaultdict(lambda: None, filters)
 
+        categoryid = filters["categoryid"]
+        # Blank text, e.g. only whitespace, makes an empty MATCH expression, so it does not filter at all
+        text = self.text_match_query(filters["text"] or "")
+        word = self.text_match_query(filters["word"] or "", whole_word=True)
+        after_rowid = filters["after_rowid"]
+
+        text_match_statement = f"entries.rowid IN (SELECT rowid FROM {schema}.entries_fts WHERE entries_fts MATCH ?)"
         filter_expressions = (
-                (categoryid is not None, " categoryid = ?", categoryid),
-                (start_date_iso, " timestamp >= ?", start_date_iso),
-                (end_date_iso, end_filter_syntax, end_date_iso),
-                (text, " entry LIKE ?", f"%{text}%"),
+                (categoryid is not None, "categoryid = ?", categoryid),
+                (start_us is not None, "timestamp_us >= ?", start_us),
+                (end_us is not None, "timestamp_us < ?", end_us),
+                (text, text_match_statement, text),
+                (word, text_match_statement, word),
+                (after_rowid is not None, "entries.rowid > ?", after_rowid),
         )
-        statement_filters = ""
+        conditions = []
         values = []
-        
         for condition, filter_extension, value in filter_expressions:
             if condition:
-                statement_filters += (" AND" if statement_filters else " WHERE") + filter_extension
+                conditions.append(filter_extension)
                 values.append(value)
+        return conditions, values
+
+    @timed
+    def get_entries(self, **filters) -> list:
+        """Return Diary entries according to filters specified in arguments.
+
+        If days_ago is given, the entries returned will be from the day {days_ago} days ago.
+        e.g. if days_ago == 0, today's entries will be returned. if 1, yesterday's will be returned.
+
+        If 'since' is also True when days_ago is specified, all entries AFTER this date will be returned.
+
+        If 'text' is given, only entries containing words starting with each word of 'text' are returned.
+        If 'word' is given, only entries containing each word of 'word' in full are returned.
+
+        If 'after_rowid' is given, only entries added after the entry with that rowid are returned.
 
-        if count:
-            statement_filters += " ORDER BY rowid DESC LIMIT ?"
-            values.append(count)
+        If 'print_count' or 'count' is given, only the latest {print_count} relevant entries will be returned.
 
-        full_statement = f"SELECT rowid, timestamp, entry, categoryid FROM entries{statement_filters}"
-        logging.info(f"{full_statement}")
+        Entries are ordered latest first. Archives are only searched if they overlap the date range,
+        and could hold one of the latest {print_count}.
+        Returns a list of Entry tuples.
+        """
+
+        self.flush()
+
+        MAXIMUM_ENTRIES_RETURNED = 1000
+        DEFAULT_ENTRIES_RETURNED = 200
+
+        count = filters.get("print_count") or filters.get("count") or DEFAULT_ENTRIES_RETURNED
         try:
-            result = self.cur.execute(full_statement, values)
-            return result
-        except sqlite3.OperationalError as e:
-            raise sqlite3.OperationalError(f"{e}\nOffending statement: {full_statement}\nValues: {values}\nReport to developer")
+            count = min(MAXIMUM_ENTRIES_RETURNED, int(count))
+        except ValueError:
+            count = DEFAULT_ENTRIES_RETURNED
 
-    def get_categories(self, contains="") -> sqlite3.Cursor:
-        """Get all categories.
+        start_us, end_us = self.entry_time_range(filters)
+        entries = self.__get_partition_entries(filters, count)
+        # Archives older than the latest {count} entries found so far can be skipped
+        if count and len(entries) >= count:
+            start_us = max(start_us or 0, entries[-1].timestamp_us)
+        for year in self.get_archive_years(start_us, end_us):
+            entries.extend(self.__get_partition_entries(filters, count, year))
+            entries.sort(key=lambda entry: (entry.timestamp_us, entry.rowid), reverse=True)
+            del entries[count:]
+        return entries
+
+    def __get_partition_entries(self, filters: dict, count: int, year=None) -> list:
+        """Run get_entries against the main database, or the archive for 'year'.
+        """
 
-        Returns a Cursor iterator that yields (categoryid:int, category:str) tuples
+        with self.__read_partition(year) as (con, schema):
+            conditions, values = self.build_entry_filters(filters, schema)
+            statement_filters = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+
+            if count:
+                # Matches the order of the timestamp indexes, so the latest {count} are read without sorting every match
+                statement_filters += " ORDER BY timestamp_us DESC, rowid DESC LIMIT ?"
+                values.append(count)
+
+            full_statement = f"SELECT {Entry.COLUMNS} FROM {schema}.entries{statement_filters}"
+            try:
+                return [Entry(*row) for row in con.execute(full_statement, values)]
+            except sqlite3.OperationalError as e:
+                raise sqlite3.OperationalError(f"{e}\nOffending statement: {full_statement}\nValues: {values}\nReport to developer")
+
+    @timed
+    def text_search(self, highlight=("[", "]"), **filters) -> list:
+        """Return the entries best matching the 'text' or 'word' filter, most relevant first.
+
+        Accepts the same filters as get_entries. Returns a list of Entry tuples,
+        whose 'entry' is an excerpt with matched words wrapped in the 'highlight' markers.
         """
 
-        statement = "SELECT categoryid, category FROM categories"
-        values = ()
-        if contains:
-            statement += f" WHERE category LIKE ?"
-            values = (f"%{contains}%",)
-        return self.cur.execute(statement, values)
+        self.flush()
+
+        match_terms = [self.text_match_query(filters.pop("text", None) or ""),
+                       self.text_match_query(filters.pop("word", None) or "", whole_word=True)]
+        match_terms = [terms for terms in match_terms if terms]
+        if not match_terms:
+            raise ValueError("text_search requires a non-blank 'text' or 'word' filter")
+
+        count = min(int(filters.get("print_count") or filters.get("count") or Diary.LIMIT_SEARCH_ROWS),
+                    Diary.LIMIT_SEARCH_ROWS)
+        opening, closing = highlight
+
+        # Results from archives are merged by rank, which each full-text index computes over its own entries only
+        ranked = []
+        for year in (None, *self.get_archive_years(*self.entry_time_range(filters))):
+            with self.__read_partition(year) as (con, schema):
+                conditions, values = self.build_entry_filters(filters, schema)
+                conditions.insert(0, "entries_fts MATCH ?")
+                values.insert(0, " AND ".join(match_terms))
+                full_statement = f"""SELECT entries.rowid, timestamp, snippet(entries_fts, 0, ?, ?, '...', 16), categoryid,
+                                            timestamp_us, rank
+                                     FROM {schema}.entries_fts JOIN {schema}.entries ON entries.rowid = entries_fts.rowid
+                                     WHERE {" AND ".join(conditions)}
+                                     ORDER BY rank LIMIT ?"""
+                ranked.extend(con.execute(full_statement, [opening, closing, *values, count]))
+        ranked.sort(key=lambda row: row[-1])
+        return [Entry(*row[:-1]) for row in ranked[:count]]
+
+    @timed
+    def iter_entries(self, page_size=ITERATION_PAGE_SIZE, descending=False, **filters) -> Iterator[tuple]:
+        """Yield every entry matching the filters, in chronological order unless 'descending'.
+
+        Accepts the same filters as get_entries, but with no limit on the number of entries.
+        Results are fetched {page_size} rows at a time by keyset pagination on (timestamp_us, rowid), using a separate
+        read connection for each page, so walking the whole diary costs constant memory and constant time per page,
+        and any number of iterations may be interleaved with each other and with other queries.
+        Archives overlapping the date range are read alongside the main database, and merged in order.
+        Yields Entry tuples, like get_entries.
+        """
+
+        self.flush()
+
+        partitions = [self.__iter_partition_entries(filters, page_size, descending, year)
+                      for year in (None, *self.get_archive_years(*self.entry_time_range(filters)))]
+        if len(partitions) == 1:
+            yield from partitions[0]
+        else:
+            yield from heapq.merge(*partitions, key=lambda entry: (entry.timestamp_us, entry.rowid), reverse=descending)
+
+    def __iter_partition_entries(self, filters: dict, page_size: int, descending: bool, year=None) -> Iterator[Entry]:
+        """Run iter_entries against the main database, or the archive for 'year'.
+        """
+
+        direction, comparison = ("DESC", "<") if descending else ("ASC", ">")
+
+        last_key = None
+        while True:
+            with self.__read_partition(year) as (con, schema):
+                page_conditions, page_values = self.build_entry_filters(filters, schema)
+                if last_key:
+                    page_conditions.append(f"(timestamp_us, entries.rowid) {comparison} (?, ?)")
+                    page_values.extend(last_key)
+                statement_filters = (" WHERE " + " AND ".join(page_conditions)) if page_conditions else ""
+                statement = f"""SELECT {Entry.COLUMNS} FROM {schema}.entries{statement_filters}
+                                ORDER BY timestamp_us {direction}, rowid {direction} LIMIT ?"""
+                page = [Entry(*row) for row in con.execute(statement, [*page_values, page_size])]
+
+            yield from page
+            if len(page) < page_size:
+                return
+            last_key = (page[-1].timestamp_us, page[-1].rowid)
+
+    @timed
+    def refresh_categories(self) -> None:
+        """Reload the in-memory category map from the categories table.
+        """
+
+        with self.connections.read() as con:
+            self.categories.load(con.execute("SELECT categoryid, category FROM categories").fetchall())
+
+    def get_categories(self, contains="", prefix="") -> list:
+        """Get all categories, optionally only those containing 'contains' or starting with 'prefix' (case-insensitive).
+
+        Returns a list of (categoryid:int, category:str) tuples, served from memory.
+        """
+
+        return self.categories.search(contains, prefix)
 
     def get_category_id(self, category: str) -> int:
         """Check whether category 'category' is in the table 'categories', and return its rowid if it is.
 
-        Returns 0 if the category does not exist.
+        Returns 0 if the category does not exist. Categories missing from memory, e.g. added by another process,
+        are looked up in the database.
         """
 
-        statement = "SELECT rowid, * FROM categories WHERE category = ?"
-        values = (category,)
+        if categoryid := self.categories.get_id(category):
+            return categoryid
+        with self.connections.read() as con:
+            row = con.execute("SELECT categoryid FROM categories WHERE category = ?", (category,)).fetchone()
+        if row is None:
+            return 0
+        self.categories.add(row[0], category)
+        return row[0]
+
+    def get_category_name(self, categoryid: int):
+        """Return the name of the category with rowid 'categoryid', or None if there is no such category.
+        """
 
-        category_list = list(self.cur.execute(statement, values))
-        try:
-            category_rowid = int(category_list[0][0])  # rowid of first result, or last insert rowid
-            return category_rowid
-        except IndexError:
-            return 0  # SQLite rowid starts from 1 -> we can safely use 0 to indicate 'no such row'
+        if (category := self.categories.get_name(categoryid)) is not None:
+            return category
+        with self.connections.read() as con:
+            row = con.execute("SELECT category FROM categories WHERE categoryid = ?", (categoryid,)).fetchone()
+        if row is None:
+            return None
+        self.categories.add(categoryid, row[0])
+        return row[0]
 
     def add_entry(self, text: str, category: str, timestamp="") -> None:
         """Add a new entry to the entries table.
 
         If the category does not exist, it will be added."""
 
-        if not timestamp:
-            timestamp = self.get_timestamp()
+        self.add_entries([(text, category, timestamp)])
+
+    def __entry_rows(self, entries: Iterable, commit_categories=False) -> Iterator[tuple]:
+        """Convert (text, category[, timestamp]) tuples into (timestamp, timestamp_us, entry, categoryid) rows for the entries table.
 
-        category_rowid = self.get_category_id(category)
-        if not category_rowid:
-            statement = "INSERT INTO categories (category) VALUES (?)"
-            values = (category,)
+        Categories which do not exist yet are inserted through the writer connection as they are encountered,
+        and committed immediately only if commit_categories is True.
+        """
 
-            self.cur.execute(statement, values)
+        for text, category, *timestamp in entries:
+            category_rowid = self.get_category_id(category)
+            if not category_rowid:
+                with self.connections.write() as con:
+                    # Another process may have added the category since it was looked up
+                    con.execute("INSERT INTO categories (category) VALUES (?) ON CONFLICT (category) DO NOTHING",
+                                (category,))
+                    category_rowid, = con.execute("SELECT categoryid FROM categories WHERE category = ?",
+                                                  (category,)).fetchone()
+                    if commit_categories:
+                        con.commit()
+                self.categories.add(category_rowid, category)
+            timestamp = timestamp[0] if timestamp and timestamp[0] else self.get_timestamp()
+            time = datetime.datetime.fromisoformat(timestamp) if isinstance(timestamp, str) else timestamp
+            if time.tzinfo:
+                # Stored in local time, like every other timestamp
+                time = time.astimezone().replace(tzinfo=None)
+                timestamp = time.isoformat(sep=' ')
+            yield timestamp, to_epoch_us(time), text, category_rowid
+
+    @timed
+    def add_entries(self, entries: Iterable) -> int:
+        """Add many entries to the entries table in a single transaction, returning the number added.
+
+        'entries' may be any iterable, including a generator, of (text, category) or (text, category, timestamp) tuples.
+        It is consumed lazily, so arbitrarily long streams are inserted in constant memory.
+        Categories which do not exist yet will be added. Entries without a timestamp are stamped with the current time.
+        """
 
-            statement = "SELECT last_insert_rowid()"
-            category_list = list(self.cur.execute(statement))
-            category_rowid = int(category_list[0][0])  # rowid of first result, or last insert rowid
+        start_time = time.perf_counter()
 
-        statement = "INSERT INTO entries (timestamp, entry, categoryid) VALUES (?, ?, ?)"
-        values = (timestamp, text, category_rowid)
-        self.cur.execute(statement, values)
-        self.con.commit()
+        if self.write_behind:
+            # Hand rows to the writer thread; blocks only while its queue is full.
+            # Entries are committed separately by the writer thread, so new categories must be committed right away
+            count = 0
+            for row in self.__entry_rows(entries, commit_categories=True):
+                self.__capacity.acquire()
+                self.__pending.put(row)
+                count += 1
+            return count
+
+        statement = self.INSERT_ENTRY_SQL
+        with self.connections.write() as con:
+            try:
+                with self.query_stats.bulk(con, statement):
+                    count = con.executemany(statement, self.__entry_rows(entries)).rowcount
+                con.commit()
+            except Exception:
+                con.rollback()
+                # Forget any categories whose insertion was just rolled back
+                self.refresh_categories()
+                raise
+
+        elapsed = time.perf_counter() - start_time
+        if count > 1:
+            logging.info("Added %d entries in %.3fs (%.0f rows/s)", count, elapsed, count / max(elapsed, 1e-9))
+        return count
+
+    @timed
+    def get_import_position(self, source: str) -> int:
+        """Return the number of records of import source 'source' already processed, 0 if it was never imported.
+        """
 
-    def entry_search(self, start_time="", end_time="", category="", text="") -> sqlite3.Cursor:
+        with self.connections.read() as con:
+            rows = con.execute("SELECT position FROM imports WHERE source = ?", (source,)).fetchall()
+        return rows[0][0] if rows else 0
+
+    @timed
+    def get_export_position(self, name: str) -> int:
+        """Return the highest entry rowid written by incremental export 'name', 0 if it never ran.
+        """
+
+        with self.connections.read() as con:
+            rows = con.execute("SELECT last_rowid FROM exports WHERE name = ?", (name,)).fetchall()
+        return rows[0][0] if rows else 0
+
+    @timed
+    def set_export_position(self, name: str, last_rowid: int) -> None:
+        """Record that incremental export 'name' has written every entry up to rowid 'last_rowid'.
+        """
+
+        with self.connections.write() as con:
+            con.execute('''INSERT INTO exports (name, last_rowid) VALUES (?, ?)
+                           ON CONFLICT (name) DO UPDATE SET last_rowid = excluded.last_rowid''', (name, last_rowid))
+            con.commit()
+
+    @timed
+    def import_entries(self, source: str, position: int, entries: list) -> int:
+        """Add a batch of imported entries, skipping any imported before, and return the number added.
+
+        'entries' is a list of (content_hash, text, category, timestamp) tuples; entries whose content hash has been
+        imported before, from any source, are skipped. 'position' is the number of records of 'source' processed once
+        this batch is added. Both are recorded in the same transaction as the entries, so an interrupted import can
+        resume from get_import_position without duplicating or losing entries.
+        """
+
+        statement = self.INSERT_ENTRY_SQL
+        with self.connections.write() as con:
+            try:
+                new_entries = [(text, category, timestamp) for content_hash, text, category, timestamp in entries
+                               if con.execute("INSERT OR IGNORE INTO imported_hashes (hash) VALUES (?)",
+                                              (content_hash,)).rowcount]
+                with self.query_stats.bulk(con, statement):
+                    count = con.executemany(statement, self.__entry_rows(new_entries)).rowcount if new_entries else 0
+                con.execute('''INSERT INTO imports (source, position) VALUES (?, ?)
+                               ON CONFLICT (source) DO UPDATE SET position = excluded.position''', (source, position))
+                con.commit()
+            except Exception:
+                con.rollback()
+                self.refresh_categories()
+                raise
+        return count
+
+    @timed
+    def entry_search(self, start_time="", end_time="", category="", text="") -> list:
         """Obtain a subset of entries, filtered by at least a start/end time, category, or text contents.
 
+        Start and end times are ISO timestamps, inclusive; a ValueError is raised if either is malformed.
+        Returns a list of Entry tuples.
         """
 
-        # Build the statement
-        full_statement = f"""SELECT rowid, timestamp, entry FROM entries WHERE """
+        self.flush()
+
+        # Build the statement, for the main database and each archive
+        full_statement = f"""SELECT {Entry.COLUMNS} FROM {{schema}}.entries WHERE """
         values = {}
         need_and = False
 
         # Start / end time component
         if start_time or end_time:
             if start_time and end_time:
-                time_condition = f'timestamp BETWEEN :start_time AND :end_time'
-                values["start_time"] = start_time
-                values["end_time"] = end_time
+                time_condition = f'timestamp_us BETWEEN :start_time AND :end_time'
+                values["start_time"] = to_epoch_us(start_time)
+                values["end_time"] = to_epoch_us(end_time)
             elif start_time:
-                time_condition = f'timestamp >= :start_time'
-                values["start_time"] = start_time
+                time_condition = f'timestamp_us >= :start_time'
+                values["start_time"] = to_epoch_us(start_time)
             else:
-                time_condition = f'timestamp <= :end_time'
-                values["end_time"] = end_time
+                time_condition = f'timestamp_us <= :end_time'
+                values["end_time"] = to_epoch_us(end_time)
             full_statement += time_condition
             need_and = True
 
         if category:
             # Get categoryid of category
-            category_id_statement = 'SELECT categoryid FROM categories WHERE category = :category'
-            values = {"category": category}
-            try:
-                categoryid = list(self.cur.execute(category_id_statement, values))[0][0]
+            if categoryid := self.get_category_id(category):
                 category_condition = f"categoryid = :categoryid"
                 values["categoryid"] = categoryid
                 if need_and:
                     full_statement += " AND "
                 full_statement += category_condition
                 need_and = True
-            except IndexError:
-                logging.error(f"entry_search called with non-null invalid category {category}, this should be caught sooner")
+            else:
+                logging.error("entry_search called with non-null invalid category %s, this should be caught sooner", category)
 
-        if text:
+        if text_query := self.text_match_query(text):
             if need_and:
                 full_statement += " AND "
-            text_condition = 'entry LIKE :text'
-            values["text"] = f"%{text}%"
+            text_condition = 'entries.rowid IN (SELECT rowid FROM {schema}.entries_fts WHERE entries_fts MATCH :text)'
+            values["text"] = text_query
             full_statement += text_condition
+            need_and = True
 
-        full_statement += f" LIMIT {Diary.LIMIT_SEARCH_ROWS}"
-        return self.cur.execute(full_statement, values)
+        if not need_and:
+            full_statement += "true"  # Every filter was blank
+        full_statement += " LIMIT :limit"
+
+        # Only archives overlapping the time range are searched; end_time is inclusive
+        start_us = values.get("start_time")
+        end_us = values["end_time"] + 1 if "end_time" in values else None
+        entries = []
+        for year in (None, *self.get_archive_years(start_us, end_us)):
+            if len(entries) >= Diary.LIMIT_SEARCH_ROWS:
+                break
+            values["limit"] = Diary.LIMIT_SEARCH_ROWS - len(entries)
+            with self.__read_partition(year) as (con, schema):
+                entries.extend(Entry(*row) for row in con.execute(full_statement.format(schema=schema), values))
+        return entries
 
     @staticmethod
     def get_timestamp() -> str:
@@ -0,0 +1,202 @@
+from collections import deque
+import concurrent.futures
+import csv
+import datetime
+import hashlib
+from itertools import islice
+import json
+import logging
+import os
+from pathlib import Path
+import re
+import time
+from typing import Iterator
+
+import diary
+
+FORMATS = diary.IMPORT_FORMATS
+BATCH_SIZE = diary.IMPORT_BATCH_SIZE
+
+# A plain-text journal record starts with a line beginning with a date, optionally followed by a time,
+# a [category], and the first line of the entry. Lines not starting with a date continue the previous record.
+TEXT_RECORD_START = re.compile(r"^\d{4}-\d{2}-\d{2}(?!\d)")
+TEXT_RECORD = re.compile(r'''
+    ^(\d{4}-\d{2}-\d{2})                        # Date
+    (?:[ T](\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?))?  # Optional time
+    [ \t]*(?:\[([^\]\n]*)\])?                     # Optional category
+    [ \t]*(.*)$                                   # Entry text, possibly over several lines
+''', re.VERBOSE | re.DOTALL)
+
+
+def detect_format(path: Path) -> str:
+    """Guess the format of an import file from its extension, defaulting to a plain-text journal.
+    """
+
+    suffix = path.suffix.lower()
+    if suffix in [".jsonl", ".ndjson", ".json"]:
+        return "jsonl"
+    if suffix == ".csv":
+        return "csv"
+    return "text"
+
+
+def read_records(path: Path, file_format: str) -> Iterator:
+    """Lazily yield the raw, unparsed records of an import file.
+
+    Records are lines for JSONL, row dictionaries for CSV, and blocks of lines for plain-text journals.
+    """
+
+    with open(path, mode='r', encoding='utf-8', newline='' if file_format == "csv" else None) as f:
+        if file_format == "jsonl":
+            for line in f:
+                if line.strip():
+                    yield line
+        elif file_format == "csv":
+            yield from csv.DictReader(f)
+        else:
+            record = []
+            for line in f:
+                if TEXT_RECORD_START.match(line):
+                    if record:
+                        yield "".join(record)
+                    record = [line]
+                elif record:
+                    record.append(line)
+                elif line.strip():
+                    logging.warning("Skipping undated line before the first entry of %s: %s", path, line.strip())
+            if record:
+                yield "".join(record)
+
+
+def normalise_timestamp(timestamp: str) -> str:
+    """Convert an ISO 8601 timestamp into the format stored by Diary, in local time.
+
+    Raises a ValueError if the timestamp is not valid ISO 8601.
+    """
+
+    if not timestamp:
+        return ""  # Stamped with the time of import by Diary
+    parsed = datetime.datetime.fromisoformat(timestamp.strip())
+    if parsed.tzinfo:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.isoformat(sep=' ')
+
+
+def parse_record(file_format: str, record, default_category: str) -> tuple:
+    """Parse one raw record into a (text, category, timestamp) tuple.
+
+    Raises a ValueError if the record is malformed.
+    """
+
+    if file_format == "text":
+        match = TEXT_RECORD.match(record)
+        if not match:
+            raise ValueError("record does not start with a date")
+        date, time_of_day, category, text = match.groups()
+        timestamp = f"{date} {time_of_day or '00:00'}"
+    else:
+        fields = json.loads(record) if file_format == "jsonl" else record
+        if not isinstance(fields, dict):
+            raise ValueError("record is not an object")
+        text = fields.get("text", fields.get("entry"))
+        category = fields.get("category")
+        timestamp = fields.get("timestamp") or ""
+        if not isinstance(text, str):
+            raise ValueError("record has no 'text' or 'entry' field")
+
+    text = text.strip()
+    if not text:
+        raise ValueError("record has no text")
+    return text, (category or "").strip() or default_category, normalise_timestamp(timestamp)
+
+
+def parse_records(file_format: str, records: list, default_category: str) -> tuple:
+    """Parse a chunk of raw records. Runs in a worker process.
+
+    Returns a list of (content_hash, text, category, timestamp) tuples ready for Diary.import_entries,
+    and a list of (error, record) pairs for the malformed records that were skipped.
+    Worker processes do not share the parent's log handlers, so the parent logs the skipped records.
+    """
+
+    entries = []
+    skipped = []
+    for record in records:
+        try:
+            text, category, timestamp = parse_record(file_format, record, default_category)
+        except ValueError as e:
+            skipped.append((str(e), record))
+            continue
+        content_hash = hashlib.sha256(f"{timestamp}\x1f{category}\x1f{text}".encode('utf-8')).hexdigest()
+        entries.append((content_hash, text, category, timestamp))
+    return entries, skipped
+
+
+def chunks(iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def import_file(handler, path: Path, file_format=None, default_category=diary.DEFAULT_CATEGORY,
+                workers=None, batch_size=BATCH_SIZE) -> int:
+    """Stream the entries of an import file into the diary managed by 'handler', returning the number added.
+
+    Records are parsed in a pool of {workers} processes and committed {batch_size} at a time, in file order.
+    Progress is committed with each batch, so an interrupted import of the same file resumes where it stopped;
+    entries identical to previously imported ones are skipped.
+    """
+
+    path = Path(path)
+    file_format = file_format or detect_format(path)
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown import format '{file_format}', expected one of {', '.join(FORMATS)}")
+    workers = workers or os.cpu_count() or 1
+
+    source = str(path.resolve())
+    position = handler.get_import_position(source)
+    if position:
+        print(f"Resuming import of {path} after {position} records.")
+
+    added = duplicates = skipped = 0
+    start_time = time.perf_counter()
+
+    def report(final=False):
+        elapsed = time.perf_counter() - start_time
+        print(f"Imported {added} entries ({duplicates} duplicates, {skipped} malformed) "
+              f"in {elapsed:.1f}s, {added / max(elapsed, 1e-9):.0f} entries/s", end='\n' if final else '\r')
+
+    # Records already processed in a previous run are read, but not parsed again
+    records = islice(read_records(path, file_format), position, None)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()  # (position after chunk, future) in file order; bounded to keep memory use flat
+
+        def commit_oldest():
+            nonlocal added, duplicates, skipped
+            chunk_position, future = pending.popleft()
+            entries, chunk_skipped = future.result()
+            for error, record in chunk_skipped:
+                logging.warning("Skipping malformed record (%s): %.80s", error, record)
+            chunk_added = handler.import_entries(source, chunk_position, entries)
+            added += chunk_added
+            duplicates += len(entries) - chunk_added
+            skipped += len(chunk_skipped)
+            report()
+
+        try:
+            for chunk in chunks(records, batch_size):
+                position += len(chunk)
+                pending.append((position, executor.submit(parse_records, file_format, chunk, default_category)))
+                if len(pending) >= 2 * workers:
+                    commit_oldest()
+            while pending:
+                commit_oldest()
+        except KeyboardInterrupt:
+            for _position, future in pending:
+                future.cancel()
+            report(final=True)
+            print("Import interrupted. Run the same command again to resume.")
+            raise
+
+    report(final=True)
+    logging.info("Imported %d entries from %s", added, source)
+    return added
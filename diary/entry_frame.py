@@ -1,4 +1,5 @@
 import datetime
+import tkinter as tk
 import tkinter.ttk as ttk
 
 import diary
@@ -20,11 +21,17 @@ class EntryFrame(diary.scroll_frame.ScrollableFrame):
         self.timestamps = []
         self.entries = []
         self.count_entries = 0
-        self.content_changed = False  # Flag used for programmatic scrolling - requires two updates
+        self.content_changed = False  # Flag used for programmatic scrolling - new content must be laid out first
+        self.wrap_width = 0  # Current wraplength of the entry labels; 0 until the frame is first laid out
+        self.__rewrap_pending = False
+        self.__scroll_pending = False
 
         # Add scaling to the content column only
         self.view.grid_columnconfigure(2, weight=1)
 
+        # Rewrap entries only when the frame is resized, once the resulting layout has settled
+        self.view.bind("<Configure>", self.__on_view_configure, add="+")
+
     def clear(self) -> None:
         """Clear the EntryFrame of messages.
         """
@@ -39,34 +46,66 @@ class EntryFrame(diary.scroll_frame.ScrollableFrame):
         self.count_entries = 0
         self.content_changed = True
 
-    def add_message(self, content: str, iso_timestamp: str, scroll_to_end=False) -> None:
+    def add_message(self, content: str, timestamp, scroll_to_end=False) -> None:
         """Add a message with the given content and timestamp, and displays it at the end of the frame.
 
+        The timestamp may be a datetime or an ISO timestamp string.
         By default also scrolls to the end so that the newly sent message is visible.
         """
 
-        self.count_entries += 1
-        self.view.rowconfigure(self.count_entries, weight=1)
+        self.add_messages([(content, timestamp)], scroll_to_end=False)
+        if scroll_to_end:
+            self.scroll_to_end()
 
-        # Update 'day' field
-        if self.show_day:
-            day_label = ttk.Label(self.view, text=diary.iso_to_weekday(iso_timestamp, relative=self.day_relative))
-            day_label.grid(row=self.count_entries, column=0, sticky="NW")
-            self.days.append(day_label)
+    def add_messages(self, rows, scroll_to_end=True) -> None:
+        """Add each (content, timestamp) pair of 'rows' as a message at the end of the frame.
+
+        The labels of every message are created before any are laid out, and scrolling to the end is deferred until
+        the frame is next idle, so that many messages are laid out and wrapped in a single pass.
+        """
 
-        # Add timestamp
-        time = datetime.datetime.fromisoformat(iso_timestamp)
-        timestamp_label = ttk.Label(self.view, text=time.strftime(self.timestamp_format))
-        timestamp_label.grid(row=self.count_entries, column=1, sticky="NEW")
-        self.timestamps.append(timestamp_label)
+        days = {}  # Day label text of each date, as consecutive messages mostly share one
+        first_row = self.count_entries + 1
 
-        # Add entry
-        entry_label = ttk.Label(self.view, text=content)
-        entry_label.grid(row=self.count_entries, column=2, sticky="NESW")
-        self.entries.append(entry_label)
+        # Hold the view's size until every label is in place
+        self.view.grid_propagate(False)
+        try:
+            for content, timestamp in rows:
+                time = datetime.datetime.fromisoformat(timestamp) if isinstance(timestamp, str) else timestamp
+                self.count_entries += 1
 
+                # Update 'day' field
+                if self.show_day:
+                    date = time.date()
+                    if date not in days:
+                        days[date] = diary.date_to_weekday(date, relative=self.day_relative)
+                    day_label = ttk.Label(self.view, text=days[date])
+                    day_label.grid(row=self.count_entries, column=0, sticky="NW")
+                    self.days.append(day_label)
+
+                # Add timestamp
+                timestamp_label = ttk.Label(self.view, text=time.strftime(self.timestamp_format))
+                timestamp_label.grid(row=self.count_entries, column=1, sticky="NEW")
+                self.timestamps.append(timestamp_label)
+
+                # Add entry
+                entry_label = ttk.Label(self.view, text=content, wraplength=self.wrap_width)
+                entry_label.grid(row=self.count_entries, column=2, sticky="NESW")
+                self.entries.append(entry_label)
+        finally:
+            self.view.grid_propagate(True)
+
+        if self.count_entries < first_row:
+            return
+        self.view.rowconfigure(tuple(range(first_row, self.count_entries + 1)), weight=1)
         self.content_changed = True
-        if scroll_to_end:
+        if scroll_to_end and not self.__scroll_pending:
+            self.__scroll_pending = True
+            self.after_idle(self.__deferred_scroll_to_end)
+
+    def __deferred_scroll_to_end(self):
+        self.__scroll_pending = False
+        if self.winfo_exists():
             self.scroll_to_end()
 
     def scroll_to_end(self, *args):
@@ -78,22 +117,261 @@ class EntryFrame(diary.scroll_frame.ScrollableFrame):
             # behaviour will be incorrect
             super().scroll_to_start(*args)
 
-            # Due to word wrapping we have to call update twice in a row to ensure we scroll to the very end.
-            # I know, I know.
-            # First update will render the frame's contents.
-            self.update()
-            # Second update will do any required wrapping of the now-present labels.
-            self.update()
-            # With content displayed and correctly wrapped, we can finally scroll to the end.
+            # Lay out the new labels, wrap them to the resulting width, then, if that changed their wrapping, lay them
+            # out again at their wrapped heights, so that the end of the content is known
+            self.update_idletasks()
+            if self.rewrap():
+                self.update_idletasks()
             self.content_changed = False
         super().scroll_to_end(*args)
 
-    def update(self):
-        """Update all labels so word wrapping is correct for current window width.
+    def __on_view_configure(self, event):
+        if not self.__rewrap_pending:
+            self.__rewrap_pending = True
+            self.after_idle(self.rewrap)
+
+    def rewrap(self) -> bool:
+        """Update all labels so word wrapping is correct for the current width, if it has changed.
+
+        Returns whether any labels were rewrapped, and so need laying out again.
         """
 
-        super().update()
-        if self.master.winfo_exists() and self.entries:
-            width = max(self.entries[0].winfo_width() - self.WRAPPING_PADDING, 0)
-            for label in self.entries:
-                label.configure(wraplength=width)
+        self.__rewrap_pending = False
+        if not self.entries or not self.winfo_exists():
+            return False
+        width = max(self.entries[0].winfo_width() - self.WRAPPING_PADDING, 0)
+        if width == self.wrap_width:
+            return False
+        self.wrap_width = width
+        for label in self.entries:
+            label.configure(wraplength=width)
+        return True
+
+
+class VirtualEntryFrame(tk.Frame):
+    """Displays a list of messages alongside their timestamps, like EntryFrame, for any number of messages.
+
+    Messages are only kept as data. A small pool of row widgets, enough to fill the visible area, is placed over the
+    frame and bound to whichever messages are scrolled into view, so the cost of loading and scrolling does not grow
+    with the number of messages. Row heights are measured as rows are shown, as wrapped text spans several lines.
+    """
+
+    WRAPPING_PADDING = 20
+    SCROLL_UNIT = 20  # Pixels scrolled per scrollbar arrow click or mouse wheel step
+    COLUMN_PADDING = 8  # Pixels between the day, time and content columns
+    DEFAULT_WIDTH = 400
+    DEFAULT_HEIGHT = 300
+
+    def __init__(self, master, background=diary.BACKGROUND, timestamp_format="%H:%M", show_day=False, day_relative=False):
+        super().__init__(master)
+
+        self.timestamp_format = timestamp_format
+        self.show_day = show_day
+        self.day_relative = day_relative if show_day else False
+
+        self.messages = []  # (datetime, content) of each message, in display order
+        self.heights = []  # Measured height in pixels of each message's row, or None until it is measured
+        self.first = 0  # Index of the message at the top of the view
+        self.offset = 0  # Pixels of the first message's row scrolled out of view above the top
+        self.wrap_width = 0  # Current wraplength of the content labels; 0 until the frame is first laid out
+        self.__rows = []  # Pool of [day, time, content] labels, the first of which show the messages in view
+        self.__stick_to_end = False  # Whether to keep the last message in view as the frame is laid out
+        self.__render_pending = False
+
+        # Placed rows do not propagate their size, so request a default size, as a canvas would
+        self.view = tk.Frame(self, background=background, width=self.DEFAULT_WIDTH, height=self.DEFAULT_HEIGHT)
+        self._scrollbar = tk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.view.grid(row=0, column=0, sticky="NESW")
+        self._scrollbar.grid(row=0, column=1, sticky="NS")
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        # Measures rows which are not in view, e.g. when scrolling upwards onto them
+        self.__probe = ttk.Label(self.view)
+        self.day_width = self.__widest(diary.WEEKDAYS + ["Today", "Yesterday"]) if self.show_day else 0
+        self.time_width = self.__widest([datetime.datetime(2000, 12, 28, 23, 59, 59).strftime(timestamp_format)])
+
+        self.view.bind("<Configure>", self.__on_view_configure)
+        self.bind('<Enter>', lambda event: diary.scroll_frame.bind_mouse_wheel(self.view, self.__on_wheel))
+        self.bind('<Leave>', lambda event: diary.scroll_frame.unbind_mouse_wheel(self.view))
+
+    def __widest(self, texts: list) -> int:
+        widths = []
+        for text in texts:
+            self.__probe.configure(text=text, wraplength=0)
+            widths.append(self.__probe.winfo_reqwidth())
+        return max(widths) + self.COLUMN_PADDING
+
+    def clear(self) -> None:
+        """Clear the frame of messages.
+        """
+
+        self.messages = []
+        self.heights = []
+        self.first = 0
+        self.offset = 0
+        self.__schedule_render()
+
+    def add_message(self, content: str, timestamp, scroll_to_end=False) -> None:
+        """Add a message with the given content and timestamp at the end of the frame.
+
+        The timestamp may be a datetime or an ISO timestamp string.
+        """
+
+        time = datetime.datetime.fromisoformat(timestamp) if isinstance(timestamp, str) else timestamp
+        self.messages.append((time, content))
+        self.heights.append(None)
+        if scroll_to_end:
+            self.scroll_to_end()
+        else:
+            self.__schedule_render()
+
+    def add_messages(self, rows, scroll_to_end=True) -> None:
+        """Add each (content, timestamp) pair of 'rows' as a message at the end of the frame.
+        """
+
+        for content, timestamp in rows:
+            time = datetime.datetime.fromisoformat(timestamp) if isinstance(timestamp, str) else timestamp
+            self.messages.append((time, content))
+        self.heights.extend([None] * (len(self.messages) - len(self.heights)))
+        if scroll_to_end:
+            self.scroll_to_end()
+        else:
+            self.__schedule_render()
+
+    def scroll_to_end(self, *args):
+        """Scroll to the end of the frame, such that the most recent messages are visible.
+        """
+
+        self.__stick_to_end = True
+        self.__schedule_render()
+
+    def scroll_to_start(self, *args):
+        """Scroll to the start of the frame.
+        """
+
+        self.__stick_to_end = False
+        self.first = 0
+        self.offset = 0
+        self.__schedule_render()
+
+    def yview(self, *args):
+        """Scroll as requested by the scrollbar: ("moveto", fraction) or ("scroll", count, "units" or "pages")."""
+        if not self.messages:
+            return
+        self.__stick_to_end = False
+        if args[0] == "moveto":
+            self.first = min(max(int(float(args[1]) * len(self.messages)), 0), len(self.messages) - 1)
+            self.offset = 0
+            self.__schedule_render()
+        elif args[0] == "scroll":
+            unit = self.SCROLL_UNIT if args[2] == "units" else max(self.view.winfo_height() - self.SCROLL_UNIT, 1)
+            self.__scroll_pixels(int(args[1]) * unit)
+
+    def __on_wheel(self, event):
+        self.__stick_to_end = False
+        self.__scroll_pixels(diary.scroll_frame.wheel_scroll_units(event) * self.SCROLL_UNIT)
+
+    def __scroll_pixels(self, pixels: int):
+        self.offset += pixels
+        while self.offset < 0 and self.first > 0:
+            self.first -= 1
+            self.offset += self.__height(self.first)
+        self.offset = max(self.offset, 0)
+        while self.first < len(self.messages) - 1 and self.offset >= self.__height(self.first):
+            self.offset -= self.__height(self.first)
+            self.first += 1
+        if self.messages:
+            self.offset = max(min(self.offset, self.__height(self.first) - 1), 0)
+        self.__schedule_render()
+
+    def __on_view_configure(self, event):
+        width = max(event.width - self.day_width - self.time_width - self.WRAPPING_PADDING, 0)
+        if width != self.wrap_width:
+            # Every row wraps differently at the new width
+            self.wrap_width = width
+            self.heights = [None] * len(self.messages)
+            for _day, _time, content in self.__rows:
+                content.configure(wraplength=width)
+        self.__schedule_render()
+
+    def __schedule_render(self):
+        if not self.__render_pending:
+            self.__render_pending = True
+            self.after_idle(self.__render)
+
+    def __texts(self, index: int) -> tuple:
+        """Return the day, time and content text of the message at 'index'."""
+        time, content = self.messages[index]
+        day = diary.date_to_weekday(time.date(), relative=self.day_relative) if self.show_day else ""
+        return day, time.strftime(self.timestamp_format), content
+
+    def __height(self, index: int) -> int:
+        """Return the height of the row of the message at 'index', measuring it if it has not been shown yet."""
+        if self.heights[index] is None:
+            self.__probe.configure(text=self.messages[index][1], wraplength=self.wrap_width)
+            self.heights[index] = self.__probe.winfo_reqheight()
+        return self.heights[index]
+
+    def __align_end(self, height: int):
+        """Scroll so that the last message's row ends at the bottom of a view 'height' pixels high."""
+        remaining = height
+        for index in range(len(self.messages) - 1, -1, -1):
+            row_height = self.__height(index)
+            if row_height >= remaining:
+                self.first, self.offset = index, row_height - remaining
+                return
+            remaining -= row_height
+        self.first, self.offset = 0, 0
+
+    def __render(self):
+        """Bind the rows of the pool to the messages in view, and place them."""
+        self.__render_pending = False
+        if not self.winfo_exists():
+            return
+        width = self.view.winfo_width()
+        height = self.view.winfo_height()
+        if width <= 1:
+            return  # Not laid out yet; rendered again once it is
+
+        if self.__stick_to_end:
+            self.__align_end(height)
+        self.first = min(self.first, max(len(self.messages) - 1, 0))
+
+        y = -self.offset
+        index = self.first
+        while index < len(self.messages) and y < height:
+            if index - self.first == len(self.__rows):
+                self.__rows.append([ttk.Label(self.view), ttk.Label(self.view),
+                                    ttk.Label(self.view, wraplength=self.wrap_width)])
+            row = self.__rows[index - self.first]
+            for label, text in zip(row, self.__texts(index)):
+                if label.cget("text") != text:
+                    label.configure(text=text)
+            row_height = max(label.winfo_reqheight() for label in row)
+            self.heights[index] = row_height
+            day, time, content = row
+            if self.show_day:
+                day.place(x=0, y=y)
+            time.place(x=self.day_width, y=y)
+            content.place(x=self.day_width + self.time_width, y=y, width=width - self.day_width - self.time_width)
+            y += row_height
+            index += 1
+
+        for row in self.__rows[index - self.first:]:
+            for label in row:
+                label.place_forget()
+
+        if y < height and (self.first > 0 or self.offset > 0) and not self.__stick_to_end:
+            # Scrolled past the end, leaving space below the last message
+            self.__stick_to_end = True
+            self.__render()
+            self.__stick_to_end = False
+            return
+
+        count = len(self.messages)
+        if count:
+            top = (self.first + self.offset / max(self.heights[self.first], 1)) / count
+            self._scrollbar.set(top, min(top + (index - self.first) / count, 1))
+        else:
+            self._scrollbar.set(0, 1)
@@ -1,6 +1,35 @@
 import tkinter as tk
 import platform
 
+PLATFORM = platform.system()
+
+
+def wheel_scroll_units(event) -> int:
+    """Return the number of units a mouse wheel event scrolls by, negative when scrolling up."""
+    if PLATFORM == 'Windows':
+        return -int(event.delta/120)
+    elif PLATFORM == 'Darwin':
+        return -int(event.delta)
+    else:
+        return -1 if event.num == 4 else 1  # 4 = scroll-up, 5 = scroll-down
+
+
+def bind_mouse_wheel(widget, callback) -> None:
+    """Send mouse wheel events anywhere in the application to 'callback', e.g. while the cursor is over 'widget'."""
+    if PLATFORM == 'Linux':
+        widget.bind_all("<Button-4>", callback)
+        widget.bind_all("<Button-5>", callback)
+    else:
+        widget.bind_all("<MouseWheel>", callback)
+
+
+def unbind_mouse_wheel(widget) -> None:
+    if PLATFORM == 'Linux':
+        widget.unbind_all("<Button-4>")
+        widget.unbind_all("<Button-5>")
+    else:
+        widget.unbind_all("<MouseWheel>")
+
 
 class ScrollableFrame(tk.Frame):
     """A Frame which supports a vertical scrollbar to scroll its contents.
@@ -32,8 +61,6 @@ class ScrollableFrame(tk.Frame):
         self.bind('<Enter>', self.__on_enter)
         self.bind('<Leave>', self.__on_exit)
 
-        self.__platform = platform.system()
-
     def __on_frame_configure(self, event):
         """Reset the scroll region based on the __canvas' current bounds"""
         self.__canvas.configure(scrollregion=self.__canvas.bbox("all"))
@@ -46,18 +73,18 @@ class ScrollableFrame(tk.Frame):
     def __on_scroll(self, event):
         """Perform scrolling of the view.
         """
-        if self.__platform == 'Windows' or self.__platform == 'Darwin':
-            scrolling_up = (event.delta > 0)
-            scroll_amount = -int(event.delta/120) if self.__platform == 'Windows' else -int(event.delta)
-        else:
-            scrolling_up = (event.num == 4)  # 4 = scroll-up, 5 = scroll-down
-            scroll_amount = -1 if scrolling_up else 1
+        scroll_amount = wheel_scroll_units(event)
+        scrolling_up = scroll_amount < 0
 
         # Extra conditions to avoid scrolling beyond content
         if scrolling_up and self.view.winfo_y() < 0 or \
                 not scrolling_up and self.view.winfo_y() - self.view.winfo_height() < -self.__canvas.winfo_height():
             self.__canvas.yview_scroll(scroll_amount, "units")
 
+    def yview(self, *args):
+        """Scroll the view as a scrollbar would, e.g. yview("scroll", 1, "pages")."""
+        return self.__canvas.yview(*args)
+
     def scroll_to_start(self, *args):
         """Force the frame to scroll to the start of its content."""
         self.__canvas.yview_moveto(0.00)
@@ -69,17 +96,9 @@ class ScrollableFrame(tk.Frame):
     def __on_enter(self, event):
         """Bind mouse wheel scroll to scroll the canvas.
         """
-        if self.__platform == 'Linux':
-            self.__canvas.bind_all("<Button-4>", self.__on_scroll)
-            self.__canvas.bind_all("<Button-5>", self.__on_scroll)
-        else:
-            self.__canvas.bind_all("<MouseWheel>", self.__on_scroll)
+        bind_mouse_wheel(self.__canvas, self.__on_scroll)
 
     def __on_exit(self, event):
         """Unbind mouse wheel scroll controls on the canvas when cursor leaves the canvas.
         """
-        if self.__platform == 'Linux':
-            self.__canvas.unbind_all("<Button-4>")
-            self.__canvas.unbind_all("<Button-5>")
-        else:
-            self.__canvas.unbind_all("<MouseWheel>")
+        unbind_mouse_wheel(self.__canvas)
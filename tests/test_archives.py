@@ -0,0 +1,56 @@
+import datetime
+
+from diary.diary_handler import Diary
+
+
+def test_recent_queries_skip_the_current_years_archive(tmp_path):
+    handler = Diary(tmp_path)
+    try:
+        now = datetime.datetime.now().replace(microsecond=0)
+        handler.add_entries([(f"{days} days ago", "Diary", (now - datetime.timedelta(days=days)).isoformat(sep=" "))
+                             for days in (3, 2, 1, 0)])
+
+        assert handler.archive_entries(older_than_days=2) == 1
+        assert handler.get_archive_years(*handler.entry_time_range({"days_ago": 0})) == []
+        assert handler.get_archive_years(*handler.entry_time_range({"days_ago": 2})) == []
+        assert handler.get_archive_years(*handler.entry_time_range({"days_ago": 3})) == [(now - datetime.timedelta(days=3)).year]
+
+        # Archiving more of the year widens the archive's range
+        assert handler.archive_entries(older_than_days=1) == 1
+        assert handler.get_archive_years(*handler.entry_time_range({"days_ago": 2})) == [(now - datetime.timedelta(days=2)).year]
+        assert handler.get_archive_years(*handler.entry_time_range({"days_ago": 0})) == []
+
+        assert [entry.entry for entry in handler.get_entries(days_ago=3, since=True)] == \
+               ["0 days ago", "1 days ago", "2 days ago", "3 days ago"]
+    finally:
+        handler.close()
+
+
+def test_ids_are_not_reused_after_archiving(tmp_path):
+    handler = Diary(tmp_path)
+    try:
+        handler.add_entries([(f"old{i}", "Diary", f"2020-01-0{i + 1} 09:00:00") for i in range(5)])
+        handler.add_entry("newest", "Diary")
+        assert handler.archive_entries(older_than_days=30) == 5
+
+        newest, = handler.get_entries(days_ago=0)
+        handler.delete_entries([newest.rowid])
+        handler.add_entry("new", "Diary")
+
+        new, = handler.get_entries(days_ago=0)
+        assert new.rowid > newest.rowid
+        assert [entry.entry for entry in handler.iter_entries()] == [f"old{i}" for i in range(5)] + ["new"]
+    finally:
+        handler.close()
+
+
+def test_ids_are_not_reused_after_deleting_the_newest(tmp_path):
+    handler = Diary(tmp_path)
+    try:
+        handler.add_entries([("first", "Diary"), ("second", "Diary")])
+        second = max(entry.rowid for entry in handler.iter_entries())
+        handler.delete_entries([second])
+        handler.add_entry("third", "Diary")
+        assert max(entry.rowid for entry in handler.iter_entries()) == second + 1
+    finally:
+        handler.close()
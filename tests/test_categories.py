@@ -0,0 +1,30 @@
+from diary.diary_handler import Diary
+
+
+def test_category_added_by_another_instance(tmp_path):
+    first = Diary(tmp_path)
+    second = Diary(tmp_path)
+    try:
+        second.add_entry("from cron", "cron")
+        first.add_entry("from the console", "cron")
+
+        categoryid = second.get_category_id("cron")
+        assert first.get_category_id("cron") == categoryid
+        assert [(entry.entry, entry.categoryid) for entry in first.get_entries(days_ago=0)] == \
+               [("from the console", categoryid), ("from cron", categoryid)]
+    finally:
+        first.close()
+        second.close()
+
+
+def test_category_name_of_id_added_elsewhere(tmp_path):
+    first = Diary(tmp_path)
+    second = Diary(tmp_path)
+    try:
+        second.add_entry("text", "other")
+        assert first.get_category_name(second.get_category_id("other")) == "other"
+        assert first.get_category_name(12345) is None
+        assert first.get_category_id("missing") == 0
+    finally:
+        first.close()
+        second.close()
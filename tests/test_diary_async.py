@@ -0,0 +1,79 @@
+import asyncio
+from contextlib import closing
+import sqlite3
+import threading
+
+from diary.diary_async import AsyncDiary
+from diary.diary_handler import Diary
+
+
+async def collect(rows) -> list:
+    return [row async for row in rows]
+
+
+def test_many_concurrent_callers(tmp_path):
+    async def main():
+        async with AsyncDiary(tmp_path, max_pending=4, chunk_size=7) as async_diary:
+            await asyncio.gather(*(async_diary.add_entry(f"entry {i}", f"category {i % 5}") for i in range(200)))
+            readers = [collect(async_diary.iter_entries()) for _ in range(10)]
+            results = await asyncio.gather(*readers, async_diary.get_categories())
+            return results[:-1], results[-1]
+
+    listings, categories = asyncio.run(main())
+    for entries in listings:
+        assert sorted(entry.entry for entry in entries) == sorted(f"entry {i}" for i in range(200))
+    assert sorted(category for _categoryid, category in categories) == [f"category {i}" for i in range(5)]
+
+
+def test_cancelled_calls_keep_their_slots_until_dequeued(tmp_path, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    get_schema_version = Diary.get_schema_version
+
+    def blocking_get_schema_version(self):
+        started.set()
+        release.wait(5)
+        return get_schema_version(self)
+
+    async def main():
+        async with AsyncDiary(tmp_path, max_pending=2) as async_diary:
+            monkeypatch.setattr(Diary, "get_schema_version", blocking_get_schema_version)
+            blocked = asyncio.ensure_future(async_diary.get_schema_version())
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+
+            # Both slots are taken by calls queued behind the blocked one, which then time out
+            for i in range(2):
+                try:
+                    await asyncio.wait_for(async_diary.add_entry(f"timed out {i}", "test"), 0.05)
+                except asyncio.TimeoutError:
+                    pass
+
+            # Must wait for a slot rather than overflow the queue
+            waiting = asyncio.ensure_future(async_diary.add_entry("after", "test"))
+            await asyncio.sleep(0.05)
+            assert not waiting.done()
+
+            release.set()
+            await asyncio.wait_for(waiting, 5)
+            await blocked
+            return [entry.entry for entry in await collect(async_diary.iter_entries())]
+
+    # Cancelled calls were already queued, so they still run
+    assert asyncio.run(main()) == ["timed out 0", "timed out 1", "after"]
+
+
+def test_stats_and_flush(tmp_path):
+    async def main():
+        async with AsyncDiary(tmp_path, write_behind=True) as async_diary:
+            await async_diary.add_entries([("one two", "Diary", "2024-01-01 09:00:00"),
+                                           ("three", "Diary", "2024-01-02 09:00:00")])
+            await async_diary.flush()
+            # Read through a separate connection, which only sees committed entries
+            with closing(sqlite3.connect(tmp_path / Diary.DATABASE_FILE_NAME)) as con:
+                committed = con.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            await async_diary.rebuild_stats()
+            return committed, await collect(async_diary.get_stats(group_by=("month",)))
+
+    committed, stats = asyncio.run(main())
+    assert committed == 2
+    assert stats == [("2024-01", 2, 12, 3)]
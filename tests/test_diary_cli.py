@@ -0,0 +1,24 @@
+import json
+
+from diary import diary_cli
+from diary.diary_handler import Diary
+
+
+def test_text_search_returns_whole_entries(tmp_path, capsys):
+    handler = Diary(tmp_path)
+    try:
+        long_entry = " ".join(f"w{i}" for i in range(40)) + " needle end"
+        handler.add_entries([(long_entry, "Diary", "2024-01-01 09:00:00"), ("needle", "Work", "2024-01-02 09:00:00"),
+                             ("no match", "Diary", "2024-01-03 09:00:00")])
+
+        assert diary_cli.search(handler, ['"needle"', "`needle`", '"needle" :Work', ":missing"]) == 1
+        records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    finally:
+        handler.close()
+
+    both = [("needle", "Work"), (long_entry, "Diary")]
+    assert [(entry["entry"], entry["category"]) for entry in records[0]["entries"]] == both
+    assert [(entry["entry"], entry["category"]) for entry in records[1]["entries"]] == both
+    assert [entry["entry"] for entry in records[2]["entries"]] == ["needle"]
+    assert records[3] == {"query": ":missing", "error": "Category 'missing' does not exist"}
+    assert set(records[0]["entries"][0]) == {"rowid", "timestamp", "category", "entry"}
@@ -0,0 +1,51 @@
+import datetime
+
+import pytest
+
+from diary.diary_console import find_entries, parse_date_range, parse_search
+from diary.diary_handler import Diary
+
+TODAY = datetime.date.today()
+
+
+def days_ago(days: int) -> datetime.date:
+    return TODAY - datetime.timedelta(days=days)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("t", (TODAY, TODAY)),
+    ("3", (days_ago(3), days_ago(3))),
+    ("y-t", (days_ago(1), TODAY)),
+    ("5-1", (days_ago(5), days_ago(1))),
+    ("7-", (days_ago(7), None)),
+    ("-2", (None, days_ago(2))),
+    ("epoch-", (datetime.date.min, None)),
+])
+def test_date_ranges_run_from_start_to_end(text, expected):
+    assert parse_date_range(text) == expected
+    assert (parse_search(text)["start_date"], parse_search(text)["end_date"]) == expected
+
+
+def test_invalid_date_range():
+    with pytest.raises(ValueError):
+        parse_date_range("soon")
+    assert parse_search("soon")["start_date"] is None
+
+
+def test_search_date_ranges(tmp_path):
+    handler = Diary(tmp_path)
+    try:
+        now = datetime.datetime.now().replace(microsecond=0)
+        handler.add_entries([(f"{days}", "Diary", (now - datetime.timedelta(days=days)).isoformat(sep=" "))
+                             for days in (6, 4, 2, 0)])
+
+        def search(query: str) -> list:
+            return [entry.entry for entry in find_entries(handler, **parse_search(query))]
+
+        assert search("t") == ["0"]
+        assert search("3-") == ["0", "2"]
+        assert search("5-1") == ["2", "4"]
+        assert search("-3") == ["4", "6"]
+        assert search("<2 epoch-") == ["0", "2"]
+    finally:
+        handler.close()
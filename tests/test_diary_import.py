@@ -0,0 +1,25 @@
+import json
+import logging
+
+from diary.diary_handler import Diary
+from diary.diary_import import import_file
+
+
+def test_malformed_records_are_logged(tmp_path, caplog):
+    path = tmp_path / "entries.jsonl"
+    lines = [json.dumps({"entry": f"entry {i}", "timestamp": f"2024-01-01 09:{i:02d}:00"}) for i in range(5)]
+    lines[1] = "{not json"
+    lines[3] = "[still not an entry"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    handler = Diary(tmp_path / "diary")
+    try:
+        with caplog.at_level(logging.WARNING):
+            assert import_file(handler, path, workers=2, batch_size=2) == 3
+    finally:
+        handler.close()
+
+    warnings = [record.getMessage() for record in caplog.records if "malformed" in record.getMessage()]
+    assert len(warnings) == 2
+    assert "{not json" in warnings[0]
+    assert "[still not an entry" in warnings[1]
@@ -0,0 +1,100 @@
+import datetime
+import sqlite3
+
+import pytest
+
+from diary.diary_handler import Diary
+
+# The schema written by Diary before schema versioning, i.e. user_version 0
+BASELINE_SCHEMA = '''
+    CREATE TABLE categories (categoryid INTEGER PRIMARY KEY, category TEXT);
+    CREATE TABLE entries (
+        entryid INTEGER PRIMARY KEY,
+        timestamp TEXT,
+        entry TEXT,
+        categoryid INTEGER,
+        FOREIGN KEY (categoryid)
+            REFERENCES categories (categoryid)
+        );
+    CREATE TABLE todo (
+        timestamp TEXT,
+        description TEXT
+        );
+    CREATE TABLE calendar (
+        timestamp TEXT,
+        description TEXT,
+        target TEXT,
+        frequency TEXT
+        );
+'''
+
+
+@pytest.fixture
+def baseline_root(tmp_path):
+    """A diary root holding a database with the baseline schema, including a duplicated category."""
+    con = sqlite3.connect(tmp_path / Diary.DATABASE_FILE_NAME)
+    con.executescript(BASELINE_SCHEMA)
+    con.executemany("INSERT INTO categories (categoryid, category) VALUES (?, ?)",
+                    [(1, "Diary"), (2, "Work"), (3, "Diary")])
+    con.executemany("INSERT INTO entries (timestamp, entry, categoryid) VALUES (?, ?, ?)",
+                    [(f"2024-01-{day:02d} 12:00:00", f"entry {day}", day % 3 + 1) for day in range(1, 29)])
+    con.commit()
+    con.close()
+    return tmp_path
+
+
+def query_plan(con: sqlite3.Connection, statement: str, values) -> str:
+    return " ".join(row[-1] for row in con.execute(f"EXPLAIN QUERY PLAN {statement}", values))
+
+
+def test_version_1_indexes(baseline_root, monkeypatch):
+    monkeypatch.setattr(Diary, "MIGRATIONS", Diary.MIGRATIONS[:1])
+    handler = Diary(baseline_root)
+    try:
+        assert handler.get_schema_version() == 1
+        # Duplicated categories are merged into the oldest copy
+        assert handler.get_categories() == [(1, "Diary"), (2, "Work")]
+        assert handler.con.execute("SELECT COUNT(*) FROM entries WHERE categoryid = 3").fetchone() == (0,)
+
+        statement = "SELECT entryid, timestamp, entry FROM entries WHERE {} ORDER BY timestamp DESC"
+        plan = query_plan(handler.con, statement.format("categoryid = ?"), [1])
+        assert "INDEX entries_categoryid_timestamp (categoryid=?)" in plan
+        plan = query_plan(handler.con, statement.format("timestamp >= ? AND timestamp < ?"), ["2024-01-01", "2024-02-01"])
+        assert "INDEX entries_timestamp (timestamp>? AND timestamp<?)" in plan
+        plan = query_plan(handler.con, statement.format("categoryid = ? AND timestamp >= ? AND timestamp < ?"),
+                          [1, "2024-01-01", "2024-02-01"])
+        assert "INDEX entries_categoryid_timestamp (categoryid=? AND timestamp>? AND timestamp<?)" in plan
+    finally:
+        handler.close()
+
+
+@pytest.mark.parametrize("filters, index", [
+    ({"categoryid": 1}, "entries_categoryid_timestamp_us (categoryid=?)"),
+    ({"start_date": datetime.date(2024, 1, 1), "end_date": datetime.date(2024, 1, 31)},
+     "entries_timestamp_us (timestamp_us>? AND timestamp_us<?)"),
+    ({"categoryid": 1, "start_date": datetime.date(2024, 1, 1), "end_date": datetime.date(2024, 1, 31)},
+     "entries_categoryid_timestamp_us (categoryid=? AND timestamp_us>? AND timestamp_us<?)"),
+])
+def test_latest_version_entry_filters_use_indexes(baseline_root, filters, index):
+    handler = Diary(baseline_root)
+    try:
+        assert handler.get_schema_version() == len(Diary.MIGRATIONS)
+
+        conditions, values = handler.build_entry_filters(filters)
+        statement = f'''SELECT entries.rowid FROM entries WHERE {" AND ".join(conditions)}
+                        ORDER BY timestamp_us DESC, rowid DESC LIMIT ?'''
+        plan = query_plan(handler.con, statement, [*values, 10])
+        assert f"INDEX {index}" in plan
+        assert "TEMP B-TREE" not in plan  # Read in index order, without sorting
+    finally:
+        handler.close()
+
+
+def test_migrated_entries_are_searchable(baseline_root):
+    handler = Diary(baseline_root)
+    try:
+        entries = handler.get_entries(start_date=datetime.date(2024, 1, 10), end_date=datetime.date(2024, 1, 11))
+        assert [entry.entry for entry in entries] == ["entry 11", "entry 10"]
+        assert [entry.entry for entry in handler.get_entries(text="entry", count=2)] == ["entry 28", "entry 27"]
+    finally:
+        handler.close()
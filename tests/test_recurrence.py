@@ -0,0 +1,146 @@
+import datetime
+
+import pytest
+
+from diary.diary_handler import Diary, Frequency, NEVER_US, from_epoch_us, occurrences, parse_frequency, to_epoch_us
+
+
+def dt(*args) -> datetime.datetime:
+    return datetime.datetime(*args)
+
+
+@pytest.mark.parametrize("text, frequency", [
+    ("", None),
+    ("  ", None),
+    ("daily", Frequency(1, "day")),
+    ("Weekly", Frequency(7, "day")),
+    ("fortnightly", Frequency(14, "day")),
+    ("quarterly", Frequency(3, "month")),
+    ("yearly", Frequency(12, "month")),
+    ("3 days", Frequency(3, "day")),
+    ("every 2 months", Frequency(2, "month")),
+    ("1 year", Frequency(12, "month")),
+])
+def test_parse_frequency(text, frequency):
+    assert parse_frequency(text) == frequency
+
+
+@pytest.mark.parametrize("text", ["sometimes", "0 days", "every -1 weeks", "2 fortnights", "monthly please"])
+def test_parse_invalid_frequency(text):
+    with pytest.raises(ValueError):
+        parse_frequency(text)
+
+
+def test_month_end_is_clamped_then_restored():
+    monthly = parse_frequency("monthly")
+    assert list(occurrences(dt(2024, 1, 31, 9), monthly, dt(2024, 3, 1), dt(2024, 6, 1))) == \
+           [dt(2024, 3, 31, 9), dt(2024, 4, 30, 9), dt(2024, 5, 31, 9)]
+
+
+def test_leap_day_yearly():
+    yearly = parse_frequency("yearly")
+    assert list(occurrences(dt(2024, 2, 29), yearly, dt(2024, 1, 1), dt(2029, 1, 1))) == \
+           [dt(2024, 2, 29), dt(2025, 2, 28), dt(2026, 2, 28), dt(2027, 2, 28), dt(2028, 2, 29)]
+
+
+@pytest.mark.parametrize("frequency", [None, "daily", "monthly"])
+def test_window_is_half_open(frequency):
+    target = dt(2024, 5, 1, 12)
+    recurrence = parse_frequency(frequency)
+    assert list(occurrences(target, recurrence, target, target + datetime.timedelta(microseconds=1))) == [target]
+    assert list(occurrences(target, recurrence, target - datetime.timedelta(days=1), target)) == []
+
+
+def test_target_long_before_window():
+    window = (dt(2024, 6, 3), dt(2024, 6, 10))
+    # 5 June 1990 and 4 June 2024 are both Tuesdays
+    assert list(occurrences(dt(1990, 6, 5, 8), parse_frequency("weekly"), *window)) == [dt(2024, 6, 4, 8)]
+    assert list(occurrences(dt(1990, 6, 5, 8), parse_frequency("yearly"), *window)) == [dt(2024, 6, 5, 8)]
+    assert list(occurrences(dt(1990, 6, 5, 8), None, *window)) == []
+
+
+def test_target_after_window():
+    window = (dt(2024, 6, 3), dt(2024, 6, 10))
+    assert list(occurrences(dt(2024, 6, 10), parse_frequency("daily"), *window)) == []
+    assert list(occurrences(dt(2030, 1, 1), parse_frequency("monthly"), *window)) == []
+
+
+@pytest.fixture
+def handler(tmp_path):
+    handler = Diary(tmp_path)
+    yield handler
+    handler.close()
+
+
+def next_times(handler: Diary) -> dict:
+    with handler.connections.read() as con:
+        return {rowid: next_us and from_epoch_us(next_us)
+                for rowid, next_us in con.execute("SELECT rowid, next_us FROM calendar")}
+
+
+def test_get_calendar_advances_passed_occurrences(handler):
+    now = datetime.datetime.now().replace(microsecond=0)
+    daily = handler.add_calendar_item("daily", now - datetime.timedelta(days=30, hours=1), "daily")
+    once = handler.add_calendar_item("once", now + datetime.timedelta(hours=1))
+    later = handler.add_calendar_item("later", now + datetime.timedelta(days=30))
+
+    # Pretend the items were last looked at two days ago
+    stale = to_epoch_us(now - datetime.timedelta(days=2))
+    with handler.connections.write() as con:
+        con.execute("UPDATE calendar SET next_us = ? WHERE rowid IN (?, ?)", (stale, daily, once))
+        con.commit()
+
+    items = handler.get_calendar()
+    assert [(description, rowid) for _time, description, rowid in items] == \
+           [("once", once)] + [("daily", daily)] * 7
+    assert items[0][0] == now + datetime.timedelta(hours=1)
+
+    times = next_times(handler)
+    assert times[daily] == now + datetime.timedelta(hours=23)
+    assert times[once] == now + datetime.timedelta(hours=1)
+    assert times[later] == now + datetime.timedelta(days=30)
+
+
+def test_get_calendar_skips_invalid_frequencies(handler):
+    now = datetime.datetime.now()
+    with pytest.raises(ValueError):
+        handler.add_calendar_item("bad", now, "whenever")
+
+    valid = handler.add_calendar_item("valid", now + datetime.timedelta(hours=1))
+    with handler.connections.write() as con:
+        con.execute("INSERT INTO calendar (description, target, frequency, next_us) VALUES (?, ?, ?, ?)",
+                    ("bad", now.isoformat(sep=" "), "whenever", to_epoch_us(now)))
+        con.commit()
+    assert [rowid for _time, _description, rowid in handler.get_calendar()] == [valid]
+
+
+def test_timestamps_with_offsets_are_stored_in_local_time(handler):
+    timestamp = "2020-01-01T10:00:00+02:00"
+    local = datetime.datetime.fromisoformat(timestamp).astimezone().replace(tzinfo=None)
+    assert to_epoch_us(timestamp) == to_epoch_us(local)
+
+    handler.add_entry("x", "c", timestamp)
+    entry, = handler.get_entries(start_date=local.date(), end_date=local.date())
+    assert entry.time == local
+
+
+def test_get_calendar_includes_items_without_next_occurrence(handler):
+    now = datetime.datetime.now().replace(microsecond=0)
+    # As added by older versions, or other programs, which do not know about next_us
+    with handler.connections.write() as con:
+        rowids = [con.execute("INSERT INTO calendar (description, target, frequency) VALUES (?, ?, ?)",
+                              (description, target.isoformat(sep=" "), frequency)).lastrowid
+                  for description, target, frequency in [("soon", now + datetime.timedelta(hours=1), ""),
+                                                          ("gone", now - datetime.timedelta(days=1), ""),
+                                                          ("daily", now - datetime.timedelta(hours=1), "daily")]]
+        con.commit()
+    soon, gone, daily = rowids
+
+    assert [(description, rowid) for _time, description, rowid in handler.get_calendar()] == \
+           [("soon", soon)] + [("daily", daily)] * 7
+    with handler.connections.read() as con:
+        assert dict(con.execute("SELECT rowid, next_us FROM calendar")) == {
+            soon: to_epoch_us(now + datetime.timedelta(hours=1)),
+            gone: NEVER_US,
+            daily: to_epoch_us(now + datetime.timedelta(hours=23)),
+        }
@@ -0,0 +1,32 @@
+import pytest
+
+from diary.diary_handler import Diary
+
+
+@pytest.fixture
+def handler(tmp_path):
+    handler = Diary(tmp_path)
+    handler.add_entries([("walked the dog", "Diary", "2024-01-01 09:00:00"),
+                         ("dogged determination", "Diary", "2024-01-02 09:00:00")])
+    yield handler
+    handler.close()
+
+
+def test_text_and_word_filters(handler):
+    assert [entry.entry for entry in handler.get_entries(text="dog")] == ["dogged determination", "walked the dog"]
+    assert [entry.entry for entry in handler.get_entries(word="dog")] == ["walked the dog"]
+    assert [entry.entry for entry in handler.entry_search(text="walk")] == ["walked the dog"]
+
+
+@pytest.mark.parametrize("blank", ["", "   ", "\t\n"])
+def test_blank_text_does_not_filter(handler, blank):
+    assert len(handler.get_entries(text=blank)) == 2
+    assert len(handler.get_entries(word=blank)) == 2
+    assert len(list(handler.iter_entries(text=blank, word=blank))) == 2
+    assert len(handler.entry_search(text=blank)) == 2
+    with pytest.raises(ValueError):
+        handler.text_search(text=blank)
+
+
+def test_blank_text_alongside_a_word(handler):
+    assert [entry.entry for entry in handler.text_search(text="  ", word="dog", highlight=("", ""))] == ["walked the dog"]
@@ -0,0 +1,40 @@
+import threading
+import time
+
+from diary.diary_handler import Diary
+
+
+def test_readers_see_their_own_writes(tmp_path):
+    handler = Diary(tmp_path, write_behind=True)
+    try:
+        for i in range(50):
+            handler.add_entry(f"entry {i}", "Diary")
+            assert len(list(handler.iter_entries())) == i + 1
+    finally:
+        handler.close()
+
+
+def test_flush_does_not_wait_for_later_writes(tmp_path):
+    handler = Diary(tmp_path, write_behind=True)
+    stop = threading.Event()
+
+    def write():
+        while not stop.is_set():
+            handler.add_entries(("busy", "Diary") for _ in range(100))
+
+    writers = [threading.Thread(target=write) for _ in range(4)]
+    try:
+        for writer in writers:
+            writer.start()
+        durations = []
+        for _ in range(20):
+            start = time.perf_counter()
+            handler.get_entries(days_ago=0, count=1)
+            durations.append(time.perf_counter() - start)
+        # Each read waits for at most the rows queued ahead of it, a few batches at most
+        assert max(durations) < 1
+    finally:
+        stop.set()
+        for writer in writers:
+            writer.join()
+        handler.close()